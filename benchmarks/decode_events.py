@@ -0,0 +1,150 @@
+## Input event decoding microbenchmark
+## Compares how many input events a second can be read and decoded by evdev's own reader, by
+## evdev's reader followed by categorize() like main.py used to do, and by the bulk EventReader
+## the input pipeline uses, with and without a filter. Events are fed through a pipe, which
+## behaves like a device's file descriptor for reading purposes.
+##
+## Run it from the root of the repo with "python -m benchmarks.decode_events".
+
+# Imports
+import argparse
+import os
+import sys
+import time
+from typing import Callable
+from evdev import InputEvent, categorize, ecodes
+from evdev import _input
+from src.event_reader import INPUT_EVENT, EventReader
+
+# The most events written to the pipe at once, which keeps each chunk within the pipe's 64 KiB buffer
+_CHUNK_EVENTS: int = 2048
+
+
+def makeChunk(workload: str) -> bytes:
+    """
+    Creates a chunk of raw events like a device sends them.
+
+    :param workload: "keys" for button presses, "axes" for a joystick being wiggled, or "mixed" for both.
+
+    :returns: ``bytes`` - The raw events.
+
+    :raises None:
+    """
+
+    # Each key press is a scan code, the key itself and a sync, the way keyboards and the side panel send them
+    key_frame: list[tuple[int, int, int]] = [
+        (ecodes.EV_MSC, ecodes.MSC_SCAN, 0x90001), (ecodes.EV_KEY, 304, 1), (ecodes.EV_SYN, ecodes.SYN_REPORT, 0)
+    ]
+    # Each joystick frame is an update to both axes and a sync
+    axis_frame: list[tuple[int, int, int]] = [
+        (ecodes.EV_ABS, ecodes.ABS_X, 100), (ecodes.EV_ABS, ecodes.ABS_Y, 150), (ecodes.EV_SYN, ecodes.SYN_REPORT, 0)
+    ]
+    frames: list[list[tuple[int, int, int]]] = {
+        "keys": [key_frame],
+        "axes": [axis_frame],
+        "mixed": [axis_frame, axis_frame, axis_frame, key_frame],
+    }[workload]
+
+    events: list[tuple[int, int, int]] = []
+    while len(events) < _CHUNK_EVENTS:
+        for frame in frames:
+            events.extend(frame)
+
+    return b"".join(INPUT_EVENT.pack(1, index, *event) for index, event in enumerate(events[:_CHUNK_EVENTS]))
+
+
+def evdevRead(fd: int) -> Callable[[], list]:
+    """What ``InputDevice.read()`` does."""
+
+    return lambda: [InputEvent(*event) for event in _input.device_read_many(fd)]
+
+
+def evdevCategorize(fd: int) -> Callable[[], list]:
+    """What ``InputDevice.read()`` followed by ``categorize()`` on every event does."""
+
+    return lambda: [categorize(InputEvent(*event)) for event in _input.device_read_many(fd)]
+
+
+def measure(read: Callable[[], list], write_fd: int, chunk: bytes, total_events: int) -> tuple[float, int]:
+    """
+    Feeds chunks of events through the pipe, timing only how long it takes to read them back out.
+
+    :param read: The function that reads every event currently in the pipe, up to its capacity.
+    :param write_fd: The end of the pipe to write to.
+    :param chunk: The raw events to write each time.
+    :param total_events: About how many events to read in total.
+
+    :returns: ``tuple[float, int]`` - The seconds spent reading, and the amount of events handed back.
+
+    :raises None:
+    """
+
+    elapsed: float = 0
+    kept: int = 0
+    for _ in range(max(total_events // _CHUNK_EVENTS, 1)):
+        os.write(write_fd, chunk)
+
+        start: float = time.perf_counter()
+        try:
+            while True:
+                kept += len(read())
+        except BlockingIOError:
+            pass
+        elapsed += time.perf_counter() - start
+
+    return elapsed, kept
+
+
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python -m benchmarks.decode_events",
+        description="Measures how many input events a second each way of reading them can decode."
+    )
+    parser.add_argument("--events", type=int, default=1_000_000, help="About how many events to read with each one.")
+    parser.add_argument(
+        "--workload", choices=("keys", "axes", "mixed"), default="mixed", help="What kind of events to send."
+    )
+    arguments: argparse.Namespace = parser.parse_args()
+
+    chunk: bytes = makeChunk(arguments.workload)
+
+    # The filter the side panel uses with a joystick bound, so its scan codes are the only thing skipped,
+    # and the one it uses with only buttons bound
+    axis_filter: dict[int, frozenset[int] | None] = {
+        ecodes.EV_KEY: None,
+        ecodes.EV_ABS: frozenset({ecodes.ABS_X, ecodes.ABS_Y}),
+        ecodes.EV_SYN: frozenset({ecodes.SYN_REPORT, ecodes.SYN_DROPPED}),
+    }
+    key_filter: dict[int, frozenset[int] | None] = {ecodes.EV_KEY: None}
+
+    readers: list[tuple[str, Callable[[int], Callable[[], list]]]] = [
+        ("evdev read", evdevRead),
+        ("evdev read + categorize", evdevCategorize),
+        ("bulk read", lambda fd: EventReader(fd).read),
+        ("bulk read, axis filter", lambda fd: EventReader(fd, axis_filter).read),
+        ("bulk read, key filter", lambda fd: EventReader(fd, key_filter).read),
+    ]
+
+    print(f"{'reader':<26}{'events/s':>14}{'kept':>10}{'vs evdev':>10}")
+    baseline: float | None = None
+    for name, createReader in readers:
+        read_fd, write_fd = os.pipe()
+        os.set_blocking(read_fd, False)
+
+        try:
+            elapsed, kept = measure(createReader(read_fd), write_fd, chunk, arguments.events)
+
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+        total: int = max(arguments.events // _CHUNK_EVENTS, 1) * _CHUNK_EVENTS
+        rate: float = total / elapsed
+        baseline = baseline or rate
+        print(f"{name:<26}{rate:>14,.0f}{kept / total:>10.0%}{rate / baseline:>9.2f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+# Imports
+import asyncio
+import json
+import time
+import uuid
+import websockets
+from typing import Callable
+
+
+class FakeStreamerBot:
+    def __init__(
+            self,
+            action_names: list[str],
+            host: str = "127.0.0.1",
+            port: int = 0,
+            hello_delay: float = 0,
+            get_actions_delay: float = 0,
+            do_action_delay: float = 0,
+            chat_rate: float = 0,
+            on_do_action: Callable[[float, dict], None] | None = None
+    ) -> None:
+        """
+        A local stand-in for the Streamer.bot Web Socket server, good enough to benchmark
+        against. It implements Hello, GetActions, DoAction and Subscribe, can delay each
+        of them, and can flood subscribed clients with Twitch chat messages.
+
+        :param action_names: The names of the actions GetActions reports.
+        :param host: The address to listen on.
+        :param port: The port to listen on. 0 picks a free one, which is put in ``port`` once started.
+        :param hello_delay: How long to wait before sending the Hello message, in seconds.
+        :param get_actions_delay: How long to wait before responding to GetActions, in seconds.
+        :param do_action_delay: How long to wait before responding to DoAction, in seconds.
+        :param chat_rate: How many chat messages to send per second to clients subscribed to
+         Twitch chat. 0 turns the flood off.
+        :param on_do_action: A function called with the wall clock time a DoAction request
+         came off of the wire, and the request itself.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the settings class-accessible
+        self.host: str = host
+        self.port: int = port
+        self.hello_delay: float = hello_delay
+        self.get_actions_delay: float = get_actions_delay
+        self.do_action_delay: float = do_action_delay
+        self.chat_rate: float = chat_rate
+        self.on_do_action: Callable[[float, dict], None] | None = on_do_action
+
+        # Create the list of actions, with made up IDs
+        self.actions: list[dict] = [
+            {"id": str(uuid.uuid4()), "name": name, "group": "Benchmark", "enabled": True, "subactions_count": 1}
+            for name in action_names
+        ]
+
+        # Create counters for what the server has seen
+        self.do_action_count: int = 0
+        self.chat_messages_sent: int = 0
+
+        # Create a variable to store the server itself
+        self._server: websockets.Server | None = None
+
+        return
+
+    async def start(self) -> None:
+        """Starts listening for connections."""
+
+        self._server = await websockets.serve(self._handleConnection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+        return
+
+    async def stop(self) -> None:
+        """Closes every connection and stops listening."""
+
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        return
+
+    async def _handleConnection(self, websocket: websockets.ServerConnection) -> None:
+        """Serves a single client until it disconnects."""
+
+        # The events the client subscribed to, by source
+        subscriptions: dict[str, set[str]] = {}
+        background_tasks: set[asyncio.Task] = set()
+
+        # Greet the client, like Streamer.bot does
+        await asyncio.sleep(self.hello_delay)
+        await websocket.send(json.dumps({
+            "request": "Hello",
+            "info": {"instanceId": "benchmark", "name": "Fake Streamer.bot", "version": "0.2.0"},
+            "authentication": None
+        }))
+
+        # Start flooding the client with chat, if asked to
+        if self.chat_rate:
+            background_tasks.add(asyncio.create_task(self._chatFlood(websocket, subscriptions)))
+
+        try:
+            async for message in websocket:
+                request: dict = json.loads(message)
+                request_type: str = request.get("request", "")
+
+                if request_type == "DoAction":
+                    # Note the time first, since this is what's being measured
+                    received_at: float = time.time()
+                    self.do_action_count += 1
+                    if self.on_do_action:
+                        self.on_do_action(received_at, request)
+
+                    reply, delay = {"id": request.get("id"), "status": "ok"}, self.do_action_delay
+
+                elif request_type == "GetActions":
+                    reply, delay = {
+                        "id": request.get("id"), "status": "ok", "actions": self.actions, "count": len(self.actions)
+                    }, self.get_actions_delay
+
+                elif request_type in ("Subscribe", "UnSubscribe", "Unsubscribe"):
+                    for source, events in request.get("events", {}).items():
+                        if request_type == "Subscribe":
+                            subscriptions.setdefault(source, set()).update(events)
+                        else:
+                            subscriptions.get(source, set()).difference_update(events)
+
+                    reply, delay = {"id": request.get("id"), "status": "ok", "events": request.get("events")}, 0
+
+                else:
+                    reply, delay = {"id": request.get("id"), "status": "error", "error": "Unknown request"}, 0
+
+                # Respond in the background, so a slow response doesn't hold up reading the next request
+                task: asyncio.Task = asyncio.create_task(self._reply(websocket, reply, delay))
+                background_tasks.add(task)
+                task.add_done_callback(background_tasks.discard)
+
+        except websockets.ConnectionClosed:
+            pass
+
+        finally:
+            for task in background_tasks:
+                task.cancel()
+
+        return
+
+    @staticmethod
+    async def _reply(websocket: websockets.ServerConnection, reply: dict, delay: float) -> None:
+        """Sends a response after a delay."""
+
+        if delay:
+            await asyncio.sleep(delay)
+
+        try:
+            await websocket.send(json.dumps(reply))
+
+        except websockets.ConnectionClosed:
+            pass
+
+        return
+
+    async def _chatFlood(self, websocket: websockets.ServerConnection, subscriptions: dict[str, set[str]]) -> None:
+        """Sends chat messages at the configured rate for as long as the client is subscribed to them."""
+
+        # Send in small bursts every tick, which is close enough to a busy chat
+        tick: float = 0.01
+        owed: float = 0
+
+        while True:
+            await asyncio.sleep(tick)
+            if "ChatMessage" not in subscriptions.get("Twitch", ()):
+                continue
+
+            owed += self.chat_rate * tick
+            while owed >= 1:
+                owed -= 1
+                self.chat_messages_sent += 1
+                await websocket.send(json.dumps({
+                    "timeStamp": time.time(),
+                    "event": {"source": "Twitch", "type": "ChatMessage"},
+                    "data": {
+                        "message": {
+                            "msgId": str(uuid.uuid4()),
+                            "userId": "12345",
+                            "username": "benchmark_viewer",
+                            "displayName": "Benchmark_Viewer",
+                            "message": f"Chat message number {self.chat_messages_sent}, bottom text",
+                            "emotes": [],
+                            "badges": [],
+                            "role": 1,
+                            "subscriber": False
+                        }
+                    }
+                }))
@@ -0,0 +1,351 @@
+## Press-to-action latency benchmark
+## Replays button presses through the same dispatch path main.py uses (input pipeline, input
+## handler, LogitechSidePanel and StreamerBotWebsocket) into a fake Streamer.bot, and measures
+## the time from each press's event timestamp to its DoAction request coming off of the wire.
+##
+## Run it from the root of the repo with "python -m benchmarks.press_latency".
+
+# Imports
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import struct
+import sys
+import tempfile
+import time
+from collections import deque
+from typing import Iterator
+
+# Keep PyGame quiet and off of the sound card, and give main.py the settings it reads on import
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+os.environ.setdefault("STREAMER_BOT_ADDRESS", "127.0.0.1")
+os.environ.setdefault("STREAMER_BOT_PORT", "8080")
+
+from evdev import InputEvent, ecodes
+from benchmarks.fake_streamer_bot import FakeStreamerBot
+from main import createInputHandler
+from src import journal
+from src.input_pipeline import InputPipeline
+from src.journal import EventJournal
+from src.logitech_side_panel import LogitechSidePanel
+from src.streamer_bot_ws import StreamerBotWebsocket
+
+# The layout of a struct input_event from linux/input.h on 64-bit systems
+_INPUT_EVENT: struct.Struct = struct.Struct("llHHi")
+
+
+class PipeDevice:
+    def __init__(self) -> None:
+        """
+        A stand-in for an evdev ``InputDevice`` backed by a pipe. Raw input events
+        written to it are read back by the input pipeline exactly like ones from a
+        real device would be.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        self.fd, self._write_fd = os.pipe()
+        os.set_blocking(self.fd, False)
+        self._buffer: bytes = b""
+
+        return
+
+    def write(self, events: list[tuple[int, int, int]]) -> float:
+        """
+        Writes events to the device, timestamped with the current time.
+
+        :param events: The events to write, as event type, code and value.
+
+        :returns: ``float`` - The timestamp the events were given.
+
+        :raises OSError: If the pipe is full or closed.
+        """
+
+        now: float = time.time()
+        sec, usec = int(now), int((now % 1) * 1_000_000)
+        os.write(self._write_fd, b"".join(_INPUT_EVENT.pack(sec, usec, *event) for event in events))
+
+        return sec + usec / 1_000_000
+
+    def read(self) -> Iterator[InputEvent]:
+        """Reads every event currently in the pipe."""
+
+        self._buffer += os.read(self.fd, 64 * _INPUT_EVENT.size)
+        usable: int = len(self._buffer) - len(self._buffer) % _INPUT_EVENT.size
+        data, self._buffer = self._buffer[:usable], self._buffer[usable:]
+
+        return (InputEvent(*event) for event in _INPUT_EVENT.iter_unpack(data))
+
+    def close(self) -> None:
+        os.close(self.fd)
+        os.close(self._write_fd)
+
+        return
+
+
+def _press(code: int) -> list[tuple[int, int, int]]:
+    """The events a single press and release of a button makes."""
+
+    return [
+        (ecodes.EV_KEY, code, 1), (ecodes.EV_SYN, ecodes.SYN_REPORT, 0),
+        (ecodes.EV_KEY, code, 0), (ecodes.EV_SYN, ecodes.SYN_REPORT, 0),
+    ]
+
+
+def syntheticStream(codes: list[int], presses: int, interval: float) -> Iterator[tuple[float, list]]:
+    """
+    Creates a stream of presses cycling through the given buttons.
+
+    :param codes: The codes of the buttons to press.
+    :param presses: How many presses to make.
+    :param interval: How long to wait between presses, in seconds.
+
+    :returns: ``Iterator[tuple[float, list]]`` - The delay before each batch of events, and the batch.
+
+    :raises None:
+    """
+
+    for index in range(presses):
+        yield interval, _press(codes[index % len(codes)])
+
+
+def recordedStream(path: str, codes: set[int], speed: float = 1) -> Iterator[tuple[float, list]]:
+    """
+    Replays the input events in an event journal, keeping their original spacing.
+    Only key events for the given buttons and sync events are kept, so nothing in
+    the replay can switch profiles out from under the benchmark.
+
+    :param path: The path to the journal to replay.
+    :param codes: The codes of the buttons to keep.
+    :param speed: How much faster than real time to replay the events.
+
+    :returns: ``Iterator[tuple[float, list]]`` - The delay before each event, and the event.
+
+    :raises ValueError: If the file isn't a journal.
+    """
+
+    previous_ns: int | None = None
+    for timestamp_ns, kind, _, event_type, code, _, value, _, _, _, _ in journal.readJournal(path):
+        if kind != journal.KIND_INPUT:
+            continue
+        if not (event_type == ecodes.EV_SYN or (event_type == ecodes.EV_KEY and code in codes)):
+            continue
+
+        delay: float = 0 if previous_ns is None else max(timestamp_ns - previous_ns, 0) / 1_000_000_000 / speed
+        previous_ns = timestamp_ns
+        yield delay, [(event_type, code, value)]
+
+
+def _percentile(latencies: list[float], percent: int) -> float:
+    """Gets a percentile of the latencies, in milliseconds."""
+
+    if len(latencies) == 1:
+        return latencies[0] * 1000
+
+    return statistics.quantiles(latencies, n=100, method="inclusive")[percent - 1] * 1000
+
+
+async def runScenario(name: str, arguments: argparse.Namespace, chat_rate: float) -> dict:
+    """
+    Runs one benchmark scenario against a fresh fake Streamer.bot.
+
+    :param name: The name of the scenario, for the report.
+    :param arguments: The parsed command line arguments.
+    :param chat_rate: How many chat messages per second to flood the client with.
+
+    :returns: ``dict`` - The results of the scenario.
+
+    :raises ValueError: If the keymap doesn't bind any actions in the first profile.
+    :raises TimeoutError: If the fake Streamer.bot couldn't be connected to.
+    """
+
+    # The press timestamps waiting on their DoAction, oldest first, keyed by the action ID and arguments they send
+    ## Presses of different buttons run side by side, so their DoActions can arrive in any order, but presses
+    ## of the same button are kept in order.
+    waiting: dict[tuple[str, str], deque[float]] = {}
+    latencies: list[float] = []
+    all_received: asyncio.Event = asyncio.Event()
+    expected: int = 0
+
+    def onDoAction(received_at: float, request: dict) -> None:
+        presses: deque[float] | None = waiting.get(
+            (request["action"].get("id"), json.dumps(request.get("args"), sort_keys=True))
+        )
+        if presses:
+            latencies.append(received_at - presses.popleft())
+        if len(latencies) >= expected:
+            all_received.set()
+
+    # Create the client and the side panel, and find the buttons bound to Streamer.bot actions
+    panel_journal: EventJournal | None = None
+    streamer_bot: StreamerBotWebsocket = StreamerBotWebsocket(url="127.0.0.1", port=0)
+    side_panel: LogitechSidePanel = LogitechSidePanel(streamer_bot_ws_instance=streamer_bot)
+    action_codes: list[int] = [
+        code for code, binding in side_panel.keymap.bindings.get(0, {}).items() if binding.kind == "action"
+    ]
+    action_names: set[str] = {side_panel.keymap.bindings[0][code].params["action_name"] for code in action_codes}
+    if not action_codes:
+        raise ValueError("The keymap doesn't bind any Streamer.bot actions in profile 0, so there's nothing to time!")
+
+    # Start the fake Streamer.bot, with every action the keymap could ask for
+    server: FakeStreamerBot = FakeStreamerBot(
+        action_names=sorted(action_names),
+        get_actions_delay=arguments.get_actions_delay,
+        do_action_delay=arguments.do_action_delay,
+        chat_rate=chat_rate,
+        on_do_action=onDoAction
+    )
+    await server.start()
+
+    # Connect to it, and wait for the action catalog to fill
+    streamer_bot.port = server.port
+    await asyncio.wait_for(streamer_bot.connect(), 10)
+    if chat_rate:
+        await streamer_bot.subscribe(twitch=[StreamerBotWebsocket.EventTypes.Twitch.ChatMessage])
+    while not streamer_bot.actions.loaded:
+        await asyncio.sleep(0.01)
+
+    # Work out what each button's DoAction looks like, so each one can be matched back to its press
+    press_keys: dict[int, tuple[str, str]] = {}
+    for code in action_codes:
+        params: dict = side_panel.keymap.bindings[0][code].params
+        press_keys[code] = (
+            streamer_bot.actions.getActionId(params["action_name"]), json.dumps(params.get("args"), sort_keys=True)
+        )
+        waiting.setdefault(press_keys[code], deque())
+
+    # Wire up the journal and the input pipeline, just like main.py does
+    journal_directory: tempfile.TemporaryDirectory | None = None
+    if not arguments.no_journal:
+        journal_directory = tempfile.TemporaryDirectory()
+        panel_journal = EventJournal(os.path.join(journal_directory.name, "events.journal"), 65536)
+        side_panel.journal = panel_journal
+
+    pipeline: InputPipeline = InputPipeline(handler=createInputHandler({side_panel.name: side_panel}, panel_journal))
+    pipeline.start()
+    device: PipeDevice = PipeDevice()
+    reader: asyncio.Task = asyncio.create_task(
+        pipeline.readDevice(device, side_panel.name, side_panel.event_filter)
+    )
+
+    # Build the stream of events to replay
+    if arguments.replay:
+        stream: list[tuple[float, list]] = list(recordedStream(arguments.replay, set(action_codes), arguments.speed))
+    else:
+        stream = list(syntheticStream(action_codes, arguments.presses, arguments.interval))
+    expected = sum(1 for _, events in stream for event in events if event[0] == ecodes.EV_KEY and event[2] == 1)
+
+    # Give the connection a moment to settle, then replay the events
+    await asyncio.sleep(0.2)
+    received_before: int = streamer_bot.messages_received
+    started: float = time.perf_counter()
+    for delay, events in stream:
+        if delay:
+            await asyncio.sleep(delay)
+
+        timestamp: float = device.write(events)
+        for event in events:
+            if event[0] == ecodes.EV_KEY and event[2] == 1:
+                waiting[press_keys[event[1]]].append(timestamp)
+
+    # Wait for the stragglers
+    try:
+        await asyncio.wait_for(all_received.wait(), arguments.timeout)
+
+    except asyncio.TimeoutError:
+        pass
+    received_rate: float = (streamer_bot.messages_received - received_before) / (time.perf_counter() - started)
+
+    # Clean up
+    reader.cancel()
+    await asyncio.gather(reader, return_exceptions=True)
+    await pipeline.stop()
+    await side_panel.executor.close()
+    await streamer_bot.disconnect()
+    await server.stop()
+    device.close()
+    side_panel.music_player.track_cache.close(1)
+    if panel_journal:
+        panel_journal.close()
+        journal_directory.cleanup()
+
+    return {
+        "name": name,
+        "presses": expected,
+        "missed": expected - len(latencies),
+        "dropped": pipeline.dropped_events,
+        "chat": server.chat_messages_sent,
+        "received_rate": received_rate,
+        "skipped": streamer_bot.messages_skipped,
+        "latencies": latencies,
+    }
+
+
+def printReport(results: list[dict]) -> None:
+    """Prints a table of the results of every scenario."""
+
+    print(
+        f"{'scenario':<12}{'presses':>9}{'missed':>8}{'dropped':>9}{'chat msgs':>11}{'recv msg/s':>12}{'skipped':>9}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+    )
+    for result in results:
+        latencies: list[float] = result["latencies"]
+        if latencies:
+            percentiles: str = "".join(f"{_percentile(latencies, percent):>9.3f}" for percent in (50, 95, 99))
+            percentiles += f"{max(latencies) * 1000:>9.3f}"
+        else:
+            percentiles = f"{'-':>9}" * 4
+
+        print(
+            f"{result['name']:<12}{result['presses']:>9}{result['missed']:>8}{result['dropped']:>9}"
+            f"{result['chat']:>11}{result['received_rate']:>12.0f}{result['skipped']:>9}{percentiles}"
+        )
+
+    return
+
+
+async def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python -m benchmarks.press_latency",
+        description="Measures the latency from a button press to its DoAction request reaching Streamer.bot."
+    )
+    parser.add_argument("--presses", type=int, default=500, help="How many synthetic presses to make.")
+    parser.add_argument("--interval", type=float, default=0.01, help="Seconds between synthetic presses.")
+    parser.add_argument("--replay", help="An event journal to replay instead of synthetic presses.")
+    parser.add_argument("--speed", type=float, default=1, help="How much faster than real time to replay a journal.")
+    parser.add_argument("--chat-rate", type=float, default=1000, help="Chat messages per second in the flood scenario.")
+    parser.add_argument("--get-actions-delay", type=float, default=0, help="Seconds the fake takes to answer GetActions.")
+    parser.add_argument("--do-action-delay", type=float, default=0, help="Seconds the fake takes to answer DoAction.")
+    parser.add_argument("--timeout", type=float, default=5, help="Seconds to wait for the last DoAction to arrive.")
+    parser.add_argument("--no-journal", action="store_true", help="Leave the event journal out of the dispatch path.")
+    parser.add_argument("--log-chat", action="store_true", help="Log chat messages, so every one is decoded.")
+    parser.add_argument("--scenario", choices=("idle", "flood", "all"), default="all", help="Which scenarios to run.")
+    arguments: argparse.Namespace = parser.parse_args()
+
+    # Keep the chat flood from spamming the console
+    logging.basicConfig(level=logging.WARNING)
+    if arguments.log_chat:
+        # Chat gets logged at the info level, but should still stay off of the console
+        logging.getLogger().handlers[0].setLevel(logging.WARNING)
+        logging.getLogger("redneck.websocket").setLevel(logging.INFO)
+
+    results: list[dict] = []
+    if arguments.scenario in ("idle", "all"):
+        results.append(await runScenario("idle", arguments, chat_rate=0))
+    if arguments.scenario in ("flood", "all"):
+        results.append(await runScenario("chat flood", arguments, chat_rate=arguments.chat_rate))
+
+    printReport(results)
+
+    # Fail if any press never made it to Streamer.bot, so this can gate changes
+    return 1 if any(result["missed"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
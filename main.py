@@ -11,15 +11,18 @@ import evdev
 from evdev import InputDevice, ecodes
 import asyncio
 import logging
+from typing import Awaitable, Callable
 from dotenv import load_dotenv
 from src.logitech_side_panel import LogitechSidePanel
-from src.logger import configureLogger
+from src.logger import configureLogger, getSubsystemLogger
 from src.utils import setup
 from src.streamer_bot_ws import StreamerBotWebsocket
+from src.input_pipeline import InputPipeline
+from src.journal import EventJournal
+from src.supervisor import Supervisor
+from src.device_watcher import DeviceWatcher
 
 ## TODO(s):
-##  - Fix the errors from the Streamer.bot websocket when the program stops.
-##  - Figure out why the logs rotator isn't cleaning out old logs.
 ##  - Get the PyGame logger to stop spitting out it's nasty, disgusting hello message.
 ##  - Actually become a good programmer (this might be lowkey impossible tho)
 
@@ -32,101 +35,239 @@ STREAMER_BOT_ADDRESS: str = os.getenv("STREAMER_BOT_ADDRESS")
 STREAMER_BOT_PORT: int = int(os.getenv("STREAMER_BOT_PORT"))
 
 
-# Function to fetch the device in /dev/input
-async def fetchDevicePath(device_vendor_id: str, device_product_id: str) -> str | None:
-    log.info("Looking for device...")
+# Function to load the list of input devices from the config
+def loadDeviceConfigs(config: dict) -> list[dict]:
+    # Fall back to the single device at the top of the config if none are listed
+    device_configs: list[dict] = config.get("devices") or [{
+        "name": "side panel",
+        "vendor_id": config.get("device_vendor_id"),
+        "product_id": config.get("device_product_id")
+    }]
+
+    names: set[str] = set()
+    for device_config in device_configs:
+        name: str = device_config.get("name", "")
+
+        # Handle if the device's vendor ID or product ID are unset
+        if not device_config.get("vendor_id") or not device_config.get("product_id"):
+            raise ValueError(
+                f"You forgot to specify either the vendor ID or product ID of device \"{name}\", dingus!"
+            )
+
+        # Handle a missing or repeated name, since events are routed to each device's keymap by it
+        if not name or name in names:
+            raise ValueError(f"Every device needs its own name, but \"{name}\" is missing or used more than once!")
+        names.add(name)
+
+        # Flip the button names to codes, the way the side panel stores them
+        if "buttons" in device_config:
+            try:
+                device_config["button_codes"] = {
+                    int(code): button_name for button_name, code in device_config["buttons"].items()
+                }
+
+            except (AttributeError, TypeError, ValueError):
+                raise ValueError(f"The buttons of device \"{name}\" have to map button names to key codes!")
+
+    return device_configs
+
+
+# Function to create the handler for every event coming off of the devices
+## It's kept outside of main so the benchmarks can drive the exact same dispatch path.
+def createInputHandler(
+        side_panels: dict[str, LogitechSidePanel],
+        event_journal: EventJournal | None = None
+) -> Callable[[str, evdev.InputEvent], Awaitable[None]]:
+    # Fetch the logger for input events, which is separate so its debug logs can be turned off on their own
+    input_log: logging.Logger = getSubsystemLogger("input")
+
+    async def handleInputEvent(source: str, event: evdev.InputEvent) -> None:
+        # Fetch the side panel the event's device belongs to
+        side_panel: LogitechSidePanel = side_panels[source]
+
+        # Record the raw event
+        if event_journal:
+            event_journal.recordInput(
+                event.sec, event.usec, event.type, event.code, event.value, side_panel.device_index
+            )
+
+        # Sync events, which end each frame of events
+        ## Both the axes and buttons only act once a whole frame is in.
+        if event.type == ecodes.EV_SYN:
+            side_panel.axes.handleEvent(event)
+            await side_panel.chords.handleEvent(event)
+
+        # Absolute axis events, typical for joysticks
+        ## The axis processor only acts once per frame, and throttles what it does from there.
+        elif event.type == ecodes.EV_ABS:
+            side_panel.axes.handleEvent(event)
+
+        # Key event, button presses
+        elif event.type == ecodes.EV_KEY:
+            if event.code in side_panel.button_codes:
+                # Hand the press or release over to be grouped with the rest of its frame
+                ## Presses are handled at the end of the frame, once it's known whether they make up a chord.
+                await side_panel.chords.handleEvent(event)
+
+            elif event.value == 1:  # Key press (value 0 is release)
+                # Print to console if the button isn't recognized
+                input_log.warning("Unrecognized button code on %s: %d", side_panel.name, event.code)
+
+        return
+
+    return handleInputEvent
+
+
+# Function to keep reading from a device, finding it again whenever it's lost
+async def readDevices(
+        device_config: dict,
+        input_pipeline: InputPipeline,
+        claimed_paths: set[str],
+        side_panel: LogitechSidePanel
+) -> None:
+    # Create the watcher that finds the device, and waits for it to be plugged in
+    ## The claimed paths are shared between every device, so identical ones don't both grab the same node.
+    device_watcher: DeviceWatcher = DeviceWatcher(
+        vendor_id=device_config["vendor_id"],
+        product_id=device_config["product_id"],
+        phys=device_config.get("phys"),
+        claimed=claimed_paths
+    )
+    name: str = device_config["name"]
 
-    # Convert the Hexadecimal(base-16) values to a decimal(base-10) value
-    device_vendor_id: int = int(device_vendor_id, 16)
-    device_product_id: int = int(device_product_id, 16)
+    # Create a variable for the path of the device last lost, so it isn't picked up again before it's gone
+    lost_device_path: str | None = None
 
     while True:
-        devices: list[InputDevice] = [InputDevice(path) for path in evdev.list_devices()]
+        # Fetch the device's path
+        log.info(f"Looking for {name}...")
+        device_path: str = await device_watcher.waitForDevice(skip=lost_device_path)
+
+        try:
+            # Open the device
+            device: InputDevice = InputDevice(device_path)
+
+        # Handle if it went away again already
+        except OSError as error:
+            log.warning(f"Couldn't open {device_path}: {error}")
+            lost_device_path = device_path
+            continue
+
+        log.info(f"Listening to events from {name} at {device_path}...")
+        claimed_paths.add(device_path)
+        # Let the side panel read back which keys are held, to catch up if the kernel drops events
+        side_panel.chords.held_keys = device.active_keys
+        try:
+            # Read events from the device until it's lost
+            ## Only the events the device's side panel does anything with are decoded.
+            await input_pipeline.readDevice(device, name, side_panel.event_filter)
 
-        for device in devices:
-            if (device.info.vendor == device_vendor_id) and (device.info.product == device_product_id):
-                return device.path
+        except OSError:
+            log.error(f"Lost connection to {name}, attempting reconnect...")
+            lost_device_path = device_path
 
-        # Wait half a second at each interval before trying again
-        await asyncio.sleep(0.5)
+        finally:
+            # Close the device so its file descriptor isn't leaked, and let other devices have its path
+            side_panel.chords.held_keys = None
+            device.close()
+            claimed_paths.discard(device_path)
 
 
 # Main program loop
-async def main() -> None:
+async def main() -> int:
     # Load the config
     log.debug("Loading config...")
     config: dict = tomllib.load(open("config.toml", 'rb'))
 
-    # Handle if the device's vendor ID or product ID are unset
-    if not config.get("device_vendor_id") or not config.get("device_product_id"):
-        raise ValueError("You forgot to specify either your device vendor ID or product ID, dingus!")
+    # Load the list of devices to read from
+    device_configs: list[dict] = loadDeviceConfigs(config)
 
     # Create the connection to Streamer.bot
     streamer_bot: StreamerBotWebsocket = StreamerBotWebsocket(
         url=STREAMER_BOT_ADDRESS,
-        port=STREAMER_BOT_PORT
+        port=STREAMER_BOT_PORT,
+        event_queue_size=config.get("event_queue_size", 256),
+        event_queue_policy=config.get("event_queue_policy", "drop"),
+        reconnect_delay_max=config.get("reconnect_delay_max", 10),
+        outbox_ttl=config.get("outbox_ttl", 10)
     )
-    # Connect to it
-    log.info("Attempting connection to Streamer.bot...")
-    await streamer_bot.connect()
 
-    # Create an object of the Logitech side panel class
-    side_panel: LogitechSidePanel = LogitechSidePanel(
-        streamer_bot_ws_instance=streamer_bot
+    # Open the event journal, which keeps a binary record of every input event and what came of it
+    event_journal: EventJournal | None = EventJournal(
+        path=config.get("journal_path", "logs/events.journal"),
+        capacity=config.get("journal_capacity", 65536)
+    ) if config.get("journal_enabled", True) else None
+
+    # Create an object of the Logitech side panel class for each device, each with its own keymap
+    ## The first one creates the music player, notifications, gesture timer wheel and action executor, and the rest
+    ## share them.
+    side_panels: dict[str, LogitechSidePanel] = {}
+    for device_index, device_config in enumerate(device_configs):
+        first_panel: LogitechSidePanel | None = next(iter(side_panels.values()), None)
+        side_panels[device_config["name"]] = LogitechSidePanel(
+            streamer_bot_ws_instance=streamer_bot,
+            journal_instance=event_journal,
+            name=device_config["name"],
+            device_index=device_index,
+            keymap_file=device_config.get("keymap_file"),
+            button_codes=device_config.get("button_codes"),
+            music_player=first_panel.music_player if first_panel else None,
+            notifications=first_panel.notifications if first_panel else None,
+            timer_wheel=first_panel.timer_wheel if first_panel else None,
+            action_executor=first_panel.executor if first_panel else None
+        )
+    side_panel: LogitechSidePanel = next(iter(side_panels.values()))
+
+    # Create the handler for every event coming off of the devices
+    handleInputEvent: Callable[[str, evdev.InputEvent], Awaitable[None]] = createInputHandler(
+        side_panels=side_panels,
+        event_journal=event_journal
     )
 
-    while True:
-        # Fetch the device's path
-        device_path: str = await fetchDevicePath(
-            device_vendor_id=config.get("device_vendor_id"),
-            device_product_id=config.get("device_product_id")
-        )
+    # Create the input pipeline, which reads the devices without blocking the event loop
+    ## The websocket's background tasks would starve between key presses otherwise.
+    input_pipeline: InputPipeline = InputPipeline(
+        handler=handleInputEvent,
+        queue_size=config.get("input_queue_size", 256)
+    )
 
-        # Open the device
-        device: InputDevice = InputDevice(device_path)
+    # Create the supervisor, which owns every long-lived task and shuts everything down in a bounded time
+    supervisor: Supervisor = Supervisor(shutdown_timeout=config.get("shutdown_timeout", 5))
+    supervisor.installSignalHandlers()
 
-        log.info(f"Listening to events from {device_path}...")
-        try:
-            for event in device.read_loop():
-                if event.type == evdev.ecodes.EV_ABS:  # Absolute axis event, typical for joysticks
-                    abs_event: evdev.events.AbsEvent = evdev.categorize(event)
-                    axis: int = abs_event.event.code
-                    value: int = abs_event.event.value
-
-                    # Print the axis code and its corresponding value (joystick position)
-                    log.debug(f"Axis: {axis}, Value: {value}")
-
-                    # You can add specific conditions to handle different axes or ranges of values
-                    # Example: Move left or right based on axis 1 values
-                    if axis == evdev.ecodes.ABS_X:  # Horizontal movement axis
-                        if value < 128:
-                            log.debug("Joystick moved left")
-                        elif value > 128:
-                            log.debug("Joystick moved right")
-
-                    elif axis == evdev.ecodes.ABS_Y:  # Vertical movement axis
-                        if value < 128:
-                            log.debug("Joystick moved up")
-                        elif value > 128:
-                            log.debug("Joystick moved down")
-
-                # Key event, button presses
-                elif event.type == ecodes.EV_KEY:
-                    if event.value == 1:  # Key press (value 0 is release)
-                        if event.code in side_panel.button_codes:
-                            # Handle a button press
-                            await side_panel.handleButtonPress(code=event.code)
-
-                        else:
-                            # Print to console if the button isn't recognized
-                            log.warning(f"Unrecognized button code: {event.code}")
-
-                    else:
-                        # Something can be done here upon the button release, if desired
-                        pass
+    # Keep connected to Streamer.bot. It reconnects on its own, so it only gets restarted if it crashes.
+    log.info("Attempting connection to Streamer.bot...")
+    supervisor.addTask("Streamer.bot connection", streamer_bot.run)
+    # Keep handing input events over to the side panel
+    supervisor.addTask("Input dispatcher", input_pipeline.run, critical=True)
+    # And keep reading them from every device, each on its own so one being unplugged doesn't affect the rest
+    ## A reader is only critical when it's the only one, since there's nothing left to do without it.
+    claimed_paths: set[str] = set()
+    for device_config in device_configs:
+        supervisor.addTask(
+            f"Input reader: {device_config['name']}",
+            lambda device_config=device_config: readDevices(
+                device_config, input_pipeline, claimed_paths, side_panels[device_config["name"]]
+            ),
+            restart="always",
+            critical=len(device_configs) == 1
+        )
 
-        except OSError:
-            log.error("Lost connection to device, attempting reconnect...")
+    # Clean up everything that isn't a task once they've all stopped, in the reverse of this order
+    if event_journal:
+        supervisor.addCleanup("event journal", event_journal.close)
+    supervisor.addCleanup("music player", lambda: side_panel.music_player.close(timeout=1))
+    supervisor.addCleanup("gesture timer wheel", side_panel.timer_wheel.close)
+    supervisor.addCleanup("action executor", side_panel.executor.close)
+    for panel in side_panels.values():
+        supervisor.addCleanup(f"{panel.name} axes", panel.axes.close)
+        supervisor.addCleanup(f"{panel.name} gestures", panel.gestures.close)
+        supervisor.addCleanup(f"{panel.name} chords", panel.chords.close)
+    supervisor.addCleanup("notifications", side_panel.notifications.close)
+    supervisor.addCleanup("event handlers", streamer_bot.events.close)
+
+    # Run until told to stop
+    return await supervisor.run()
 
 
 # Main program execution
@@ -140,7 +281,7 @@ if __name__ == "__main__":
     return_code: int = 0
 
     # Create the program loop
-    loop: asyncio.AbstractEventLoop | None = asyncio.new_event_loop()
+    loop: asyncio.AbstractEventLoop = asyncio.new_event_loop()
 
     try:
         # Run environment checks
@@ -152,11 +293,16 @@ if __name__ == "__main__":
         log = configureLogger()
 
         # Run the program
-        loop.run_until_complete(main())
+        ## The supervisor handles Ctrl+C itself, and returns the code to exit with once everything has stopped.
+        return_code = loop.run_until_complete(main())
 
     except KeyboardInterrupt:
         log.info("Shutting down!")
 
+    # Handle being told to exit, which is how a second Ctrl+C during shutdown gets out
+    except SystemExit as exit_request:
+        return_code = exit_request.code if isinstance(exit_request.code, int) else 1
+
     except Exception as error:
         log.fatal(f"Process failed with the following error: {error}")
         traceback.print_exc()
@@ -165,8 +311,8 @@ if __name__ == "__main__":
         return_code = 1
 
     finally:
-        # Gracefully stop the event loop
-        loop.stop()
+        # Close the event loop
+        ## Tasks are deliberately not waited on here, since anything still around was given up on by the supervisor.
         loop.run_until_complete(loop.shutdown_asyncgens())
         loop.close()
 
@@ -0,0 +1,120 @@
+# Imports
+import asyncio
+import logging
+from typing import TYPE_CHECKING
+from src.logger import getSubsystemLogger
+
+if TYPE_CHECKING:
+    from src.streamer_bot_ws import StreamerBotWebsocket
+
+
+class ActionCatalog:
+    def __init__(self, streamer_bot_ws_instance: "StreamerBotWebsocket") -> None:
+        """
+        An in-memory copy of the actions present in Streamer.bot, indexed by name.
+        It's filled once upon connecting, and refreshed whenever Streamer.bot reports
+        that an action was added, changed or deleted, so looking an action up never
+        needs a round trip to Streamer.bot.
+
+        :param streamer_bot_ws_instance: The websocket client to fetch actions with.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the Streamer.bot websocket client class-accessible
+        self._streamer_bot: "StreamerBotWebsocket" = streamer_bot_ws_instance
+        del streamer_bot_ws_instance  # Cleanup
+
+        # Create the index of lowercase action names to their IDs
+        self._ids_by_name: dict[str, str] = {}
+
+        # Create a variable to store whether the catalog has been filled at least once
+        self.loaded: bool = False
+        """Whether the catalog has been filled from Streamer.bot at least once."""
+
+        # Create a variable to store the refresh task, so overlapping refreshes get merged into one
+        self._refresh_task: asyncio.Task | None = None
+
+        # Create a variable for whether the catalog was invalidated while a refresh was already running
+        ## That refresh could've fetched the actions from before the change, or from a connection that's gone.
+        self._refresh_pending: bool = False
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("websocket")
+
+        return
+
+    def __contains__(self, action_name: str) -> bool:
+        return action_name.lower() in self._ids_by_name
+
+    def __len__(self) -> int:
+        return len(self._ids_by_name)
+
+    def getActionId(self, action_name: str) -> str | None:
+        """
+        Gets the ID of an action by its name. Names are case-insensitive.
+
+        :param action_name: The name of the action in Streamer.bot.
+
+        :returns: ``str | None`` - The ID of the action, or ``None`` if there's no action with that name.
+
+        :raises None:
+        """
+
+        return self._ids_by_name.get(action_name.lower())
+
+    async def refresh(self) -> None:
+        """
+        Fetches every action from Streamer.bot and rebuilds the index.
+
+        :returns: ``None``
+
+        :raises ConnectionError: If the websocket isn't currently connected.
+        :raises TimeoutError: If Streamer.bot didn't respond in time.
+        """
+
+        actions: dict = await self._streamer_bot.get_actions()
+
+        # Build the new index separately and swap it in, so lookups never see a half-built one
+        self._ids_by_name = {action["name"].lower(): action["id"] for action in actions.get("actions", [])}
+        self.loaded = True
+        self._log.debug(f"Loaded {len(self._ids_by_name)} actions from Streamer.bot.")
+
+        return
+
+    def invalidate(self) -> None:
+        """
+        Schedules a refresh of the catalog in the background. If one is already running,
+        another one is run once it's done, so the catalog is always refreshed after the
+        last invalidation.
+        """
+
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_pending = True
+            return
+
+        self._refresh_task = asyncio.create_task(self._refreshInBackground())
+
+        return
+
+    async def _refreshInBackground(self) -> None:
+        """Refreshes the catalog until it's no longer invalidated, logging any errors instead of raising them."""
+
+        while True:
+            self._refresh_pending = False
+
+            try:
+                await self.refresh()
+
+            # Keep the old index around if the refresh failed
+            except Exception as error:
+                self._log.error(
+                    f"Failed to refresh the Streamer.bot action catalog with the following error: {error}"
+                )
+
+            if not self._refresh_pending:
+                break
+
+        return
@@ -0,0 +1,149 @@
+# Imports
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+from src.logger import getSubsystemLogger
+
+
+class ActionExecutor:
+    def __init__(self, max_concurrency: int = 8, slow_queue_delay: float = 0.1) -> None:
+        """
+        Runs what button presses are bound to concurrently, so one slow action doesn't
+        hold up every press after it. Each job is submitted under a key, and jobs with
+        the same key run one at a time in the order they were submitted, such as every
+        press of a single button, or everything that uses the music player. Jobs with
+        different keys run side by side, up to a limit on how many can run at once.
+
+        :param max_concurrency: The most jobs that can run at once, across every key.
+        :param slow_queue_delay: How long a job can wait to start, in seconds, before it's warned about.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the settings class-accessible
+        self.max_concurrency: int = max_concurrency
+        self.slow_queue_delay: float = slow_queue_delay
+        del slow_queue_delay  # Cleanup
+
+        # Create the semaphore that limits how many jobs run at once
+        self._semaphore: asyncio.Semaphore = asyncio.Semaphore(max_concurrency)
+        del max_concurrency  # Cleanup
+
+        # Create the queue of jobs waiting for each key, each with the loop time it was submitted at,
+        # and the task working through each queue
+        ## Both only exist while the key has jobs, so keys that are done with don't pile up.
+        self._queues: dict[Hashable, deque[tuple[Callable[[float], Awaitable[Any]], float]]] = {}
+        self._workers: dict[Hashable, asyncio.Task] = {}
+
+        # Create counters for how long jobs wait to start
+        self.jobs_started: int = 0
+        """The amount of jobs that have started running."""
+        self.total_queue_delay: float = 0
+        """The total time every started job spent waiting to start, in seconds."""
+        self.max_queue_delay: float = 0
+        """The longest any job has waited to start, in seconds."""
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("input")
+
+        return
+
+    @property
+    def pending(self) -> int:
+        """The amount of jobs waiting to start."""
+
+        return sum(len(queue) for queue in self._queues.values())
+
+    def submit(self, key: Hashable, job: Callable[[float], Awaitable[Any]]) -> None:
+        """
+        Queues a job to run once every job submitted before it under the same key is done.
+
+        :param key: What the job has to keep in order with, such as a button or the music player.
+        :param job: The coroutine function to run. It's called with how long it waited to start, in seconds.
+
+        :returns: ``None``
+
+        :raises RuntimeError: If there's no running event loop.
+        """
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        # Add the job to its key's queue, starting the queue if it's the first job waiting
+        queue: deque[tuple[Callable[[float], Awaitable[Any]], float]] | None = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+        queue.append((job, loop.time()))
+
+        # Start working through the queue if nothing is already
+        if key not in self._workers:
+            self._workers[key] = loop.create_task(self._work(key, queue))
+
+        return
+
+    async def _work(self, key: Hashable, queue: deque[tuple[Callable[[float], Awaitable[Any]], float]]) -> None:
+        """Runs the jobs queued under a key one by one, until there are none left."""
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        try:
+            while queue:
+                job, submitted_at = queue.popleft()
+                slot_requested_at: float = loop.time()
+
+                async with self._semaphore:
+                    # Work out how long the job waited, both behind the jobs before it and for a free slot
+                    started_at: float = loop.time()
+                    queue_delay: float = started_at - submitted_at
+                    self.jobs_started += 1
+                    self.total_queue_delay += queue_delay
+                    self.max_queue_delay = max(self.max_queue_delay, queue_delay)
+
+                    # Warn about long waits, pointing out the limit if that's what it was waiting on
+                    if started_at - slot_requested_at > self.slow_queue_delay:
+                        self._log.warning(
+                            "A button press waited %.0f ms for another to finish. Try raising max_concurrent_actions "
+                            "in the config.", queue_delay * 1000
+                        )
+                    elif queue_delay > self.slow_queue_delay:
+                        self._log.warning(
+                            "A button press waited %.0f ms behind earlier presses using the same thing.",
+                            queue_delay * 1000
+                        )
+
+                    try:
+                        await job(queue_delay)
+
+                    # Pass the error up if it's an Asyncio cancelled error
+                    except asyncio.CancelledError:
+                        raise
+
+                    except Exception as error:
+                        self._log.error("The following error occurred in the input handler: %s", error)
+
+        # Forget about the key once it's out of jobs, or if it was stopped
+        ## There's no await between the queue running out and this, so nothing can be submitted in between.
+        finally:
+            del self._queues[key]
+            del self._workers[key]
+
+        return
+
+    async def close(self) -> None:
+        """Drops every job that's waiting, and stops the ones running."""
+
+        workers: list[asyncio.Task] = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+        # Forget the keys of the stopped workers, since one cancelled before it got to run never cleans up after itself
+        ## Anything submitted while they were stopping has a worker of its own, which is left to keep going.
+        for key, worker in list(self._workers.items()):
+            if worker in workers:
+                del self._queues[key]
+                del self._workers[key]
+
+        return
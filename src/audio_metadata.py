@@ -0,0 +1,490 @@
+# Imports
+import json
+import logging
+import os
+import struct
+import threading
+from typing import Any
+from src.logger import getSubsystemLogger
+
+## Everything in here reads only file headers (and for Ogg files, the last page),
+## so finding out how long a track is never needs the whole file decoded.
+
+# The file extensions that get indexed
+AUDIO_EXTENSIONS: set[str] = {".mp3", ".wav", ".flac", ".ogg", ".opus"}
+
+# MPEG audio bitrates in kbps, keyed by (is MPEG-1, layer)
+_MPEG_BITRATES: dict[tuple[bool, int], tuple[int, ...]] = {
+    (True, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (True, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (True, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (False, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (False, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (False, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# MPEG audio sample rates, keyed by the version bits of the frame header
+_MPEG_SAMPLE_RATES: dict[int, tuple[int, int, int]] = {
+    0: (11025, 12000, 8000),  # MPEG-2.5
+    2: (22050, 24000, 16000),  # MPEG-2
+    3: (44100, 48000, 32000),  # MPEG-1
+}
+
+
+class AudioMetadata:
+    """The metadata of an audio file that matters for playback."""
+
+    __slots__ = ("duration", "bitrate", "sample_rate", "frame_count")
+
+    def __init__(self, duration: float, bitrate: int, sample_rate: int, frame_count: int) -> None:
+        self.duration: float = duration
+        """The length of the track in seconds."""
+        self.bitrate: int = bitrate
+        """The (average) bitrate of the track in bits per second."""
+        self.sample_rate: int = sample_rate
+        """The sample rate of the track in Hz."""
+        self.frame_count: int = frame_count
+        """The amount of frames in the track. For MP3 files these are MPEG frames, and for
+        everything else they are PCM sample frames."""
+
+        return
+
+    def toDict(self) -> dict[str, Any]:
+        return {
+            "duration": self.duration,
+            "bitrate": self.bitrate,
+            "sample_rate": self.sample_rate,
+            "frame_count": self.frame_count
+        }
+
+    @classmethod
+    def fromDict(cls, data: dict[str, Any]) -> "AudioMetadata":
+        return cls(
+            duration=float(data["duration"]),
+            bitrate=int(data["bitrate"]),
+            sample_rate=int(data["sample_rate"]),
+            frame_count=int(data["frame_count"])
+        )
+
+    def __repr__(self) -> str:
+        return (f"AudioMetadata(duration={self.duration:.2f}, bitrate={self.bitrate}, "
+                f"sample_rate={self.sample_rate}, frame_count={self.frame_count})")
+
+
+def _parseMpegHeader(header: bytes) -> tuple[int, int, int, int, int, int] | None:
+    """
+    Parses a four byte MPEG audio frame header.
+
+    :returns: ``tuple | None`` - The version bits, layer, bitrate (bps), sample rate, frame length
+     and samples per frame, or ``None`` if it isn't a valid header.
+    """
+
+    # Check for the frame sync
+    if len(header) < 4 or header[0] != 0xFF or (header[1] & 0xE0) != 0xE0:
+        return None
+
+    version: int = (header[1] >> 3) & 0x03
+    layer: int = 4 - ((header[1] >> 1) & 0x03)
+    bitrate_index: int = header[2] >> 4
+    sample_rate_index: int = (header[2] >> 2) & 0x03
+    padding: int = (header[2] >> 1) & 0x01
+
+    # Throw out reserved or free-format values
+    if version == 1 or layer == 4 or bitrate_index in {0, 15} or sample_rate_index == 3:
+        return None
+
+    is_mpeg_1: bool = version == 3
+    bitrate: int = _MPEG_BITRATES[(is_mpeg_1, layer)][bitrate_index] * 1000
+    sample_rate: int = _MPEG_SAMPLE_RATES[version][sample_rate_index]
+
+    # Work out how big the frame is and how many samples it holds
+    if layer == 1:
+        samples_per_frame: int = 384
+        frame_length: int = (12 * bitrate // sample_rate + padding) * 4
+    elif layer == 2 or is_mpeg_1:
+        samples_per_frame = 1152
+        frame_length = 144 * bitrate // sample_rate + padding
+    else:
+        samples_per_frame = 576
+        frame_length = 72 * bitrate // sample_rate + padding
+
+    return version, layer, bitrate, sample_rate, frame_length, samples_per_frame
+
+
+def _parseMp3(file, file_size: int) -> AudioMetadata | None:
+    """Reads the metadata of an MP3 file from its first frame and Xing/Info/VBRI tag."""
+
+    # Skip over the ID3v2 tag if there is one
+    audio_start: int = 0
+    header: bytes = file.read(10)
+    if header[:3] == b"ID3" and len(header) == 10:
+        # The size is stored as a "syncsafe" integer, with 7 bits used per byte
+        tag_size: int = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        audio_start = 10 + tag_size + (10 if header[5] & 0x10 else 0)
+
+    # Look for the first frame, making sure the frame after it lines up so stray 0xFF bytes aren't mistaken for one
+    file.seek(audio_start)
+    data: bytes = file.read(65536)
+    position: int = data.find(b"\xff")
+    frame: tuple[int, int, int, int, int, int] | None = None
+    while position != -1:
+        frame = _parseMpegHeader(data[position:position + 4])
+        if frame:
+            next_position: int = position + frame[4]
+            if next_position + 4 > len(data) or _parseMpegHeader(data[next_position:next_position + 4]):
+                break
+        frame = None
+        position = data.find(b"\xff", position + 1)
+
+    # Handle if there isn't a frame to be found
+    if not frame:
+        return None
+
+    version, layer, bitrate, sample_rate, frame_length, samples_per_frame = frame
+    audio_start += position
+    channel_mode: int = data[position + 3] >> 6
+
+    # Don't count an ID3v1 tag at the end of the file as audio
+    file.seek(max(file_size - 128, 0))
+    audio_size: int = file_size - audio_start - (128 if file.read(3) == b"TAG" else 0)
+
+    # Check for a Xing/Info tag, which is right after the side info of the first frame
+    if version == 3:
+        side_info_size: int = 17 if channel_mode == 3 else 32
+    else:
+        side_info_size = 9 if channel_mode == 3 else 17
+    xing_offset: int = position + 4 + side_info_size
+    frame_count: int | None = None
+    byte_count: int | None = None
+
+    if data[xing_offset:xing_offset + 4] in {b"Xing", b"Info"}:
+        flags: int = struct.unpack(">I", data[xing_offset + 4:xing_offset + 8])[0]
+        field_offset: int = xing_offset + 8
+        if flags & 0x01:
+            frame_count = struct.unpack(">I", data[field_offset:field_offset + 4])[0]
+            field_offset += 4
+        if flags & 0x02:
+            byte_count = struct.unpack(">I", data[field_offset:field_offset + 4])[0]
+
+    # Otherwise, check for a VBRI tag, which is always 32 bytes after the frame header
+    elif data[position + 36:position + 40] == b"VBRI":
+        byte_count, frame_count = struct.unpack(">II", data[position + 46:position + 54])
+
+    # Use the tag if there was one, since it's the only way to get the length of a VBR file right
+    if frame_count:
+        duration: float = frame_count * samples_per_frame / sample_rate
+        average_bitrate: int = int((byte_count or audio_size) * 8 / duration) if duration else bitrate
+
+        return AudioMetadata(duration, average_bitrate, sample_rate, frame_count)
+
+    # Otherwise, the file is assumed to be CBR, so the length can be worked out from its size
+    return AudioMetadata(
+        duration=audio_size * 8 / bitrate,
+        bitrate=bitrate,
+        sample_rate=sample_rate,
+        frame_count=audio_size // frame_length if frame_length else 0
+    )
+
+
+def _parseWav(file, file_size: int) -> AudioMetadata | None:
+    """Reads the metadata of a WAV file from its fmt and data chunks."""
+
+    header: bytes = file.read(12)
+    if header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+
+    byte_rate: int | None = None
+    block_align: int = 0
+    sample_rate: int = 0
+
+    # Walk through the chunks until the data chunk is found
+    while True:
+        chunk_header: bytes = file.read(8)
+        if len(chunk_header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+
+        if chunk_id == b"fmt ":
+            fmt: bytes = file.read(chunk_size)
+            _, _, sample_rate, byte_rate, block_align = struct.unpack("<HHIIH", fmt[:14])
+            # Chunks are padded to an even size
+            file.seek(chunk_size % 2, os.SEEK_CUR)
+
+        elif chunk_id == b"data":
+            if not byte_rate or not block_align:
+                return None
+
+            # Some encoders don't fill in the size of the data chunk when streaming
+            data_size: int = min(chunk_size, file_size - file.tell())
+
+            return AudioMetadata(
+                duration=data_size / byte_rate,
+                bitrate=byte_rate * 8,
+                sample_rate=sample_rate,
+                frame_count=data_size // block_align
+            )
+
+        else:
+            file.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def _parseFlac(file, file_size: int) -> AudioMetadata | None:
+    """Reads the metadata of a FLAC file from its STREAMINFO block."""
+
+    header: bytes = file.read(4 + 4 + 34)
+    # STREAMINFO is always the first metadata block
+    if header[:4] != b"fLaC" or (header[4] & 0x7F) != 0 or len(header) < 42:
+        return None
+
+    # The sample rate, channels, bits per sample and total samples are packed into 64 bits
+    packed: int = int.from_bytes(header[18:26], "big")
+    sample_rate: int = packed >> 44
+    total_samples: int = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        return None
+
+    duration: float = total_samples / sample_rate
+
+    return AudioMetadata(duration, int(file_size * 8 / duration), sample_rate, total_samples)
+
+
+def _parseOgg(file, file_size: int) -> AudioMetadata | None:
+    """Reads the metadata of an Ogg Vorbis or Opus file from its first and last pages."""
+
+    first_page: bytes = file.read(128)
+    if first_page[:4] != b"OggS":
+        return None
+
+    # The identification header comes right after the segment table of the first page
+    packet: bytes = first_page[27 + first_page[26]:]
+    if packet[:7] == b"\x01vorbis":
+        sample_rate: int = struct.unpack("<I", packet[12:16])[0]
+        pre_skip: int = 0
+    elif packet[:8] == b"OpusHead":
+        # Opus always plays back at 48kHz, whatever the input sample rate was
+        sample_rate = 48000
+        pre_skip = struct.unpack("<H", packet[10:12])[0]
+    else:
+        return None
+
+    # The granule position of the last page is the total amount of samples
+    file.seek(max(file_size - 65536, 0))
+    tail: bytes = file.read()
+    last_page: int = tail.rfind(b"OggS")
+    if last_page == -1 or not sample_rate:
+        return None
+    total_samples: int = struct.unpack("<q", tail[last_page + 6:last_page + 14])[0] - pre_skip
+    if total_samples <= 0:
+        return None
+
+    duration: float = total_samples / sample_rate
+
+    return AudioMetadata(duration, int(file_size * 8 / duration), sample_rate, total_samples)
+
+
+def readAudioMetadata(path: str) -> AudioMetadata | None:
+    """
+    Reads the metadata of an audio file from its headers, without decoding it.
+
+    :param path: The path to the audio file.
+
+    :returns: ``AudioMetadata | None`` - The metadata of the file, or ``None`` if
+     the format isn't supported or the file couldn't be made sense of.
+
+    :raises OSError: If the file couldn't be read.
+    """
+
+    parsers: dict = {
+        ".mp3": _parseMp3,
+        ".wav": _parseWav,
+        ".flac": _parseFlac,
+        ".ogg": _parseOgg,
+        ".opus": _parseOgg,
+    }
+    parser = parsers.get(os.path.splitext(path)[1].lower())
+    if not parser:
+        return None
+
+    with open(path, "rb") as file:
+        try:
+            return parser(file, os.fstat(file.fileno()).st_size)
+
+        # Truncated or otherwise broken files
+        except (struct.error, IndexError, ZeroDivisionError):
+            return None
+
+
+class AudioMetadataIndex:
+    def __init__(self, cache_path: str = "cache/audio_metadata.json") -> None:
+        """
+        A persistent index of audio file metadata. Entries are keyed by the absolute
+        path of the file, and are thrown out if the file's modification time or size
+        changes.
+
+        :param cache_path: The path to the file the index is cached in.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the cache path class-accessible
+        self._cache_path: str = cache_path
+        del cache_path  # Cleanup
+
+        # Create a lock, since the index is scanned in a background thread
+        self._lock: threading.Lock = threading.Lock()
+
+        # Create a lock for writing the cache, since it can be saved from several threads at once
+        ## It's held for the whole write, so saves can't clobber each other's temporary file, and the newest
+        ## snapshot is always the one that ends up on disk.
+        self._write_lock: threading.Lock = threading.Lock()
+
+        # Create the index itself, keyed by absolute path
+        self._entries: dict[str, dict[str, Any]] = {}
+
+        # Create a variable to store whether the index has changed since it was last saved
+        self._dirty: bool = False
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("music")
+
+        # Load whatever was cached the last time
+        self._load()
+
+        return
+
+    def _load(self) -> None:
+        """Loads the cached index from disk."""
+
+        try:
+            with open(self._cache_path, "r") as file:
+                data: dict = json.load(file)
+            if data.get("version") == 1:
+                self._entries = data.get("files", {})
+
+        except FileNotFoundError:
+            pass
+
+        # A broken cache just gets rebuilt
+        except (OSError, ValueError) as error:
+            self._log.warning(f"Couldn't read the audio metadata cache, rebuilding it. Error: {error}")
+
+        return
+
+    def save(self) -> None:
+        """Writes the index to disk if it changed."""
+
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data: str = json.dumps({"version": 1, "files": self._entries})
+                self._dirty = False
+
+            # Write to a temporary file first, so a crash can't leave a half-written cache behind
+            try:
+                os.makedirs(os.path.dirname(self._cache_path) or ".", exist_ok=True)
+                with open(f"{self._cache_path}.tmp", "w") as file:
+                    file.write(data)
+                os.replace(f"{self._cache_path}.tmp", self._cache_path)
+
+            # Try again on the next save
+            except OSError as error:
+                with self._lock:
+                    self._dirty = True
+                self._log.warning(f"Couldn't save the audio metadata cache. Error: {error}")
+
+        return
+
+    def get(self, path: str) -> AudioMetadata | None:
+        """
+        Gets the metadata of an audio file, reading its headers if it isn't indexed yet
+        or has changed since it was.
+
+        :param path: The path to the audio file.
+
+        :returns: ``AudioMetadata | None`` - The metadata of the file, or ``None`` if it couldn't be read.
+
+        :raises None:
+        """
+
+        path = os.path.abspath(path)
+
+        try:
+            stat: os.stat_result = os.stat(path)
+        except OSError:
+            return None
+
+        # Use the indexed entry if the file hasn't changed
+        with self._lock:
+            entry: dict[str, Any] | None = self._entries.get(path)
+        if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+            return AudioMetadata.fromDict(entry)
+
+        # Otherwise, read it from the file
+        try:
+            metadata: AudioMetadata | None = readAudioMetadata(path)
+        except OSError as error:
+            self._log.warning(f"Couldn't read the metadata of \"{path}.\" Error: {error}")
+            return None
+
+        if not metadata:
+            return None
+
+        with self._lock:
+            self._entries[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size} | metadata.toDict()
+            self._dirty = True
+
+        return metadata
+
+    def scan(self, directory: str) -> None:
+        """
+        Indexes every audio file in a directory and its subdirectories, and saves the index.
+        Files that are already indexed and haven't changed are skipped.
+
+        :param directory: The directory to scan.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        directory = os.path.abspath(directory)
+        seen: set[str] = set()
+
+        for root, _, files in os.walk(directory):
+            for file_name in files:
+                if os.path.splitext(file_name)[1].lower() in AUDIO_EXTENSIONS:
+                    path: str = os.path.join(root, file_name)
+                    seen.add(path)
+                    self.get(path)
+
+        # Forget files in the directory that don't exist anymore
+        with self._lock:
+            for path in [path for path in self._entries if path.startswith(directory + os.sep) and path not in seen]:
+                del self._entries[path]
+                self._dirty = True
+
+        self._log.debug(f"Indexed {len(seen)} audio files in \"{directory}.\"")
+        self.save()
+
+        return
+
+    def scanInBackground(self, directory: str) -> threading.Thread:
+        """
+        Scans a directory in a background thread.
+
+        :param directory: The directory to scan.
+
+        :returns: ``threading.Thread`` - The thread doing the scan.
+
+        :raises None:
+        """
+
+        thread: threading.Thread = threading.Thread(
+            target=self.scan, args=(directory,), name="audio-metadata-scan", daemon=True
+        )
+        thread.start()
+
+        return thread
@@ -0,0 +1,245 @@
+# Imports
+import asyncio
+import logging
+import time
+from evdev import InputEvent, ecodes
+from typing import Any, Awaitable, Callable
+from src.keymap import AxisBinding
+from src.logger import getSubsystemLogger
+
+
+class _AxisState:
+    """What's known about a single bound axis."""
+
+    __slots__ = (
+        "binding", "handler", "frame_value", "accepted", "output", "pending", "last_dispatch", "timer", "task"
+    )
+
+    def __init__(self, binding: AxisBinding, handler: Callable[..., Awaitable[Any]]) -> None:
+        self.binding: AxisBinding = binding
+        self.handler: Callable[..., Awaitable[Any]] = handler
+        # The latest raw value in the current sync frame, if the axis moved in it
+        self.frame_value: int | None = None
+        # The last raw value that made it through the deadzone and hysteresis
+        self.accepted: float | None = None
+        # The last value handed to the handler, and the newest one waiting to be
+        self.output: float | None = None
+        self.pending: float | None = None
+        # When the handler was last called, on the monotonic clock
+        self.last_dispatch: float = 0
+        # The timer for a throttled dispatch, and the task of the one running
+        self.timer: asyncio.TimerHandle | None = None
+        self.task: asyncio.Task | None = None
+
+        return
+
+
+class AxisProcessor:
+    def __init__(
+            self,
+            bindings: dict[int, AxisBinding],
+            handlers: dict[str, Callable[..., Awaitable[Any]]],
+            max_rate: float = 30
+    ) -> None:
+        """
+        Turns the raw events of a device's axes, such as a joystick, into continuous
+        actions. The kernel sends axis updates in frames ending with a sync event, so
+        only the latest value of each axis in a frame is used. Values then go through
+        the binding's deadzone and hysteresis, are mapped to its output range, and are
+        handed to its handler at most ``max_rate`` times a second. Values that come in
+        faster than that replace each other, and the last one is always handed over,
+        so wiggling the stick can't flood the event loop or the websocket.
+
+        :param bindings: The axis bindings from the keymap, keyed by axis code.
+        :param handlers: The coroutine function to call for each type of binding. It's
+         called with the binding's parameters as keyword arguments, along with the
+         mapped value as ``value``.
+        :param max_rate: The most times a second each axis's handler is called.
+
+        :returns: ``None``
+
+        :raises ValueError: If there's no handler for a type of binding used, or the rate isn't positive.
+        """
+
+        # Handle an invalid rate
+        if max_rate <= 0:
+            raise ValueError(f"The axis rate has to be above 0, not {max_rate}!")
+
+        # Create the state of each bound axis, keyed by axis code
+        self._axes: dict[int, _AxisState] = {}
+        for code, binding in bindings.items():
+            if binding.kind not in handlers:
+                raise ValueError(f"There's no handler for \"{binding.kind}\" axis bindings!")
+
+            self._axes[code] = _AxisState(binding, handlers[binding.kind])
+        del bindings, handlers  # Cleanup
+
+        # Create a variable for the least time between calls to an axis's handler, in seconds
+        self.min_interval: float = 1 / max_rate
+        del max_rate  # Cleanup
+
+        # Create a variable for whether events are being thrown out after the kernel dropped some
+        self._dropping: bool = False
+
+        # Create counters for how much the processor has cut down on
+        self.samples: int = 0
+        """The amount of axis events received for bound axes."""
+        self.dispatches: int = 0
+        """The amount of times a handler was called."""
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("input")
+
+        return
+
+    def handleEvent(self, event: InputEvent) -> None:
+        """
+        Takes in an event from the device. Only axis and sync events matter, and the rest are ignored.
+
+        :param event: The event to take in.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        if event.type == ecodes.EV_ABS:
+            state: _AxisState | None = self._axes.get(event.code)
+            if state and not self._dropping:
+                # Only keep the latest value of the frame
+                state.frame_value = event.value
+                self.samples += 1
+
+        elif event.type == ecodes.EV_SYN:
+            # The kernel ran out of room for events, so everything up to the next frame is incomplete
+            if event.code == ecodes.SYN_DROPPED:
+                self._dropping = True
+                for state in self._axes.values():
+                    state.frame_value = None
+
+            # The end of a frame, so handle every axis that moved in it
+            elif event.code == ecodes.SYN_REPORT:
+                if self._dropping:
+                    self._dropping = False
+                    return
+
+                for state in self._axes.values():
+                    if state.frame_value is not None:
+                        self._accept(state, state.frame_value)
+                        state.frame_value = None
+
+        return
+
+    def _accept(self, state: _AxisState, raw_value: int) -> None:
+        """Runs a raw value through the deadzone and hysteresis, queueing its mapped value if it gets through."""
+
+        binding: AxisBinding = state.binding
+
+        # Keep the value in range, and snap it to the centre if it's within the deadzone
+        value: float = min(max(raw_value, binding.minimum), binding.maximum)
+        centre: float = (binding.minimum + binding.maximum) / 2
+        if abs(value - centre) <= binding.deadzone:
+            value = centre
+
+        # Ignore small changes, unless it's reaching the centre or either end, which have to be exact
+        if value == state.accepted:
+            return
+        if (
+                state.accepted is not None
+                and value not in (centre, binding.minimum, binding.maximum)
+                and abs(value - state.accepted) < binding.hysteresis
+        ):
+            return
+        state.accepted = value
+
+        # Map the value to the output range
+        position: float = (value - binding.minimum) / (binding.maximum - binding.minimum)
+        if binding.invert:
+            position = 1 - position
+        output: float = binding.output[0] + position * (binding.output[1] - binding.output[0])
+        ## Keep whole numbers whole, if the output range is
+        if isinstance(binding.output[0], int) and isinstance(binding.output[1], int):
+            output = round(output)
+
+        state.pending = output
+        self._schedule(state)
+
+        return
+
+    def _schedule(self, state: _AxisState) -> None:
+        """Hands the pending value over now if the axis isn't throttled, or once it stops being."""
+
+        # Wait for the running handler to finish, which schedules the pending value itself
+        if (state.task and not state.task.done()) or state.timer:
+            return
+
+        wait: float = state.last_dispatch + self.min_interval - time.monotonic()
+        if wait <= 0:
+            self._dispatch(state)
+        else:
+            state.timer = asyncio.get_running_loop().call_later(wait, self._onTimer, state)
+
+        return
+
+    def _onTimer(self, state: _AxisState) -> None:
+        """Hands over the value that was held back by the throttle."""
+
+        state.timer = None
+        self._dispatch(state)
+
+        return
+
+    def _dispatch(self, state: _AxisState) -> None:
+        """Calls the axis's handler with the pending value in the background."""
+
+        value: float | None = state.pending
+        state.pending = None
+
+        # Nothing to do if the value ended up back where it was
+        if value is None or value == state.output:
+            return
+
+        state.output = value
+        state.last_dispatch = time.monotonic()
+        self.dispatches += 1
+        state.task = asyncio.create_task(self._run(state, value))
+
+        return
+
+    async def _run(self, state: _AxisState, value: float) -> None:
+        """Runs the handler for a single value."""
+
+        try:
+            self._log.debug("%s: %s", state.binding.axis_name, value)
+            await state.handler(value=value, **state.binding.params)
+
+        # Pass the error up if it's an Asyncio cancelled error
+        except asyncio.CancelledError:
+            raise
+
+        # Don't let one failed call stop the axis from working
+        except Exception as error:
+            self._log.error("The following error occurred handling %s: %s", state.binding.axis_name, error)
+
+        finally:
+            state.task = None
+            # Hand over whatever came in while the handler was running
+            if state.pending is not None:
+                self._schedule(state)
+
+    async def close(self) -> None:
+        """Cancels any throttled values and running handlers."""
+
+        tasks: list[asyncio.Task] = []
+        for state in self._axes.values():
+            if state.timer:
+                state.timer.cancel()
+                state.timer = None
+            if state.task:
+                state.task.cancel()
+                tasks.append(state.task)
+            state.pending = None
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        return
@@ -0,0 +1,255 @@
+# Imports
+import asyncio
+import logging
+from evdev import InputEvent, ecodes
+from typing import Any, Awaitable, Callable, Iterable
+from src.logger import getSubsystemLogger
+
+
+class ChordResolver:
+    def __init__(
+            self,
+            chords_for: Callable[[], dict[frozenset[int], Any]],
+            on_press: Callable[[int, float], Awaitable[Any]],
+            on_chord: Callable[[frozenset[int], float], Awaitable[Any]],
+            on_release: Callable[[int, float], Awaitable[Any]],
+            window: float = 0.05
+    ) -> None:
+        """
+        Groups a device's key events into the frames the kernel sends them in, which
+        end with a sync event, and works out which presses make up a chord. Buttons
+        pressed in the same frame, or within the chord window of each other, that
+        match a chord fire the chord alone instead of each of their own bindings.
+        Presses of buttons that aren't part of any chord are handed over right away,
+        so only chord buttons ever wait on the window. Releases are handed over after
+        the press they end, except for those of buttons that were part of a chord. If
+        the kernel drops events, the buttons still held are read back from the device,
+        so a release lost in the gap doesn't leave a button stuck down.
+
+        :param chords_for: A function giving the chords currently bound, keyed by the codes of their buttons.
+        :param on_press: The coroutine function to call for a single button press, with its code and time.
+        :param on_chord: The coroutine function to call for a chord, with the codes of its buttons and the
+         time of its first press.
+        :param on_release: The coroutine function to call for the release of a button whose press was handed
+         over, with its code and time.
+        :param window: How long to wait for the rest of a chord after one of its buttons is pressed, in seconds.
+         0 only makes chords out of buttons pressed in the same frame.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the callbacks and window class-accessible
+        self._chords_for: Callable[[], dict[frozenset[int], Any]] = chords_for
+        self._on_press: Callable[[int, float], Awaitable[Any]] = on_press
+        self._on_chord: Callable[[frozenset[int], float], Awaitable[Any]] = on_chord
+        self._on_release: Callable[[int, float], Awaitable[Any]] = on_release
+        self.window: float = window
+        del chords_for, on_press, on_chord, on_release, window  # Cleanup
+
+        # Create the lists of key events in the current frame, and presses waiting to be resolved
+        self._frame: list[InputEvent] = []
+        self._pending: list[tuple[int, float]] = []
+
+        # Create the set of buttons held down as part of a chord, whose releases aren't handed over,
+        # and the set of buttons whose presses were handed over and haven't been released yet
+        self._chorded: set[int] = set()
+        self._handed: set[int] = set()
+
+        # Create a variable for the function giving the keys currently held on the device
+        self.held_keys: Callable[[], Iterable[int]] | None = None
+        """
+        A function giving the codes of the keys currently held on the device, such as
+        ``InputDevice.active_keys``, used to catch up after the kernel drops events. Every
+        button is taken as released if it isn't set.
+        """
+
+        # Create a variable for whether events are being thrown out after the kernel dropped some
+        self._dropping: bool = False
+
+        # Create variables for the chord window's timer, and the tasks it starts
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("input")
+
+        return
+
+    async def handleEvent(self, event: InputEvent) -> None:
+        """
+        Takes in an event from the device. Only key and sync events matter, and the rest are ignored.
+
+        :param event: The event to take in.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        if event.type == ecodes.EV_KEY:
+            # Key repeats don't count as presses
+            if event.value != 2 and not self._dropping:
+                self._frame.append(event)
+
+        elif event.type == ecodes.EV_SYN:
+            # The kernel ran out of room for events, so everything up to the next frame is incomplete
+            if event.code == ecodes.SYN_DROPPED:
+                self._dropping = True
+                self._frame.clear()
+
+            # The end of a frame, so handle every key event in it
+            elif event.code == ecodes.SYN_REPORT:
+                if self._dropping:
+                    self._dropping = False
+                    await self._resync(event.timestamp())
+                    return
+
+                frame: list[InputEvent] = self._frame
+                self._frame = []
+                await self._endFrame(frame)
+
+        return
+
+    async def _endFrame(self, frame: list[InputEvent]) -> None:
+        """Hands over or holds back every press in a frame, then tries to resolve what's being held back."""
+
+        chords: dict[frozenset[int], Any] = self._chords_for()
+
+        # The releases of buttons being held back, which have to wait until their presses are handed over
+        released: list[tuple[int, float]] = []
+        for event in frame:
+            if event.value == 0:
+                # A button that's waiting on a chord being let go means the chord isn't happening
+                if any(code == event.code for code, _ in self._pending):
+                    released.append((event.code, event.timestamp()))
+                elif event.code in self._chorded:
+                    self._chorded.discard(event.code)
+                else:
+                    self._handed.discard(event.code)
+                    await self._on_release(event.code, event.timestamp())
+                continue
+
+            self._chorded.discard(event.code)
+
+            # Hold the press back if it could be part of a chord, or something before it is being held back
+            if self._pending or any(event.code in chord for chord in chords):
+                self._pending.append((event.code, event.timestamp()))
+            else:
+                await self._handOver(event.code, event.timestamp())
+
+        if not self._pending:
+            return
+
+        codes: frozenset[int] = frozenset(code for code, _ in self._pending)
+        # Fire the chord if every one of its buttons is down
+        if codes in chords and not released:
+            event_time: float = self._takePending()[0][1]
+            self._log.debug("Chord of codes %s pressed.", sorted(codes))
+            self._chorded |= codes
+            await self._on_chord(codes, event_time)
+
+        # Hand the presses over one by one if they can't become a chord anymore, followed by any releases of them
+        elif released or not any(codes < chord for chord in chords):
+            await self._flush()
+            for code, event_time in released:
+                self._handed.discard(code)
+                await self._on_release(code, event_time)
+
+        # Otherwise, give the rest of the chord until the end of the window to show up
+        elif not self._timer:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._onWindowEnd)
+
+        return
+
+    async def _resync(self, event_time: float) -> None:
+        """Catches up on the buttons released while the kernel was dropping events."""
+
+        # Read back which keys are still held, taking every button as released if that isn't possible
+        held: set[int] = set()
+        if self.held_keys:
+            try:
+                held = set(self.held_keys())
+
+            except OSError as error:
+                self._log.warning("Couldn't read back the keys held after events were dropped: %s", error)
+
+        self._log.warning("The kernel dropped input events, so buttons let go of in the meantime are being released.")
+
+        # Chords can't be finished by buttons that were let go of
+        self._chorded &= held
+        if any(code not in held for code, _ in self._pending):
+            await self._flush()
+
+        # Release every button whose release was lost
+        for code in sorted(self._handed - held):
+            self._handed.discard(code)
+            await self._on_release(code, event_time)
+
+        return
+
+    async def _handOver(self, code: int, event_time: float) -> None:
+        """Hands over a single press, keeping track of the button being down."""
+
+        self._handed.add(code)
+        await self._on_press(code, event_time)
+
+        return
+
+    def _takePending(self) -> list[tuple[int, float]]:
+        """Takes every press being held back, stopping the chord window."""
+
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        pending: list[tuple[int, float]] = self._pending
+        self._pending = []
+
+        return pending
+
+    async def _flush(self) -> None:
+        """Hands over every press being held back as a single press."""
+
+        for code, event_time in self._takePending():
+            await self._handOver(code, event_time)
+
+        return
+
+    def _onWindowEnd(self) -> None:
+        """Hands over the presses held back for a chord that never finished."""
+
+        self._timer = None
+        task: asyncio.Task = asyncio.create_task(self._flushLate())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return
+
+    async def _flushLate(self) -> None:
+        """Hands over the held back presses outside of the input dispatcher, which would've logged any errors."""
+
+        try:
+            await self._flush()
+
+        # Pass the error up if it's an Asyncio cancelled error
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as error:
+            self._log.error("The following error occurred in the input handler: %s", error)
+
+        return
+
+    async def close(self) -> None:
+        """Drops any presses being held back, and stops any being handed over."""
+
+        self._takePending()
+        self._chorded.clear()
+        self._handed.clear()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        return
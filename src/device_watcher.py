@@ -0,0 +1,269 @@
+# Imports
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import fnmatch
+import logging
+import os
+import re
+import struct
+from src.logger import getSubsystemLogger
+
+# The inotify flags used, from linux/inotify.h
+_IN_ATTRIB: int = 0x00000004
+_IN_MOVED_TO: int = 0x00000080
+_IN_CREATE: int = 0x00000100
+_IN_DELETE: int = 0x00000200
+_IN_NONBLOCK: int = 0o4000
+_IN_CLOEXEC: int = 0o2000000
+
+# The fixed part of a struct inotify_event: watch descriptor, mask, cookie and name length
+_INOTIFY_EVENT: struct.Struct = struct.Struct("iIII")
+
+# Matches the names of evdev device nodes, such as "event5"
+_EVENT_NODE_PATTERN: re.Pattern = re.compile(r"^event(\d+)$")
+
+# Load inotify from the C library, if it's there
+## It's only missing off of Linux, in which case the watcher falls back to polling sysfs.
+try:
+    _libc: ctypes.CDLL | None = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    _libc.inotify_init1.argtypes = [ctypes.c_int]
+    _libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+except (OSError, AttributeError):
+    _libc = None
+
+
+class DeviceWatcher:
+    def __init__(
+            self,
+            vendor_id: str,
+            product_id: str,
+            phys: str | None = None,
+            claimed: set[str] | None = None,
+            input_directory: str = "/dev/input",
+            sysfs_directory: str = "/sys/class/input"
+    ) -> None:
+        """
+        Finds an input device by its vendor and product IDs, and waits for it to be
+        plugged in if it isn't. Devices are matched using the IDs the kernel puts in
+        sysfs, so no device ever has to be opened just to check what it is, and
+        waiting is done with inotify on the input directory, so a device is found
+        the moment its node shows up. Nothing is kept open while not waiting.
+
+        :param vendor_id: The vendor ID of the device, in hexadecimal.
+        :param product_id: The product ID of the device, in hexadecimal.
+        :param phys: A pattern the physical path of the device has to match, such as
+         "usb-0000:00:14.0-2*", for telling identical devices apart by the port they're in.
+        :param claimed: The paths of devices already being read by other watchers, which are
+         passed over. Share the same set between watchers of identical devices.
+        :param input_directory: The directory the device nodes are in.
+        :param sysfs_directory: The sysfs directory describing the device nodes.
+
+        :returns: ``None``
+
+        :raises ValueError: If either ID isn't valid hexadecimal.
+        """
+
+        # Convert the Hexadecimal(base-16) values to a decimal(base-10) value
+        self.vendor_id: int = int(vendor_id, 16)
+        self.product_id: int = int(product_id, 16)
+
+        # Make the physical path pattern and the claimed devices class-accessible
+        self.phys: str | None = phys
+        self.claimed: set[str] = claimed if claimed is not None else set()
+
+        # Make the directories class-accessible
+        self.input_directory: str = input_directory
+        self.sysfs_directory: str = sysfs_directory
+        del vendor_id, product_id, phys, claimed, input_directory, sysfs_directory  # Cleanup
+
+        # Create a variable for how often to check for the device if inotify isn't available, in seconds
+        self._poll_interval: float = 0.5
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("input")
+
+        return
+
+    def _readSysfsId(self, node_name: str, field: str) -> int | None:
+        """Reads one of the IDs of a device node from sysfs."""
+
+        try:
+            with open(os.path.join(self.sysfs_directory, node_name, "device", "id", field)) as file:
+                return int(file.read().strip(), 16)
+
+        except (OSError, ValueError):
+            return None
+
+    def _readSysfsPhys(self, node_name: str) -> str:
+        """Reads the physical path of a device node from sysfs."""
+
+        try:
+            with open(os.path.join(self.sysfs_directory, node_name, "device", "phys")) as file:
+                return file.read().strip()
+
+        except OSError:
+            return ""
+
+    def _hasKeys(self, node_name: str) -> bool:
+        """Whether a device node reports having any keys, which is what the side panel's buttons are."""
+
+        try:
+            with open(os.path.join(self.sysfs_directory, node_name, "device", "capabilities", "key")) as file:
+                return file.read().strip() not in ("", "0")
+
+        except OSError:
+            return False
+
+    def matches(self, node_name: str) -> bool:
+        """
+        Checks whether a device node belongs to the device being looked for.
+
+        :param node_name: The name of the node in the input directory, such as "event5."
+
+        :returns: ``bool`` - Whether the vendor and product IDs, and physical path if set, of the node match.
+
+        :raises None:
+        """
+
+        return (
+            _EVENT_NODE_PATTERN.match(node_name) is not None
+            and self._readSysfsId(node_name, "vendor") == self.vendor_id
+            and self._readSysfsId(node_name, "product") == self.product_id
+            and (self.phys is None or fnmatch.fnmatchcase(self._readSysfsPhys(node_name), self.phys))
+        )
+
+    def findDevice(self, skip: str | None = None) -> str | None:
+        """
+        Looks for the device among the nodes that currently exist.
+
+        :param skip: A device path to ignore, such as one that was just lost but hasn't gone away yet.
+
+        :returns: ``str | None`` - The path to the device, or ``None`` if it isn't plugged in
+         or can't be read yet. If the device has several nodes, the one with keys is preferred.
+
+        :raises None:
+        """
+
+        try:
+            node_names: list[str] = os.listdir(self.sysfs_directory)
+
+        except OSError:
+            return None
+
+        # Go through the nodes in order, so the same one is picked every time
+        candidates: list[str] = sorted(
+            (name for name in node_names if self.matches(name)),
+            key=lambda name: (not self._hasKeys(name), int(_EVENT_NODE_PATTERN.match(name).group(1)))
+        )
+        for name in candidates:
+            path: str = os.path.join(self.input_directory, name)
+            # udev sets the permissions on the node after creating it, so it might not be readable right away
+            if path != skip and path not in self.claimed and os.access(path, os.R_OK):
+                return path
+
+        return None
+
+    async def waitForDevice(self, skip: str | None = None) -> str:
+        """
+        Waits until the device is plugged in and readable.
+
+        :param skip: A device path to ignore until it's been removed, such as one that was just lost.
+
+        :returns: ``str`` - The path to the device.
+
+        :raises None:
+        """
+
+        # Fall back to polling sysfs without inotify
+        inotify_fd: int = self._openInotify()
+        if inotify_fd < 0:
+            while True:
+                path: str | None = self.findDevice(skip)
+                if path:
+                    return path
+
+                # Stop skipping the lost device once it's gone
+                if skip and not os.path.exists(skip):
+                    skip = None
+
+                await asyncio.sleep(self._poll_interval)
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        changed: asyncio.Event = asyncio.Event()
+        buffer: bytes = b""
+
+        def onReadable() -> None:
+            nonlocal buffer, skip
+
+            try:
+                buffer += os.read(inotify_fd, 4096)
+
+            except BlockingIOError:
+                return
+
+            # Go through every event that was read
+            while len(buffer) >= _INOTIFY_EVENT.size:
+                _, mask, _, name_length = _INOTIFY_EVENT.unpack_from(buffer)
+                if len(buffer) < _INOTIFY_EVENT.size + name_length:
+                    break
+                name: str = buffer[_INOTIFY_EVENT.size:_INOTIFY_EVENT.size + name_length].rstrip(b"\x00").decode()
+                buffer = buffer[_INOTIFY_EVENT.size + name_length:]
+
+                # Stop skipping the lost device once it's gone
+                if skip and mask & _IN_DELETE and os.path.join(self.input_directory, name) == skip:
+                    skip = None
+
+                if _EVENT_NODE_PATTERN.match(name):
+                    changed.set()
+
+        try:
+            # Watch the directory before looking, so a device plugged in between the two isn't missed
+            loop.add_reader(inotify_fd, onReadable)
+
+            while True:
+                # Stop skipping the lost device once it's gone, since it could've been removed before watching started
+                if skip and not os.path.exists(skip):
+                    skip = None
+
+                path = self.findDevice(skip)
+                if path:
+                    return path
+
+                # Wait for a node to be created, removed or have its permissions changed
+                await changed.wait()
+                changed.clear()
+
+        finally:
+            loop.remove_reader(inotify_fd)
+            os.close(inotify_fd)
+
+    def _openInotify(self) -> int:
+        """Opens an inotify instance watching the input directory. Returns -1 if that isn't possible."""
+
+        if not _libc:
+            return -1
+
+        inotify_fd: int = _libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if inotify_fd < 0:
+            self._log.warning(
+                "Couldn't start watching for devices (%s), so they'll be polled for instead.",
+                os.strerror(ctypes.get_errno())
+            )
+            return -1
+
+        if _libc.inotify_add_watch(
+                inotify_fd, os.fsencode(self.input_directory), _IN_CREATE | _IN_DELETE | _IN_ATTRIB | _IN_MOVED_TO
+        ) < 0:
+            error_number: int = ctypes.get_errno()
+            os.close(inotify_fd)
+            # Only warn if it's not simply that there are no input devices at all yet
+            if error_number != errno.ENOENT:
+                self._log.warning(
+                    "Couldn't watch \"%s\" for devices (%s), so they'll be polled for instead.",
+                    self.input_directory, os.strerror(error_number)
+                )
+            return -1
+
+        return inotify_fd
@@ -0,0 +1,302 @@
+# Imports
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+from src.logger import getSubsystemLogger
+
+
+class EventConsumer:
+    def __init__(
+            self,
+            source: str,
+            event_type: str,
+            handler: Callable[[dict], Awaitable[Any]],
+            queue_size: int = 256,
+            policy: str = "drop"
+    ) -> None:
+        """
+        A single handler subscribed to an event, with its own bounded queue and worker
+        task. Events are handed to it through the queue, so a slow handler only ever
+        holds up itself.
+
+        :param source: The source of the event, such as "Twitch."
+        :param event_type: The type of the event, such as "ChatMessage."
+        :param handler: The coroutine function to call with every event's payload.
+        :param queue_size: The maximum amount of events that can be waiting on the handler.
+        :param policy: What to do when the queue is full. "drop" throws out the oldest
+         event, and "block" makes whoever is publishing wait for room.
+
+        :returns: ``None``
+
+        :raises ValueError: If the policy isn't "drop" or "block."
+        """
+
+        # Handle an invalid policy
+        if policy not in ("drop", "block"):
+            raise ValueError(f"Invalid event queue policy \"{policy}!\" It has to be \"drop\" or \"block.\"")
+
+        # Make the settings class-accessible
+        self.source: str = source
+        self.event_type: str = event_type
+        self.handler: Callable[[dict], Awaitable[Any]] = handler
+        self.policy: str = policy
+        del source, event_type, handler, policy  # Cleanup
+
+        # Create the consumer's own queue
+        self._queue: asyncio.Queue[dict] = asyncio.Queue(maxsize=queue_size)
+
+        # Create a variable to store the worker task
+        self._worker_task: asyncio.Task | None = None
+
+        # Create counters for what happened to the events given to the consumer
+        self.handled_events: int = 0
+        """The amount of events the handler has finished with, including ones it raised an error on."""
+        self.dropped_events: int = 0
+        """The amount of events thrown out because the queue was full."""
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("websocket")
+
+        return
+
+    @property
+    def name(self) -> str:
+        """A readable name for the consumer, such as "Twitch.ChatMessage:onChatMessage."""
+
+        return f"{self.source}.{self.event_type}:{getattr(self.handler, '__qualname__', repr(self.handler))}"
+
+    @property
+    def depth(self) -> int:
+        """The amount of events currently waiting on the handler."""
+
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        """Starts the worker task if it isn't already running."""
+
+        if not self._worker_task or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker())
+
+        return
+
+    async def stop(self) -> None:
+        """Stops the worker task. Any events still in the queue are discarded."""
+
+        if self._worker_task:
+            self._worker_task.cancel()
+            await asyncio.gather(self._worker_task, return_exceptions=True)
+            self._worker_task = None
+
+        return
+
+    async def put(self, payload: dict) -> None:
+        """
+        Hands an event over to the consumer, following its queue policy if the queue is full.
+
+        :param payload: The event's payload.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Wait for room if the consumer asked for it
+        if self.policy == "block":
+            await self._queue.put(payload)
+            return
+
+        try:
+            self._queue.put_nowait(payload)
+
+        except asyncio.QueueFull:
+            # Throw out the oldest event to make room, since it's the most stale one
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self._queue.put_nowait(payload)
+
+            self.dropped_events += 1
+            self._log.warning(
+                "Event queue for %s is full! Dropped an event (%d dropped in total).", self.name, self.dropped_events
+            )
+
+        return
+
+    async def _worker(self) -> None:
+        """Hands queued events over to the handler one at a time."""
+
+        while True:
+            payload: dict = await self._queue.get()
+
+            try:
+                await self.handler(payload)
+
+            # Pass the error up if it's an Asyncio cancelled error
+            except asyncio.CancelledError:
+                raise
+
+            # Don't let one failed event take down the worker
+            except Exception as error:
+                self._log.error("The following error occurred in the event handler %s: %s", self.name, error)
+
+            finally:
+                self.handled_events += 1
+                self._queue.task_done()
+
+
+class EventBus:
+    def __init__(self, queue_size: int = 256, policy: str = "drop") -> None:
+        """
+        Routes events from Streamer.bot to the handlers subscribed to them. Each
+        handler is its own consumer with its own queue and worker, so publishing an
+        event never waits on a handler (unless the handler asked for the "block" policy).
+
+        :param queue_size: The default queue size for new consumers.
+        :param policy: The default queue policy for new consumers, "drop" or "block."
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the defaults class-accessible
+        self.queue_size: int = queue_size
+        self.policy: str = policy
+
+        # Create the dictionary of consumers for each source and type of event
+        self._consumers: dict[tuple[str, str], list[EventConsumer]] = {}
+
+        return
+
+    def addConsumer(
+            self,
+            source: str,
+            event_type: str,
+            handler: Callable[[dict], Awaitable[Any]],
+            queue_size: int | None = None,
+            policy: str | None = None
+    ) -> EventConsumer:
+        """
+        Subscribes a handler to an event and starts its worker. Adding the same handler
+        to the same event twice doesn't do anything.
+
+        :param source: The source of the event, such as "Twitch."
+        :param event_type: The type of the event, such as "ChatMessage."
+        :param handler: The coroutine function to call with every event's payload.
+        :param queue_size: The maximum amount of events that can be waiting on the handler.
+         Defaults to the bus's queue size.
+        :param policy: What to do when the handler's queue is full, "drop" or "block."
+         Defaults to the bus's policy.
+
+        :returns: ``EventConsumer`` - The consumer created for the handler.
+
+        :raises ValueError: If the policy isn't "drop" or "block."
+        """
+
+        consumers: list[EventConsumer] = self._consumers.get((source, event_type), [])
+
+        # Don't subscribe the same handler twice
+        for consumer in consumers:
+            if consumer.handler == handler:
+                return consumer
+
+        # Create the consumer before registering anything, so an invalid one doesn't leave an empty entry behind
+        consumer: EventConsumer = EventConsumer(
+            source=source,
+            event_type=event_type,
+            handler=handler,
+            queue_size=queue_size if queue_size is not None else self.queue_size,
+            policy=policy or self.policy
+        )
+        self._consumers.setdefault((source, event_type), []).append(consumer)
+        consumer.start()
+
+        return consumer
+
+    async def removeConsumers(
+            self,
+            source: str | None = None,
+            event_type: str | None = None,
+            handler: Callable[[dict], Awaitable[Any]] | None = None
+    ) -> None:
+        """
+        Unsubscribes every consumer matching all the given filters, and stops their workers.
+        Giving no filters removes every consumer.
+
+        :param source: Only remove consumers of events from this source.
+        :param event_type: Only remove consumers of this type of event.
+        :param handler: Only remove consumers using this handler.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        removed: list[EventConsumer] = []
+        for key, consumers in list(self._consumers.items()):
+            if (source is not None and key[0] != source) or (event_type is not None and key[1] != event_type):
+                continue
+
+            # Keep whatever doesn't match the handler
+            kept: list[EventConsumer] = [
+                consumer for consumer in consumers if handler is not None and consumer.handler != handler
+            ]
+            removed.extend(consumer for consumer in consumers if consumer not in kept)
+
+            if kept:
+                self._consumers[key] = kept
+            else:
+                del self._consumers[key]
+
+        for consumer in removed:
+            await consumer.stop()
+
+        return
+
+    def hasConsumers(self, source: str, event_type: str) -> bool:
+        """Whether anything is subscribed to an event."""
+
+        return (source, event_type) in self._consumers
+
+    async def publish(self, source: str, event_type: str, payload: dict) -> None:
+        """
+        Hands an event to everything subscribed to it.
+
+        :param source: The source of the event, such as "Twitch."
+        :param event_type: The type of the event, such as "ChatMessage."
+        :param payload: The event's payload.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        for consumer in self._consumers.get((source, event_type), ()):
+            await consumer.put(payload)
+
+        return
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """
+        Gets the queue depth and event counters of every consumer.
+
+        :returns: ``dict[str, dict[str, int]]`` - The depth, handled and dropped
+         event counts of each consumer, keyed by the consumer's name.
+
+        :raises None:
+        """
+
+        return {
+            consumer.name: {
+                "depth": consumer.depth,
+                "handled": consumer.handled_events,
+                "dropped": consumer.dropped_events,
+            }
+            for consumers in self._consumers.values() for consumer in consumers
+        }
+
+    async def close(self) -> None:
+        """Unsubscribes every consumer and stops their workers."""
+
+        await self.removeConsumers()
+
+        return
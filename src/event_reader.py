@@ -0,0 +1,150 @@
+# Imports
+import errno
+import os
+import struct
+import sys
+from itertools import compress
+from operator import itemgetter
+from evdev import ecodes
+
+# The layout of the kernel's struct input_event on 64-bit systems: seconds, microseconds, type, code and value
+INPUT_EVENT: struct.Struct = struct.Struct("llHHi")
+
+# Where the type and code of each event are, counted in 32-bit words from the start of the buffer
+## The two sit side by side, so a 32-bit view of the buffer gives both of them as a single number.
+_WORDS_PER_EVENT: int = INPUT_EVENT.size // 4
+_TYPE_CODE_WORD: int = struct.calcsize("ll") // 4
+
+# The most codes any type of event has, which is how many a type kept in full is expanded to
+_CODE_COUNT: int = ecodes.KEY_CNT
+
+
+def _typeCodeKey(event_type: int, code: int) -> int:
+    """The number the type and code of an event read as, out of a 32-bit view of the buffer."""
+
+    if sys.byteorder == "little":
+        return event_type | code << 16
+
+    return event_type << 16 | code
+
+
+class RawEvent(tuple):
+    """
+    An input event decoded straight from the kernel's struct, with the same attributes as
+    evdev's ``InputEvent``. It's a plain tuple underneath, so creating one from the decoded
+    fields is done entirely in C.
+    """
+
+    __slots__ = ()
+
+    sec: int = property(itemgetter(0))
+    """Time in seconds since epoch at which event occurred."""
+    usec: int = property(itemgetter(1))
+    """Microsecond portion of the timestamp."""
+    type: int = property(itemgetter(2))
+    """Event type - one of ``ecodes.EV_*``."""
+    code: int = property(itemgetter(3))
+    """Event code related to the event type."""
+    value: int = property(itemgetter(4))
+    """Event value related to the event type."""
+
+    def timestamp(self) -> float:
+        """Return event timestamp as a float."""
+
+        return self[0] + self[1] / 1000000.0
+
+    def __repr__(self) -> str:
+        return f"RawEvent({self[0]!r}, {self[1]!r}, {self[2]!r}, {self[3]!r}, {self[4]!r})"
+
+
+class EventReader:
+    def __init__(
+            self,
+            fd: int,
+            event_filter: dict[int, frozenset[int] | None] | None = None,
+            capacity: int = 64
+    ) -> None:
+        """
+        Reads raw input events straight off of a device's file descriptor, many at a
+        time, into a buffer that's reused for every read. Unwanted events are picked
+        out by their type and code in the buffer, and the rest are decoded in bulk,
+        so there's no Python code run for each event at all.
+
+        :param fd: The file descriptor of the device, which should be non-blocking.
+        :param event_filter: The event types to keep, each with the codes of that type
+         to keep, or ``None`` to keep every code. ``None`` keeps every event.
+        :param capacity: The most events read in one go.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the file descriptor class-accessible
+        self.fd: int = fd
+        del fd  # Cleanup
+
+        # Turn the filter into the set of types and codes to keep, as they read out of the buffer
+        self._keys: frozenset[int] | None = None
+        if event_filter is not None:
+            self._keys = frozenset(
+                _typeCodeKey(event_type, code)
+                for event_type, codes in event_filter.items()
+                for code in (range(_CODE_COUNT) if codes is None else codes)
+            )
+        del event_filter  # Cleanup
+
+        # Create the buffer events are read into, and the views used to read them back out
+        self._buffer: bytearray = bytearray(capacity * INPUT_EVENT.size)
+        self._view: memoryview = memoryview(self._buffer)
+        self._words: memoryview = self._view.cast("I")
+
+        # Create a variable for the amount of bytes of an incomplete event left over from the last read
+        ## A real device only ever hands over whole events, but pipes and files don't have to.
+        self._leftover: int = 0
+
+        # Create counters for what's been read
+        self.events_read: int = 0
+        """The amount of events read from the device, including skipped ones."""
+        self.events_skipped: int = 0
+        """The amount of events skipped by the filter."""
+
+        return
+
+    def read(self) -> list[RawEvent]:
+        """
+        Reads every event that's currently available, up to the reader's capacity.
+
+        :returns: ``list[RawEvent]`` - The events that got through the filter, oldest first.
+
+        :raises BlockingIOError: If there are no events to read.
+        :raises OSError: If the device is gone.
+        """
+
+        # Read in after whatever's left over from last time
+        read_bytes: int = os.readv(self.fd, [self._view[self._leftover:]])
+        ## Devices never run out like a file does, so that only happens once whatever is behind the descriptor is gone
+        if not read_bytes:
+            raise OSError(errno.ENODEV, "The device has no more events to read")
+        available: int = self._leftover + read_bytes
+        count: int = available // INPUT_EVENT.size
+        used: int = count * INPUT_EVENT.size
+
+        # Decode every whole event, keeping only the ones whose type and code are in the filter
+        records = INPUT_EVENT.iter_unpack(self._view[:used])
+        if self._keys is not None:
+            records = compress(records, map(
+                self._keys.__contains__,
+                self._words[_TYPE_CODE_WORD:count * _WORDS_PER_EVENT:_WORDS_PER_EVENT]
+            ))
+        events: list[RawEvent] = list(map(RawEvent, records))
+
+        self.events_read += count
+        self.events_skipped += count - len(events)
+
+        # Move any incomplete event to the front, to be finished by the next read
+        self._leftover = available - used
+        if self._leftover:
+            self._buffer[:self._leftover] = self._buffer[used:available]
+
+        return events
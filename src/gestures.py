@@ -0,0 +1,244 @@
+# Imports
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+from src.logger import getSubsystemLogger
+from src.timer_wheel import TimerWheel, WheelTimer
+
+
+class _ButtonState:
+    """What's known about a single button in the middle of a gesture."""
+
+    __slots__ = ("gestures", "down", "press_time", "timer", "done")
+
+    def __init__(self, gestures: frozenset[str], press_time: float) -> None:
+        # The gestures the button had bound when it was pressed
+        self.gestures: frozenset[str] = gestures
+        # Whether the button is being held down
+        self.down: bool = True
+        # The time of the press the gesture started with
+        self.press_time: float = press_time
+        # The timer for a long press, the end of a double-tap window, or the next repeat
+        self.timer: WheelTimer | None = None
+        # Whether the gesture already fired, so the release doesn't fire a tap too
+        self.done: bool = False
+
+        return
+
+
+class GestureRecognizer:
+    def __init__(
+            self,
+            timer_wheel: TimerWheel,
+            gestures_for: Callable[[int], frozenset[str]],
+            on_gesture: Callable[[int, str, float], Awaitable[Any]],
+            double_tap_window: float = 0.25,
+            long_press_time: float = 0.5,
+            repeat_delay: float = 0.4,
+            repeat_interval: float = 0.1
+    ) -> None:
+        """
+        Turns the presses and releases of a device's buttons into taps, double-taps,
+        long presses and hold-to-repeat. Every timer a gesture needs goes on the shared
+        timer wheel. A button only waits to see which gesture it's making if it has more
+        than a tap bound, so buttons with just a tap still fire the moment they're pressed.
+
+        - A tap fires on release, or on press if it's the only gesture bound.
+        - A double-tap fires on the second press within the double-tap window. With one
+          bound, a single tap waits for the window to close before firing.
+        - A long press fires once the button has been held for the long press time, and
+          the release after it doesn't fire a tap.
+        - Hold-to-repeat fires on press, then again every repeat interval after the repeat
+          delay for as long as the button is held. It can't be bound alongside anything else.
+
+        :param timer_wheel: The timer wheel to schedule every gesture timer on.
+        :param gestures_for: A function giving the gestures currently bound to a button code.
+        :param on_gesture: The coroutine function to call for each gesture, with the button
+         code, the name of the gesture, and the time of the press that started it.
+        :param double_tap_window: The most time between the release of a tap and the next
+         press for them to be a double-tap, in seconds.
+        :param long_press_time: How long a button has to be held for a long press, in seconds.
+        :param repeat_delay: How long a button has to be held before it starts repeating, in seconds.
+        :param repeat_interval: The time between repeats, in seconds.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the timer wheel and callbacks class-accessible
+        self._timer_wheel: TimerWheel = timer_wheel
+        self._gestures_for: Callable[[int], frozenset[str]] = gestures_for
+        self._on_gesture: Callable[[int, str, float], Awaitable[Any]] = on_gesture
+        del timer_wheel, gestures_for, on_gesture  # Cleanup
+
+        # Make the timings class-accessible
+        self.double_tap_window: float = double_tap_window
+        self.long_press_time: float = long_press_time
+        self.repeat_delay: float = repeat_delay
+        self.repeat_interval: float = repeat_interval
+        del double_tap_window, long_press_time, repeat_delay, repeat_interval  # Cleanup
+
+        # Create the dictionary of buttons in the middle of a gesture, keyed by button code
+        self._buttons: dict[int, _ButtonState] = {}
+
+        # Create the set of gestures fired by timers, which run on their own
+        self._tasks: set[asyncio.Task] = set()
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("input")
+
+        return
+
+    async def press(self, code: int, event_time: float) -> None:
+        """
+        Takes in a button press.
+
+        :param code: The code of the button.
+        :param event_time: The time of the press.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        state: _ButtonState | None = self._buttons.get(code)
+
+        # Handle the second press of a double-tap
+        if state and not state.down and "double_tap" in state.gestures:
+            state.timer.cancel()
+            state.down = True
+            state.done = True
+            await self._on_gesture(code, "double_tap", state.press_time)
+            return
+
+        gestures: frozenset[str] = self._gestures_for(code)
+
+        # Fire a lone tap right away, since there's nothing to wait for
+        if gestures <= {"tap"}:
+            self._forget(code)
+            await self._on_gesture(code, "tap", event_time)
+            return
+
+        self._forget(code)
+        state = _ButtonState(gestures, event_time)
+        self._buttons[code] = state
+
+        # Fire the first repeat right away, and start repeating once the button's been held for long enough
+        if "hold_repeat" in gestures:
+            state.done = True
+            state.timer = self._timer_wheel.schedule(self.repeat_delay, self._onRepeat, code)
+            await self._on_gesture(code, "hold_repeat", event_time)
+
+        # Wait to see if the press becomes a long one
+        elif "long_press" in gestures:
+            state.timer = self._timer_wheel.schedule(self.long_press_time, self._onLongPress, code)
+
+        return
+
+    async def release(self, code: int, event_time: float) -> None:
+        """
+        Takes in a button release.
+
+        :param code: The code of the button.
+        :param event_time: The time of the release.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        state: _ButtonState | None = self._buttons.get(code)
+        if not state or not state.down:
+            return
+
+        # Nothing's left to do if the gesture already fired, such as a long press or the end of repeating
+        if state.done:
+            self._forget(code)
+            return
+
+        # A short press, so it's a tap, unless it turns into a double-tap
+        if state.timer:
+            state.timer.cancel()
+        if "double_tap" in state.gestures:
+            state.down = False
+            state.timer = self._timer_wheel.schedule(self.double_tap_window, self._onTapWindowEnd, code)
+            return
+
+        self._forget(code)
+        if "tap" in state.gestures:
+            await self._on_gesture(code, "tap", state.press_time)
+
+        return
+
+    def _forget(self, code: int) -> None:
+        """Stops tracking a button, cancelling its timer."""
+
+        state: _ButtonState | None = self._buttons.pop(code, None)
+        if state and state.timer:
+            state.timer.cancel()
+
+        return
+
+    def _onLongPress(self, code: int) -> None:
+        """Fires a long press for a button that's still held."""
+
+        state: _ButtonState = self._buttons[code]
+        state.timer = None
+        state.done = True
+        self._fire(code, "long_press", state.press_time)
+
+        return
+
+    def _onTapWindowEnd(self, code: int) -> None:
+        """Fires the tap that didn't become a double-tap."""
+
+        state: _ButtonState = self._buttons.pop(code)
+        if "tap" in state.gestures:
+            self._fire(code, "tap", state.press_time)
+
+        return
+
+    def _onRepeat(self, code: int) -> None:
+        """Fires another repeat for a button that's still held, and schedules the next one."""
+
+        state: _ButtonState = self._buttons[code]
+        state.timer = self._timer_wheel.schedule(self.repeat_interval, self._onRepeat, code)
+        self._fire(code, "hold_repeat", state.press_time)
+
+        return
+
+    def _fire(self, code: int, gesture: str, event_time: float) -> None:
+        """Fires a gesture from a timer, in its own task."""
+
+        task: asyncio.Task = asyncio.create_task(self._fireLate(code, gesture, event_time))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return
+
+    async def _fireLate(self, code: int, gesture: str, event_time: float) -> None:
+        """Fires a gesture outside of the input dispatcher, which would've logged any errors."""
+
+        try:
+            await self._on_gesture(code, gesture, event_time)
+
+        # Pass the error up if it's an Asyncio cancelled error
+        except asyncio.CancelledError:
+            raise
+
+        except Exception as error:
+            self._log.error("The following error occurred in the input handler: %s", error)
+
+        return
+
+    async def close(self) -> None:
+        """Drops every gesture in progress, and stops any being fired."""
+
+        for code in list(self._buttons):
+            self._forget(code)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        return
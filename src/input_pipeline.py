@@ -0,0 +1,203 @@
+# Imports
+import asyncio
+import logging
+from typing import Awaitable, Callable
+from evdev import InputDevice, InputEvent
+from src.event_reader import EventReader
+from src.logger import getSubsystemLogger
+
+
+class InputPipeline:
+    def __init__(
+            self,
+            handler: Callable[[str, InputEvent], Awaitable[None]],
+            queue_size: int = 256
+    ) -> None:
+        """
+        An asynchronous ingestion pipeline for evdev input events. Events are
+        read straight off of each device's file descriptor by the event loop,
+        merged into a single stream in the order they happened, pushed into a
+        bounded queue, and handed to the handler by a separate dispatcher task,
+        so nothing in here ever blocks the loop.
+
+        :param handler: The coroutine function to call for every event read from a device.
+         It's called with the name of the device the event came from, and the event.
+        :param queue_size: The maximum amount of events that can be waiting for dispatch.
+         If the queue fills up, the oldest event is dropped to make room.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the handler class-accessible
+        self._handler: Callable[[str, InputEvent], Awaitable[None]] = handler
+        del handler  # Cleanup
+
+        # Create the queue that sits between the readers and the dispatcher
+        self._queue: asyncio.Queue[tuple[str, InputEvent]] = asyncio.Queue(maxsize=queue_size)
+
+        # Create the list of events read from every device in the current pass of the event loop
+        ## They're sorted by their kernel timestamps before being queued, so events from several
+        ## devices that were ready at the same time go out in the order they actually happened.
+        self._batch: list[tuple[str, InputEvent]] = []
+        self._batch_scheduled: bool = False
+
+        # Create a variable to store the dispatcher task
+        self._dispatcher_task: asyncio.Task | None = None
+
+        # Create a counter for how many events had to be dropped because the queue was full
+        self.dropped_events: int = 0
+        """The amount of events dropped because the dispatcher couldn't keep up."""
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("input")
+
+        return
+
+    def start(self) -> None:
+        """Starts the dispatcher task if it isn't already running."""
+
+        if not self._dispatcher_task or self._dispatcher_task.done():
+            self._dispatcher_task = asyncio.create_task(self.run())
+
+        return
+
+    async def run(self) -> None:
+        """
+        Hands queued events over to the handler until cancelled. Use this instead of
+        ``start`` to run the dispatcher in a task owned by something else.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        await self._dispatch_loop()
+
+        return
+
+    async def stop(self) -> None:
+        """Stops the dispatcher task. Any events still in the queue are discarded."""
+
+        if self._dispatcher_task:
+            self._dispatcher_task.cancel()
+            await asyncio.gather(self._dispatcher_task, return_exceptions=True)
+            self._dispatcher_task = None
+
+        return
+
+    def _enqueue(self, item: tuple[str, InputEvent]) -> None:
+        """Puts an event in the queue, dropping the oldest one if it's full."""
+
+        try:
+            self._queue.put_nowait(item)
+
+        except asyncio.QueueFull:
+            # Throw out the oldest event to make room, since it's the most stale one
+            self._queue.get_nowait()
+            self._queue.task_done()
+            self._queue.put_nowait(item)
+
+            self.dropped_events += 1
+            self._log.warning("Input queue is full! Dropped an event (%d dropped in total).", self.dropped_events)
+
+        return
+
+    def _flushBatch(self) -> None:
+        """Queues every event read in the last pass of the event loop, oldest first."""
+
+        self._batch_scheduled = False
+        batch: list[tuple[str, InputEvent]] = self._batch
+        self._batch = []
+
+        # Each device's events are already in order, so this only interleaves them
+        if len({source for source, _ in batch}) > 1:
+            batch.sort(key=lambda item: (item[1].sec, item[1].usec))
+
+        for item in batch:
+            self._enqueue(item)
+
+        return
+
+    async def readDevice(
+            self,
+            device: InputDevice,
+            source: str = "",
+            event_filter: dict[int, frozenset[int] | None] | None = None
+    ) -> None:
+        """
+        Reads events from a device until it disconnects. The file descriptor of the
+        device is registered with the event loop, so events are only read when the
+        kernel says some are ready. Any amount of devices can be read at once.
+
+        :param device: The opened device to read events from.
+        :param source: The name of the device, which is handed to the handler with each event.
+        :param event_filter: The event types to handle, each with the codes of that type to
+         handle, or ``None`` for every code. Anything else is skipped without being decoded.
+         ``None`` handles every event.
+
+        :returns: ``None``
+
+        :raises OSError: If the device is lost, or reading from it fails.
+        """
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        # Create a future that will be resolved if the device fails
+        failure: asyncio.Future = loop.create_future()
+
+        # Create the reader that decodes the device's events in bulk, skipping unwanted ones
+        reader: EventReader = EventReader(device.fd, event_filter)
+
+        def onReadable() -> None:
+            try:
+                # Read every event that's currently available in one go
+                self._batch.extend((source, event) for event in reader.read())
+
+                # Queue them once every other device that's ready has been read too
+                if self._batch and not self._batch_scheduled:
+                    self._batch_scheduled = True
+                    loop.call_soon(self._flushBatch)
+
+            # Nothing to read after all
+            except BlockingIOError:
+                pass
+
+            # Hand the error over to the reader task
+            except OSError as error:
+                if not failure.done():
+                    failure.set_exception(error)
+
+        # Register the device with the event loop
+        loop.add_reader(device.fd, onReadable)
+
+        try:
+            # Wait until the device fails or the task is cancelled
+            await failure
+
+        finally:
+            # Stop watching the device's file descriptor
+            loop.remove_reader(device.fd)
+
+        return
+
+    async def _dispatch_loop(self) -> None:
+        """Hands queued events over to the handler one at a time."""
+
+        while True:
+            source, event = await self._queue.get()
+
+            try:
+                await self._handler(source, event)
+
+            # Pass the error up if it's an Asyncio cancelled error
+            except asyncio.CancelledError:
+                raise
+
+            # Don't let one failed event take down the dispatcher
+            except Exception as error:
+                self._log.error("The following error occurred while handling an input event: %s", error)
+
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,271 @@
+# Imports
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from datetime import datetime
+from typing import Iterator
+
+## The journal is a fixed-size ring buffer of fixed-size binary records in a memory-mapped file.
+## Writing a record is one struct.pack_into into the map, so it's cheap enough to leave on for
+## a whole stream. Once it's full, the oldest records get overwritten.
+##
+## Layout:
+##  - A 64 byte header: magic, version, record size, capacity, and the total amount of records written
+##  - ``capacity`` records of ``RECORD_SIZE`` bytes each
+
+# The file header
+_HEADER: struct.Struct = struct.Struct("<8sIIIQ36x")
+_MAGIC: bytes = b"RSDJRNL\x00"
+_VERSION: int = 2
+
+# A single record: timestamp (ns), kind, status, event type, code, profile, value, latency (us), handler label, device,
+# and queue delay (us)
+## The value is only set for inputs, and the queue delay, how long the handler waited to start, only for dispatches.
+_RECORD: struct.Struct = struct.Struct("<qBBHHHiI32sB3xI")
+RECORD_SIZE: int = _RECORD.size
+
+# The kinds of record
+KIND_INPUT: int = 1
+"""A raw evdev event."""
+KIND_DISPATCH: int = 2
+"""The outcome of handling a button press."""
+
+# The outcomes a dispatch can have
+STATUS_OK: int = 0
+"""The handler ran successfully."""
+STATUS_ERROR: int = 1
+"""The handler raised an error."""
+STATUS_UNBOUND: int = 2
+"""The button isn't bound to anything in the current profile."""
+STATUS_NOT_FOUND: int = 3
+"""What the button is bound to couldn't be found, such as a missing song or Streamer.bot action."""
+STATUS_SENT: int = 4
+"""
+The Streamer.bot action was sent without waiting for a response. A second dispatch
+record for the same press follows once the response comes in, with its outcome.
+"""
+STATUS_NO_RESPONSE: int = 5
+"""Streamer.bot never responded to the action, such as if it timed out or the action was never sent."""
+
+KIND_NAMES: dict[int, str] = {KIND_INPUT: "input", KIND_DISPATCH: "dispatch"}
+STATUS_NAMES: dict[int, str] = {
+    STATUS_OK: "ok",
+    STATUS_ERROR: "error",
+    STATUS_UNBOUND: "unbound",
+    STATUS_NOT_FOUND: "not_found",
+    STATUS_SENT: "sent",
+    STATUS_NO_RESPONSE: "no_response",
+}
+
+
+class EventJournal:
+    def __init__(self, path: str = "logs/events.journal", capacity: int = 65536) -> None:
+        """
+        An append-only, memory-mapped ring buffer of input events and dispatch outcomes.
+        If a journal already exists at the path with the same capacity, it's appended to.
+
+        :param path: The path to the journal file.
+        :param capacity: How many records the journal holds before it starts overwriting the oldest ones.
+
+        :returns: ``None``
+
+        :raises OSError: If the journal file couldn't be opened.
+        """
+
+        # Make the path and capacity class-accessible
+        self.path: str = path
+        self.capacity: int = capacity
+
+        # Open the file, starting a new one if it doesn't exist or doesn't match
+        size: int = _HEADER.size + capacity * RECORD_SIZE
+        self._file = open(path, "a+b")
+        self._file.seek(0)
+        header: bytes = self._file.read(_HEADER.size)
+        if (
+                len(header) != _HEADER.size
+                or _HEADER.unpack(header)[:4] != (_MAGIC, _VERSION, RECORD_SIZE, capacity)
+                or os.fstat(self._file.fileno()).st_size != size
+        ):
+            self._file.truncate(0)
+            self._file.truncate(size)
+
+        # Map the file into memory
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), size)
+
+        # Get how many records were written before, writing a fresh header if there wasn't one
+        magic, _, _, _, self._count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            self._count = 0
+            _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, RECORD_SIZE, capacity, 0)
+
+        return
+
+    def _write(
+            self,
+            timestamp_ns: int,
+            kind: int,
+            status: int = 0,
+            event_type: int = 0,
+            code: int = 0,
+            profile: int = 0,
+            value: int = 0,
+            latency_us: int = 0,
+            handler: bytes = b"",
+            device: int = 0,
+            queued_us: int = 0
+    ) -> None:
+        """Writes a record into the next slot, then bumps the count in the header."""
+
+        _RECORD.pack_into(
+            self._map, _HEADER.size + (self._count % self.capacity) * RECORD_SIZE,
+            timestamp_ns, kind, status, event_type, code, profile, value, min(latency_us, 0xFFFFFFFF), handler,
+            device & 0xFF, min(queued_us, 0xFFFFFFFF)
+        )
+        self._count += 1
+        # The count sits at byte 20 of the header
+        struct.pack_into("<Q", self._map, 20, self._count)
+
+        return
+
+    def recordInput(self, sec: int, usec: int, event_type: int, code: int, value: int, device: int = 0) -> None:
+        """
+        Records a raw evdev event.
+
+        :param sec: The seconds part of the event's kernel timestamp.
+        :param usec: The microseconds part of the event's kernel timestamp.
+        :param event_type: The type of the event, such as ``EV_KEY``.
+        :param code: The code of the event.
+        :param value: The value of the event.
+        :param device: The index of the device the event came from, in the order the devices are configured.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        self._write(sec * 1_000_000_000 + usec * 1000, KIND_INPUT, 0, event_type, code, 0, value, device=device)
+
+        return
+
+    def recordDispatch(
+            self,
+            code: int,
+            profile: int,
+            handler: str,
+            latency_us: int,
+            status: int,
+            device: int = 0,
+            queued_us: int = 0
+    ) -> None:
+        """
+        Records the outcome of handling a button press.
+
+        :param code: The code of the button.
+        :param profile: The profile the button was pressed in.
+        :param handler: A short description of what the button is bound to. Cut off at 32 bytes.
+        :param latency_us: How long it took from the press to the handler finishing, in microseconds.
+        :param status: The outcome. One of the ``STATUS_`` constants.
+        :param device: The index of the device the button is on, in the order the devices are configured.
+        :param queued_us: How long the handler waited to start, in microseconds. It's part of the latency.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        self._write(
+            time.time_ns(), KIND_DISPATCH, status, 0, code, profile, 0, max(latency_us, 0),
+            handler.encode("utf-8", "replace")[:32], device, max(queued_us, 0)
+        )
+
+        return
+
+    def close(self) -> None:
+        """Flushes the journal to disk and closes it."""
+
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+            self._file.close()
+
+        return
+
+
+def readJournal(path: str) -> Iterator[tuple]:
+    """
+    Reads every record in a journal, oldest first.
+
+    :param path: The path to the journal file.
+
+    :returns: ``Iterator[tuple]`` - Tuples of timestamp (ns), kind, status, event type, code,
+     profile, value, latency (us), handler, device and queue delay (us).
+
+    :raises ValueError: If the file isn't a journal.
+    """
+
+    with open(path, "rb") as file:
+        data: bytes = file.read()
+
+    magic, version, record_size, capacity, count = _HEADER.unpack_from(data, 0)
+    if magic != _MAGIC or version != _VERSION or record_size != RECORD_SIZE:
+        raise ValueError(f"\"{path}\" isn't a journal this version can read!")
+
+    # Start from the oldest record that hasn't been overwritten yet
+    for index in range(max(count - capacity, 0), count):
+        record: tuple = _RECORD.unpack_from(data, _HEADER.size + (index % capacity) * RECORD_SIZE)
+        yield record[:8] + (record[8].rstrip(b"\x00").decode("utf-8", "replace"), record[9], record[10])
+
+
+# A tool for dumping and filtering journals, run with "python -m src.journal"
+def main() -> int:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog="python -m src.journal",
+        description="Dumps the records in an event journal, oldest first."
+    )
+    parser.add_argument("path", nargs="?", default="logs/events.journal", help="The journal file to read.")
+    parser.add_argument("--kind", choices=sorted(KIND_NAMES.values()), help="Only show one kind of record.")
+    parser.add_argument("--device", type=int, help="Only show records from the device with this index.")
+    parser.add_argument("--code", type=int, action="append", help="Only show records with this code. Repeatable.")
+    parser.add_argument("--status", choices=sorted(STATUS_NAMES.values()), help="Only show dispatches with this status.")
+    parser.add_argument("--since", type=float, help="Only show records from the last this many seconds.")
+    parser.add_argument("--tail", type=int, help="Only show the last this many matching records.")
+    arguments: argparse.Namespace = parser.parse_args()
+
+    since_ns: int = time.time_ns() - int(arguments.since * 1_000_000_000) if arguments.since else 0
+    lines: list[str] = []
+
+    for (
+            timestamp_ns, kind, status, event_type, code, profile, value, latency_us, handler, device, queued_us
+    ) in readJournal(arguments.path):
+        # Apply the filters
+        if arguments.device is not None and device != arguments.device:
+            continue
+        if arguments.kind and KIND_NAMES.get(kind) != arguments.kind:
+            continue
+        if arguments.code and code not in arguments.code:
+            continue
+        if arguments.status and (kind != KIND_DISPATCH or STATUS_NAMES.get(status) != arguments.status):
+            continue
+        if timestamp_ns < since_ns:
+            continue
+
+        timestamp: str = datetime.fromtimestamp(timestamp_ns / 1_000_000_000).strftime("%m/%d/%Y-%H:%M:%S.%f")
+        if kind == KIND_INPUT:
+            lines.append(f"[{timestamp}] input    device={device} type={event_type} code={code} value={value}")
+        else:
+            lines.append(
+                f"[{timestamp}] dispatch device={device} code={code} profile={profile} handler={handler or '-'} "
+                f"latency={latency_us}us queued={queued_us}us status={STATUS_NAMES.get(status, status)}"
+            )
+
+    for line in lines[-arguments.tail:] if arguments.tail else lines:
+        print(line)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
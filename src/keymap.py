@@ -0,0 +1,470 @@
+# Imports
+import tomllib
+from functools import partial
+from typing import Any, Awaitable, Callable
+from evdev import ecodes
+
+
+class Binding:
+    """A single validated button binding from the keymap."""
+
+    __slots__ = ("kind", "params", "button_name")
+
+    def __init__(self, kind: str, params: dict[str, Any], button_name: str) -> None:
+        self.kind: str = kind
+        """The type of binding. Either "song," "action," "player" or "profile."""
+        self.params: dict[str, Any] = params
+        """The keyword arguments the binding's handler is called with."""
+        self.button_name: str = button_name
+        """The name of the button the binding belongs to, or the names of every button in a chord joined by "+."""
+
+        return
+
+    @property
+    def label(self) -> str:
+        """A short description of the binding, such as ``action:obs toggle mic``."""
+
+        return f"{self.kind}:{next(iter(self.params.values()))}"
+
+    def __repr__(self) -> str:
+        return f"Binding({self.kind!r}, {self.params!r}, {self.button_name!r})"
+
+
+class AxisBinding:
+    """A single validated axis binding from the keymap."""
+
+    __slots__ = ("kind", "params", "axis_name", "minimum", "maximum", "output", "deadzone", "hysteresis", "invert")
+
+    def __init__(
+            self,
+            kind: str,
+            params: dict[str, Any],
+            axis_name: str,
+            minimum: int,
+            maximum: int,
+            output: tuple[float, float],
+            deadzone: int,
+            hysteresis: int,
+            invert: bool
+    ) -> None:
+        self.kind: str = kind
+        """The type of binding. Either "player" or "action."""
+        self.params: dict[str, Any] = params
+        """The keyword arguments the binding's handler is called with, along with the axis value."""
+        self.axis_name: str = axis_name
+        """The name of the axis the binding belongs to, such as "ABS_X."""
+        self.minimum: int = minimum
+        """The lowest raw value the axis reports."""
+        self.maximum: int = maximum
+        """The highest raw value the axis reports."""
+        self.output: tuple[float, float] = output
+        """The values the lowest and highest positions of the axis are turned into."""
+        self.deadzone: int = deadzone
+        """How far from the centre, in raw units, the axis still counts as centred."""
+        self.hysteresis: int = hysteresis
+        """How far, in raw units, the axis has to move before a change is noticed."""
+        self.invert: bool = invert
+        """Whether the axis is flipped, so its lowest raw value gives the highest output."""
+
+        return
+
+    def __repr__(self) -> str:
+        return f"AxisBinding({self.kind!r}, {self.params!r}, {self.axis_name!r})"
+
+
+class Keymap:
+    # The binding types that can be used, and the keys each of them accepts
+    binding_keys: dict[str, set[str]] = {
+        "song": {"song"},
+        "action": {"action", "args"},
+        "player": {"player", "seconds"},
+        "profile": {"profile"},
+    }
+    """The binding types that can be used, and the keys each of them accepts."""
+
+    # The possible music player commands
+    player_commands: set[str] = {"fast_forward", "rewind", "toggle_pause", "stop"}
+    """The commands that can be given to the music player."""
+
+    # The axis binding types that can be used, and the keys each of them accepts
+    axis_binding_keys: dict[str, set[str]] = {
+        "player": {"player"},
+        "action": {"action", "arg", "args"},
+    }
+    """The axis binding types that can be used, and the keys each of them accepts."""
+
+    # The keys every axis binding accepts, on top of the ones for its type
+    axis_shared_keys: set[str] = {"range", "output", "deadzone", "hysteresis", "invert"}
+    """The keys every axis binding accepts, on top of the ones for its type."""
+
+    # The music player settings an axis can control
+    player_axis_commands: set[str] = {"volume"}
+    """The music player settings an axis can control."""
+
+    # The gestures a button can have bound, on top of being pressed
+    gesture_names: set[str] = {"tap", "double_tap", "long_press", "hold_repeat"}
+    """The gestures a button can have bound."""
+
+    # The possible directions to cycle profiles in
+    profile_directions: set[str] = {"next", "previous"}
+    """The directions profiles can be cycled in."""
+
+    def __init__(self, path: str, button_codes: dict[int, str]) -> None:
+        """
+        Loads and validates a keymap file, which defines the profiles and what each
+        button does in them.
+
+        :param path: The path to the keymap file.
+        :param button_codes: The codes for each button with a corresponding button name.
+
+        :returns: ``None``
+
+        :raises FileNotFoundError: If the keymap file doesn't exist.
+        :raises ValueError: If the keymap file is invalid. The message says what's wrong and where.
+        """
+
+        # Make the path class-accessible
+        self.path: str = path
+
+        # Create a reverse lookup of button names to their codes
+        self._codes_by_name: dict[str, int] = {name: code for code, name in button_codes.items()}
+        del button_codes  # Cleanup
+
+        # Load the file
+        try:
+            with open(path, "rb") as file:
+                data: dict = tomllib.load(file)
+        except tomllib.TOMLDecodeError as error:
+            raise ValueError(f"The keymap file \"{path}\" isn't valid TOML: {error}")
+
+        # Create a dictionary containing the names for each profile
+        ## This also acts as a reference for valid profiles.
+        self.profile_names: dict[int, str] = {}
+        """The name of each profile, keyed by profile ID."""
+
+        # Create a dictionary containing every binding, keyed by profile ID and then button code
+        self.bindings: dict[int, dict[int, Binding]] = {}
+        """Every binding in each profile, including global ones, keyed by profile ID and then button code."""
+
+        # Create a dictionary containing every gesture other than a tap, keyed by profile ID, button code and gesture
+        self.gestures: dict[int, dict[int, dict[str, Binding]]] = {}
+        """Every binding for a gesture other than a tap, keyed by profile ID, button code and then gesture name."""
+
+        # Create a dictionary containing every chord, keyed by profile ID and then the codes of its buttons
+        self.chords: dict[int, dict[frozenset[int], Binding]] = {}
+        """Every chord in each profile, including global ones, keyed by profile ID and then the codes of its buttons."""
+
+        # Validate the axis bindings, which are the same across profiles
+        self.axes: dict[int, AxisBinding] = self._parseAxes(data.get("axes", {}))
+        """Every axis binding, keyed by axis code."""
+
+        # Validate the global bindings, which are the same across profiles
+        global_bindings, global_gestures, global_chords = self._parseButtons(data.get("global", {}), "global")
+
+        # Validate the profiles
+        profiles: Any = data.get("profiles", [])
+        if not isinstance(profiles, list) or not profiles:
+            raise ValueError(f"The keymap file \"{path}\" needs at least one [[profiles]] entry!")
+
+        for profile_id, profile in enumerate(profiles):
+            where: str = f"profile {profile_id}"
+            if not isinstance(profile, dict):
+                raise ValueError(f"{where.capitalize()} in the keymap must be a table!")
+
+            # Check for any keys that don't belong
+            unknown_keys: set[str] = set(profile) - {"name", "buttons"}
+            if unknown_keys:
+                raise ValueError(f"Unknown key(s) {sorted(unknown_keys)} in {where} of the keymap!")
+
+            # Get the profile's name, handling if it doesn't have one assigned
+            name: Any = profile.get("name", f"profile_{profile_id}")
+            if not isinstance(name, str):
+                raise ValueError(f"The name of {where} in the keymap must be a string!")
+            self.profile_names[profile_id] = name
+
+            # Profile bindings override global ones, including every gesture of a button the profile binds at all
+            bindings, gestures, chords = self._parseButtons(profile.get("buttons", {}), f"{where} (\"{name}\")")
+            overridden: set[int] = set(bindings) | set(gestures)
+            self.bindings[profile_id] = {
+                code: binding for code, binding in global_bindings.items() if code not in overridden
+            } | bindings
+            self.gestures[profile_id] = {
+                code: binding for code, binding in global_gestures.items() if code not in overridden
+            } | gestures
+            self.chords[profile_id] = global_chords | chords
+
+        return
+
+    def _parseButtons(
+            self,
+            buttons: Any,
+            where: str
+    ) -> tuple[dict[int, Binding], dict[int, dict[str, Binding]], dict[frozenset[int], Binding]]:
+        """
+        Validates a table of button bindings, returning the tap bindings keyed by button code, the other
+        gestures keyed by button code and gesture name, and the chords keyed by the codes of their buttons.
+        """
+
+        if not isinstance(buttons, dict):
+            raise ValueError(f"The buttons of {where} in the keymap must be a table!")
+
+        bindings: dict[int, Binding] = {}
+        gestures: dict[int, dict[str, Binding]] = {}
+        chords: dict[frozenset[int], Binding] = {}
+        for button_name, spec in buttons.items():
+            # Handle a chord, which is several button names joined by "+"
+            if "+" in button_name:
+                chord_names: list[str] = [chord_name.strip() for chord_name in button_name.split("+")]
+                for chord_name in chord_names:
+                    if chord_name not in self._codes_by_name:
+                        raise ValueError(f"Unknown button \"{chord_name}\" in the chord \"{button_name}\" in {where} "
+                                         "of the keymap!")
+                codes: frozenset[int] = frozenset(self._codes_by_name[chord_name] for chord_name in chord_names)
+                if len(codes) != len(chord_names):
+                    raise ValueError(f"The chord \"{button_name}\" in {where} of the keymap uses a button twice!")
+                if codes in chords:
+                    raise ValueError(f"The chord \"{button_name}\" in {where} of the keymap is bound twice!")
+                if isinstance(spec, dict) and set(spec) & self.gesture_names:
+                    raise ValueError(f"The chord \"{button_name}\" in {where} of the keymap can't have gestures!")
+
+                chords[codes] = self._parseBinding(spec, button_name, f"{button_name} in {where}")
+                continue
+
+            # Make sure the button exists
+            if button_name not in self._codes_by_name:
+                raise ValueError(f"Unknown button \"{button_name}\" in {where} of the keymap!")
+            code: int = self._codes_by_name[button_name]
+
+            # Handle a table of gestures, each with a binding of its own
+            if isinstance(spec, dict) and set(spec) & self.gesture_names:
+                unknown_keys: set[str] = set(spec) - self.gesture_names
+                if unknown_keys:
+                    raise ValueError(
+                        f"Unknown gesture(s) {sorted(unknown_keys)} for {button_name} in {where} of the keymap! "
+                        f"Gestures have to be one of {sorted(self.gesture_names)}."
+                    )
+                if "hold_repeat" in spec and len(spec) > 1:
+                    raise ValueError(
+                        f"hold_repeat for {button_name} in {where} of the keymap fires on press, so it can't be "
+                        "bound alongside other gestures!"
+                    )
+
+                for gesture, gesture_spec in spec.items():
+                    binding: Binding = self._parseBinding(
+                        gesture_spec, button_name, f"the {gesture} of {button_name} in {where}"
+                    )
+                    if gesture == "tap":
+                        bindings[code] = binding
+                    else:
+                        gestures.setdefault(code, {})[gesture] = binding
+                continue
+
+            bindings[code] = self._parseBinding(spec, button_name, f"{button_name} in {where}")
+
+        return bindings, gestures, chords
+
+    def _parseBinding(self, spec: Any, button_name: str, where: str) -> Binding:
+        """Validates a single binding, turning it into a ``Binding``."""
+
+        if not isinstance(spec, dict):
+            raise ValueError(f"The binding for {where} of the keymap must be a table!")
+
+        # Figure out what type of binding it is
+        kinds: list[str] = [kind for kind in self.binding_keys if kind in spec]
+        if len(kinds) != 1:
+            raise ValueError(
+                f"The binding for {where} of the keymap must have exactly one of {sorted(self.binding_keys)}!"
+            )
+        kind: str = kinds[0]
+
+        # Check for any keys that don't belong
+        unknown_keys: set[str] = set(spec) - self.binding_keys[kind]
+        if unknown_keys:
+            raise ValueError(f"Unknown key(s) {sorted(unknown_keys)} in the binding for {where} of the keymap!")
+
+        # Validate each type of binding, and convert it to the arguments its handler takes
+        if kind == "song":
+            if not isinstance(spec["song"], str) or not spec["song"]:
+                raise ValueError(f"The song for {where} of the keymap must be a file name!")
+
+            return Binding(kind, {"song_file": spec["song"]}, button_name)
+
+        elif kind == "action":
+            if not isinstance(spec["action"], str) or not spec["action"]:
+                raise ValueError(f"The action for {where} of the keymap must be an action name!")
+            if not isinstance(spec.get("args", {}), dict):
+                raise ValueError(f"The action args for {where} of the keymap must be a table!")
+
+            return Binding(kind, {"action_name": spec["action"], "args": spec.get("args")}, button_name)
+
+        elif kind == "player":
+            if spec["player"] not in self.player_commands:
+                raise ValueError(
+                    f"The player command for {where} of the keymap must be one of {sorted(self.player_commands)}!"
+                )
+            seconds: Any = spec.get("seconds", 10)
+            if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or seconds <= 0:
+                raise ValueError(f"The seconds for {where} of the keymap must be a positive number!")
+
+            return Binding(kind, {"command": spec["player"], "seconds": float(seconds)}, button_name)
+
+        else:
+            if spec["profile"] not in self.profile_directions:
+                raise ValueError(
+                    f"The profile direction for {where} of the keymap must be one of "
+                    f"{sorted(self.profile_directions)}!"
+                )
+
+            return Binding(kind, {"direction": spec["profile"]}, button_name)
+
+    def _parseAxes(self, axes: Any) -> dict[int, AxisBinding]:
+        """Validates the table of axis bindings, returning them keyed by axis code."""
+
+        if not isinstance(axes, dict):
+            raise ValueError("The axes of the keymap must be a table!")
+
+        bindings: dict[int, AxisBinding] = {}
+        for axis_name, spec in axes.items():
+            # Make sure the axis exists
+            code: Any = ecodes.ecodes.get(axis_name)
+            if not axis_name.startswith("ABS_") or not isinstance(code, int):
+                raise ValueError(f"Unknown axis \"{axis_name}\" in the keymap! Axes are named like \"ABS_X.\"")
+
+            bindings[code] = self._parseAxisBinding(spec, axis_name, f"axis {axis_name}")
+
+        return bindings
+
+    def _parseAxisBinding(self, spec: Any, axis_name: str, where: str) -> AxisBinding:
+        """Validates a single axis binding, turning it into an ``AxisBinding``."""
+
+        if not isinstance(spec, dict):
+            raise ValueError(f"The binding for {where} of the keymap must be a table!")
+
+        # Figure out what type of binding it is
+        kinds: list[str] = [kind for kind in self.axis_binding_keys if kind in spec]
+        if len(kinds) != 1:
+            raise ValueError(
+                f"The binding for {where} of the keymap must have exactly one of {sorted(self.axis_binding_keys)}!"
+            )
+        kind: str = kinds[0]
+
+        # Check for any keys that don't belong
+        unknown_keys: set[str] = set(spec) - self.axis_binding_keys[kind] - self.axis_shared_keys
+        if unknown_keys:
+            raise ValueError(f"Unknown key(s) {sorted(unknown_keys)} in the binding for {where} of the keymap!")
+
+        # Validate the range of raw values, which defaults to a single byte like most joysticks
+        raw_range: Any = spec.get("range", [0, 255])
+        if (
+                not isinstance(raw_range, list) or len(raw_range) != 2
+                or not all(isinstance(value, int) and not isinstance(value, bool) for value in raw_range)
+                or raw_range[0] >= raw_range[1]
+        ):
+            raise ValueError(f"The range for {where} of the keymap must be a lowest and highest whole number!")
+
+        # Validate the range of output values
+        output: Any = spec.get("output", [0, 1] if kind == "player" else [0, 100])
+        if (
+                not isinstance(output, list) or len(output) != 2
+                or not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in output)
+        ):
+            raise ValueError(f"The output for {where} of the keymap must be a lowest and highest number!")
+
+        # Validate the deadzone and hysteresis
+        for key in ("deadzone", "hysteresis"):
+            value: Any = spec.get(key, 0)
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise ValueError(f"The {key} for {where} of the keymap must be a whole number of at least 0!")
+
+        if not isinstance(spec.get("invert", False), bool):
+            raise ValueError(f"Invert for {where} of the keymap must be true or false!")
+
+        # Validate each type of binding, and convert it to the arguments its handler takes
+        if kind == "player":
+            if spec["player"] not in self.player_axis_commands:
+                raise ValueError(
+                    f"The player setting for {where} of the keymap must be one of "
+                    f"{sorted(self.player_axis_commands)}!"
+                )
+            params: dict[str, Any] = {"setting": spec["player"]}
+            ## Settings like the volume are fractions, so they shouldn't be rounded to whole numbers
+            output = [float(output[0]), float(output[1])]
+
+        else:
+            if not isinstance(spec["action"], str) or not spec["action"]:
+                raise ValueError(f"The action for {where} of the keymap must be an action name!")
+            if not isinstance(spec.get("arg", "value"), str) or not spec.get("arg", "value"):
+                raise ValueError(f"The arg for {where} of the keymap must be the name of an action argument!")
+            if not isinstance(spec.get("args", {}), dict):
+                raise ValueError(f"The action args for {where} of the keymap must be a table!")
+            params = {"action_name": spec["action"], "arg": spec.get("arg", "value"), "args": spec.get("args")}
+
+        return AxisBinding(
+            kind=kind,
+            params=params,
+            axis_name=axis_name,
+            minimum=raw_range[0],
+            maximum=raw_range[1],
+            output=(output[0], output[1]),
+            deadzone=spec.get("deadzone", 0),
+            hysteresis=spec.get("hysteresis", 0),
+            invert=spec.get("invert", False)
+        )
+
+    def songsForProfile(self, profile_id: int) -> set[str]:
+        """
+        Gets the songs bound in a profile.
+
+        :param profile_id: The ID of the profile.
+
+        :returns: ``set[str]`` - Every song file bound in the profile, whether to a tap, a gesture or a chord.
+
+        :raises None:
+        """
+
+        return {
+            binding.params["song_file"]
+            for binding in (
+                *self.bindings.get(profile_id, {}).values(),
+                *(binding for gestures in self.gestures.get(profile_id, {}).values() for binding in gestures.values()),
+                *self.chords.get(profile_id, {}).values()
+            )
+            if binding.kind == "song"
+        }
+
+    def compile(
+            self,
+            handlers: dict[str, Callable[..., Awaitable[int]]]
+    ) -> dict[tuple[int, int | frozenset[int] | tuple[int, str]], Callable[[], Awaitable[int]]]:
+        """
+        Compiles the keymap into a dispatch table, so finding what a button does is a
+        single dictionary lookup no matter how many profiles or buttons there are.
+
+        :param handlers: The coroutine function to call for each type of binding. It's
+         called with the binding's parameters as keyword arguments, and returns one of
+         the journal's ``STATUS_`` constants.
+
+        :returns: ``dict[tuple[int, int | frozenset[int] | tuple[int, str]], Callable[[], Awaitable[int]]]`` -
+         The handler for each profile ID paired with a button code, the codes of a chord,
+         or a button code and gesture name.
+
+        :raises ValueError: If there's no handler for a type of binding used in the keymap.
+        """
+
+        dispatch_table: dict[tuple[int, int | frozenset[int] | tuple[int, str]], Callable[[], Awaitable[int]]] = {}
+        for profile_id in self.profile_names:
+            for key, binding in (
+                    *self.bindings[profile_id].items(),
+                    *self.chords[profile_id].items(),
+                    *(
+                        ((code, gesture), binding)
+                        for code, gestures in self.gestures[profile_id].items()
+                        for gesture, binding in gestures.items()
+                    )
+            ):
+                if binding.kind not in handlers:
+                    raise ValueError(f"There's no handler for \"{binding.kind}\" bindings!")
+
+                dispatch_table[(profile_id, key)] = partial(handlers[binding.kind], **binding.params)
+
+        return dispatch_table
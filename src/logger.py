@@ -1,37 +1,73 @@
 # Imports
+import copy
 import logging
 from logging import handlers
 import tomllib
 from sys import stderr, stdout
 import os
+import queue
+import threading
+import atexit
+import time
+import re
+import gzip
+import shutil
 from typing import Literal, Mapping, Any
 from datetime import datetime
 
 
 class DailyRotatingFileHandler(handlers.TimedRotatingFileHandler):
-    def __init__(self, filename="latest.log", **kwargs):
+    # The names archived logs are given, which are MM-DD-YYYY[_N].log, optionally gzipped
+    archive_name_pattern: re.Pattern = re.compile(r"^\d{2}-\d{2}-\d{4}(_\d+)?\.log(\.gz)?$")
+
+    def __init__(
+            self,
+            filename="latest.log",
+            max_bytes: int = 0,
+            retention_days: float = 14,
+            retention_total_bytes: int = 0,
+            retention_count: int = 30,
+            compress: bool = True,
+            **kwargs
+    ):
         # Get the full path of the log file and make it class-accessible
         self.base_filename = os.path.abspath(filename)
 
+        # Make the size limit and retention settings class-accessible
+        ## A value of 0 turns that limit off.
+        self.max_bytes: int = max_bytes
+        self.retention_days: float = retention_days
+        self.retention_total_bytes: int = retention_total_bytes
+        self.retention_count: int = retention_count
+        self.compress: bool = compress
+
+        # Create the queue of archived logs to be compressed, and the thread that compresses them
+        ## Compressing and cleaning up happen on their own thread, so a rollover only costs a rename.
+        self._archive_queue: queue.Queue[str | None] = queue.Queue()
+        self._archiver_thread: threading.Thread = threading.Thread(
+            target=self._archiver, name="log-archiver", daemon=True
+        )
+        self._archiver_thread.start()
+
         # Check if the file already exists, and if it does, archive it
         if os.path.exists(self.base_filename):
             self._archive_existing()
 
-        # Initialize the parent class
+        # Pick up anything left uncompressed or over the limits by a previous run
+        self._archive_queue.put("")
+
+        # Initialize the parent class, which opens a new stream to the latest.log file
         super().__init__(
             # The filename to use
             filename,
             # The interval to archive files at. Midnight technically means daily.
             when="midnight",
             interval=1,
-            # How many old logs to keep
-            backupCount=7,
+            # Old logs are cleaned up by the archiver thread instead
+            backupCount=0,
             **kwargs
         )
 
-        # Create a new stream to the latest.log file
-        self.stream = self._open()
-
     def _archive_existing(self):
         """Archive current latest.log into MM-DD-YYYY[_N].log"""
 
@@ -43,7 +79,7 @@ class DailyRotatingFileHandler(handlers.TimedRotatingFileHandler):
         # Go through all existing logs, and if a log with a duplicate name exists,
         # add a counter suffix to it to prevent duplicates
         counter: int = 1
-        while os.path.exists(rollover_filename):
+        while os.path.exists(rollover_filename) or os.path.exists(f"{rollover_filename}.gz"):
             rollover_filename = os.path.join(
                 os.path.dirname(self.base_filename),
                 f"{timestamp}_{counter}.log"
@@ -53,6 +89,16 @@ class DailyRotatingFileHandler(handlers.TimedRotatingFileHandler):
         # Rename the last latest.log to the new archival name.
         os.rename(self.base_filename, rollover_filename)
 
+        # Hand it over to be compressed and cleaned up in the background
+        self._archive_queue.put(rollover_filename)
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        # Roll over at midnight, or once the file gets too big
+        if super().shouldRollover(record):
+            return True
+
+        return bool(self.max_bytes and self.stream and self.stream.tell() >= self.max_bytes)
+
     def doRollover(self):
         # Check if the stream is active, and if it is, close it
         if self.stream:
@@ -63,9 +109,359 @@ class DailyRotatingFileHandler(handlers.TimedRotatingFileHandler):
         if os.path.exists(self.base_filename):
             self._archive_existing()
 
+        # Work out when the next midnight rollover is
+        current_time: int = int(time.time())
+        new_rollover_at: int = self.computeRollover(current_time)
+        while new_rollover_at <= current_time:
+            new_rollover_at += self.interval
+        self.rolloverAt = new_rollover_at
+
         # Reopen new latest.log for continued logging
         self.stream = self._open()
 
+    def _archiver(self) -> None:
+        """Compresses archived logs and enforces the retention limits, until told to stop."""
+
+        while True:
+            path: str | None = self._archive_queue.get()
+            if path is None:
+                return
+
+            # An empty path asks for every archived log that isn't compressed yet
+            if not path:
+                directory: str = os.path.dirname(self.base_filename)
+                paths: list[str] = [
+                    os.path.join(directory, file_name) for file_name in os.listdir(directory)
+                    if self.archive_name_pattern.match(file_name) and not file_name.endswith(".gz")
+                ]
+            else:
+                paths = [path]
+
+            for path in paths:
+                # Skip logs that were already dealt with
+                if not self.compress or not os.path.exists(path):
+                    continue
+
+                try:
+                    self._compress(path)
+                except OSError as error:
+                    print(f"\033[91mFailed to compress the log \"{path}\": {error}\033[0m", file=stderr)
+
+            try:
+                self._enforceRetention()
+            except OSError as error:
+                print(f"\033[91mFailed to clean up old logs: {error}\033[0m", file=stderr)
+
+    @staticmethod
+    def _compress(path: str) -> None:
+        """Gzips a log, replacing the original."""
+
+        # Write to a temporary file first, so an interrupted compression leaves the original untouched
+        with open(path, "rb") as source, gzip.open(f"{path}.gz.tmp", "wb") as destination:
+            shutil.copyfileobj(source, destination)
+        os.replace(f"{path}.gz.tmp", f"{path}.gz")
+        os.remove(path)
+
+        return
+
+    def _enforceRetention(self) -> None:
+        """Deletes the oldest archived logs until they're within the age, size and count limits."""
+
+        directory: str = os.path.dirname(self.base_filename)
+
+        # Get every archived log, newest first
+        archives: list[tuple[float, int, str]] = []
+        for file_name in os.listdir(directory):
+            if self.archive_name_pattern.match(file_name):
+                stat: os.stat_result = os.stat(os.path.join(directory, file_name))
+                archives.append((stat.st_mtime, stat.st_size, os.path.join(directory, file_name)))
+        archives.sort(reverse=True)
+
+        # Keep logs, newest first, until one of the limits is hit
+        oldest_allowed: float = time.time() - self.retention_days * 86400
+        total_bytes: int = 0
+        for index, (modified_time, size, path) in enumerate(archives):
+            total_bytes += size
+            if (
+                    (self.retention_count and index >= self.retention_count)
+                    or (self.retention_total_bytes and total_bytes > self.retention_total_bytes)
+                    or (self.retention_days and modified_time < oldest_allowed)
+            ):
+                os.remove(path)
+
+        return
+
+    def close(self):
+        # Let the archiver finish what it's doing, so no half-compressed logs are left behind
+        if self._archiver_thread.is_alive():
+            self._archive_queue.put(None)
+            self._archiver_thread.join(5)
+
+        super().close()
+
+
+# The formatter used to turn tracebacks into text before records are queued
+_exception_formatter: logging.Formatter = logging.Formatter()
+
+
+# A handler that only puts records in a queue, so the thread logging never waits on disk.
+## The records are written out in batches by a LogWriter thread.
+class QueueHandler(logging.Handler):
+    def __init__(self, record_queue: queue.Queue, policy: Literal["drop", "block"] = "drop") -> None:
+        # Make the queue and policy class-accessible
+        self.queue: queue.Queue = record_queue
+        self.policy: Literal["drop", "block"] = policy
+        del record_queue, policy  # Cleanup
+
+        # Create a counter for how many records were dropped because the queue was full
+        self.dropped_records: int = 0
+
+        # Initialize the parent class
+        super().__init__()
+
+        return
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Makes a copy of a record that's safe to hand to another thread, like the standard library's queue handler does.
+
+        :param record: The record to prepare.
+
+        :returns: ``logging.LogRecord`` - The copy, with its message and any traceback already turned into text.
+
+        :raises None:
+        """
+
+        # Copy the record, so the other handlers still get the original
+        record = copy.copy(record)
+
+        # Merge the arguments into the message now, since they could change before the writer gets to them
+        record.msg = record.getMessage()
+        record.args = None
+
+        # Turn the traceback into text, so the exception and the frames it holds on to can be let go of
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        record = self.prepare(record)
+
+        # Wait for room in the queue if the policy says to
+        if self.policy == "block":
+            self.queue.put(record)
+            return
+
+        # Otherwise, drop the record if the queue is full
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+
+        return
+
+
+# A thread that writes queued records to a handler in batches, flushing once per batch
+class LogWriter(threading.Thread):
+    def __init__(self, queue_handler: QueueHandler, handler: logging.Handler, batch_size: int = 256) -> None:
+        # Make the handlers and batch size class-accessible
+        self._queue_handler: QueueHandler = queue_handler
+        self._handler: logging.Handler = handler
+        self._batch_size: int = batch_size
+        del queue_handler, handler, batch_size  # Cleanup
+
+        # Create a variable for how many dropped records have been reported already
+        self._reported_drops: int = 0
+
+        # Initialize the parent class
+        super().__init__(name="log-writer", daemon=True)
+
+        return
+
+    def _write(self, record: logging.LogRecord) -> None:
+        """Writes a single record, rolling the file over first if it's time to."""
+
+        if record.levelno < self._handler.level or not self._handler.filter(record):
+            return
+
+        try:
+            # Roll over here, so it never happens on the thread that logged the record
+            if isinstance(self._handler, handlers.BaseRotatingHandler) and self._handler.shouldRollover(record):
+                self._handler.doRollover()
+
+            self._handler.stream.write(self._handler.format(record) + self._handler.terminator)
+
+        except Exception:
+            self._handler.handleError(record)
+
+        return
+
+    def run(self) -> None:
+        record_queue: queue.Queue = self._queue_handler.queue
+
+        while True:
+            # Wait for a record, then grab everything else that's waiting with it
+            batch: list[logging.LogRecord | None] = [record_queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(record_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            with self._handler.lock:
+                # Report any records that were dropped since the last batch
+                dropped: int = self._queue_handler.dropped_records
+                if dropped > self._reported_drops:
+                    self._write(logging.makeLogRecord({
+                        "msg": f"{dropped - self._reported_drops} log records were dropped because the log queue "
+                               "was full.",
+                        "levelno": logging.WARNING,
+                        "levelname": "WARNING",
+                    }))
+                    self._reported_drops = dropped
+
+                for record in batch:
+                    # Stop once the sentinel comes through, after writing everything before it
+                    if record is None:
+                        self._handler.flush()
+                        return
+                    self._write(record)
+
+                self._handler.flush()
+
+    def stop(self, timeout: float | None = 5) -> None:
+        """Writes out everything that's still queued, then stops the thread and closes the handler."""
+
+        if self.is_alive():
+            # Let the sentinel wait for room, since it must get through
+            self._queue_handler.queue.put(None)
+            self.join(timeout)
+
+        self._handler.close()
+
+        return
+
+
+# The thread writing the log file, set up by configureLogger()
+_log_writer: LogWriter | None = None
+
+
+def shutdownLogging(timeout: float | None = 5) -> None:
+    """
+    Writes out every queued log record and stops the log writer thread.
+
+    :param timeout: How long to wait for the queue to be written out, in seconds.
+
+    :returns: ``None``
+
+    :raises None:
+    """
+
+    global _log_writer
+
+    if _log_writer:
+        _log_writer.stop(timeout)
+        _log_writer = None
+
+    return
+
+
+# The parts of the program that get their own logger, and with that their own logging level
+SUBSYSTEMS: set[str] = {"input", "websocket", "music", "panel"}
+
+
+def getSubsystemLogger(subsystem: str) -> logging.Logger:
+    """
+    Gets the logger for a part of the program. Each one can be given its own
+    logging level in the config, so debug logs can be turned on for just the part
+    being worked on.
+
+    :param subsystem: The part of the program. One of ``SUBSYSTEMS``.
+
+    :returns: ``logging.Logger`` - The logger for the subsystem.
+
+    :raises ValueError: If the subsystem doesn't exist.
+    """
+
+    if subsystem not in SUBSYSTEMS:
+        raise ValueError(f"Unknown logging subsystem \"{subsystem}!\"")
+
+    return logging.getLogger(f"redneck.{subsystem}")
+
+
+# A filter that rate limits records using a token bucket for each message, so hot paths can't flood the logs.
+## Once a message is allowed through again, it notes how many of it were suppressed in the meantime.
+class RateLimitFilter(logging.Filter):
+    def __init__(self, rate: float = 20, burst: int = 50) -> None:
+        # Make the rate and burst class-accessible
+        self.rate: float = rate
+        self.burst: int = burst
+        del rate, burst  # Cleanup
+
+        # Create the buckets, keyed by logger name and unformatted message
+        ## Each holds the tokens left, the time it was last refilled and how many records were suppressed.
+        self._buckets: dict[tuple[str, Any], list] = {}
+
+        # Create a variable for when idle buckets were last thrown out
+        ## Plenty of messages are formatted before they're logged, such as ones with song names in them, so each one
+        ## gets its own bucket, and those would otherwise pile up for as long as the program runs.
+        self._last_sweep: float = time.monotonic()
+
+        # Create a lock, since records can come from several threads
+        self._lock: threading.Lock = threading.Lock()
+
+        # Initialize the parent class
+        super().__init__()
+
+        return
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Never hold back errors
+        if record.levelno >= logging.ERROR:
+            return True
+
+        now: float = time.monotonic()
+        key: tuple[str, Any] = (record.name, record.msg)
+
+        with self._lock:
+            # Throw out buckets that have been idle long enough to refill, about once a second
+            ## A full bucket with nothing suppressed is the same as not having one at all.
+            if now - self._last_sweep >= 1:
+                self._last_sweep = now
+                refill_time: float = self.burst / self.rate
+                for idle_key in [
+                    idle_key for idle_key, (_, refilled_at, suppressed) in self._buckets.items()
+                    if not suppressed and now - refilled_at >= refill_time
+                ]:
+                    del self._buckets[idle_key]
+
+            bucket: list | None = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+
+            # Refill the bucket for the time that passed
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+            # Suppress the record if the bucket is empty
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+
+            bucket[0] -= 1
+            suppressed: int = bucket[2]
+            bucket[2] = 0
+
+        # Note how many were suppressed since the last one got through
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+
+        return True
+
 
 # A custom stream handler for the console that sends errors to STDERR, and everything else to STDOUT.
 ## Why this isn't default behaviour I don't know...
@@ -129,6 +525,25 @@ class Formatter(logging.Formatter):
             return f"{super().format(record)}"
 
 
+def _parseLoggingLevel(logging_level_str: str) -> int:
+    """Converts a logging level from the config into its number."""
+
+    logging_level_str = str(logging_level_str).lower()
+
+    # Set the logging level based on that value
+    logging_level: int = logging.INFO
+    if logging_level_str in {"debug", "d"}:
+        logging_level = logging.DEBUG
+    elif logging_level_str in {"warn", "warning", "w"}:
+        logging_level = logging.WARNING
+    elif logging_level_str in {"error", "err", "e"}:
+        logging_level = logging.ERROR
+    elif logging_level_str in {"fatal", "critical", "f", "c"}:
+        logging_level = logging.FATAL
+
+    return logging_level
+
+
 def configureLogger() -> logging.Logger:
     """
     Creates a fully configured base logger for the program,
@@ -150,24 +565,34 @@ def configureLogger() -> logging.Logger:
     console_logging_handler: logging.StreamHandler = StreamHandler()
 
     # Get the logging level from the config
-    logging_level_str: str = str(config.get("logging_level", "info")).lower()
-
-    # Set the logging level based on that value
-    logging_level: int = logging.INFO
-    if logging_level_str in {"debug", "d"}:
-        logging_level = logging.DEBUG
-    elif logging_level_str in {"warn", "warning", "w"}:
-        logging_level = logging.WARNING
-    elif logging_level_str in {"error", "err", "e"}:
-        logging_level = logging.ERROR
-    elif logging_level_str in {"fatal", "critical", "f", "c"}:
-        logging_level = logging.FATAL
+    logging_level_name: str = config.get("logging_level", "info")
+    logging_level: int = _parseLoggingLevel(logging_level_name)
 
     # Finally, set the logging level
     console_logging_handler.setLevel(logging_level)
 
+    # Give each subsystem its own level, so their debug logs are thrown out before they're even formatted
+    ## Subsystems that aren't in the config use the console's level. A subsystem set lower than the
+    ## console only shows its extra logs in the log file.
+    subsystem_logging_levels: dict = config.get("subsystem_logging_levels", {})
+    rate_limit_filter: RateLimitFilter = RateLimitFilter(
+        rate=config.get("log_rate_limit", 20),
+        burst=config.get("log_rate_burst", 50)
+    )
+    for subsystem in SUBSYSTEMS:
+        subsystem_logger: logging.Logger = getSubsystemLogger(subsystem)
+        subsystem_logger.setLevel(_parseLoggingLevel(subsystem_logging_levels.get(subsystem, logging_level_name)))
+        subsystem_logger.addFilter(rate_limit_filter)
+
     # Create a handler for the file logger
-    file_logging_handler: handlers.TimedRotatingFileHandler = DailyRotatingFileHandler("logs/latest.log")
+    file_logging_handler: handlers.TimedRotatingFileHandler = DailyRotatingFileHandler(
+        "logs/latest.log",
+        max_bytes=int(config.get("log_max_size_mb", 50) * 1024 * 1024),
+        retention_days=config.get("log_retention_days", 14),
+        retention_total_bytes=int(config.get("log_retention_total_mb", 500) * 1024 * 1024),
+        retention_count=config.get("log_retention_count", 30),
+        compress=config.get("log_compress", True)
+    )
     # Set the file logger to debug
     file_logging_handler.setLevel(logging.DEBUG)
 
@@ -188,8 +613,25 @@ def configureLogger() -> logging.Logger:
     console_logging_handler.setFormatter(console_logging_formatter)
     file_logging_handler.setFormatter(file_logging_formatter)
 
+    # Put the file handler behind a queue, so records are written in batches by a separate thread
+    ## This keeps disk writes and log rollovers off of the event loop.
+    log_queue_policy: str = str(config.get("log_queue_policy", "drop")).lower()
+    if log_queue_policy not in {"drop", "block"}:
+        raise ValueError(f"Unknown log queue policy \"{log_queue_policy}!\" It must be \"drop\" or \"block.\"")
+    queue_logging_handler: QueueHandler = QueueHandler(
+        queue.Queue(maxsize=config.get("log_queue_size", 10000)),
+        policy=log_queue_policy
+    )
+    queue_logging_handler.setLevel(logging.DEBUG)
+
+    # Start the thread writing the file
+    global _log_writer
+    _log_writer = LogWriter(queue_logging_handler, file_logging_handler)
+    _log_writer.start()
+    atexit.register(shutdownLogging)
+
     # Finally, add both handlers to the logger
     log.addHandler(console_logging_handler)
-    log.addHandler(file_logging_handler)
+    log.addHandler(queue_logging_handler)
 
     return log
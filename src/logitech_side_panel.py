@@ -1,24 +1,79 @@
 # Imports
 import asyncio
 import os.path
-from logging import Logger, getLogger
+from logging import Logger
+from src.logger import getSubsystemLogger
 from src.music_player import MusicPlayer
 import tomllib
 from src.streamer_bot_ws import StreamerBotWebsocket
 from src.notifications import Notifications
+from src.keymap import Binding, Keymap
+from src.axis_processor import AxisProcessor
+from src.chord_resolver import ChordResolver
+from src.gestures import GestureRecognizer
+from src.timer_wheel import TimerWheel
+from src.action_executor import ActionExecutor
+from src import journal
+from src.journal import EventJournal
+from functools import partial
+from typing import Awaitable, Callable
+import time
+from evdev import ecodes
 
 
 class LogitechSidePanel:
     def __init__(
             self,
-            streamer_bot_ws_instance: StreamerBotWebsocket
+            streamer_bot_ws_instance: StreamerBotWebsocket,
+            journal_instance: EventJournal | None = None,
+            name: str = "side panel",
+            device_index: int = 0,
+            keymap_file: str | None = None,
+            button_codes: dict[int, str] | None = None,
+            music_player: MusicPlayer | None = None,
+            notifications: Notifications | None = None,
+            timer_wheel: TimerWheel | None = None,
+            action_executor: ActionExecutor | None = None
     ) -> None:
+        """
+        Handles the button presses of a single input device. With several devices,
+        each one gets its own side panel object, and so its own keymap and current
+        profile, while the music player and notifications are shared between them.
+
+        :param streamer_bot_ws_instance: The websocket client to run Streamer.bot actions with.
+        :param journal_instance: The event journal to record dispatches in, if any.
+        :param name: The name of the device, as it's configured.
+        :param device_index: The position of the device in the config, which identifies it in the journal.
+        :param keymap_file: The keymap to use. Defaults to the one set in the config.
+        :param button_codes: The codes for each button with a corresponding button name. Defaults
+         to the buttons of the Logitech side panel.
+        :param music_player: The music player to share with other devices. One is created if not given.
+        :param notifications: The notifications object to share with other devices. One is created if not given.
+        :param timer_wheel: The timer wheel to share with other devices for gesture timers. One is created if not given.
+        :param action_executor: The executor to share with other devices for running what buttons are bound to.
+         One is created if not given.
+
+        :returns: ``None``
+
+        :raises FileNotFoundError: If the keymap file doesn't exist.
+        :raises ValueError: If the keymap file is invalid.
+        """
+
+        # Make the name and index of the device class-accessible
+        self.name: str = name
+        self.device_index: int = device_index
+        del name, device_index  # Cleanup
+
         # Make the Streamer.bot websocket client class-accessible
         self.streamer_bot: StreamerBotWebsocket = streamer_bot_ws_instance
         del streamer_bot_ws_instance  # Cleanup
 
+        # Make the event journal class-accessible, if there is one
+        self.journal: EventJournal | None = journal_instance
+        del journal_instance  # Cleanup
+
         # Create a dictionary containing the names of each button reflecting the key code for said button
-        self.button_codes: dict = {
+        self.button_codes: dict = button_codes or {
             304: "button_1",
             305: "button_2",
             306: "button_3",
@@ -49,50 +104,23 @@ class LogitechSidePanel:
         }
         """The codes for each button with a corresponding button name as a string."""
 
-        # Create a dictionary containing names for the profiles
-        ## This also acts as a reference for valid profiles.
-        self.profile_names: dict = {
-            0: "Main",
-            1: "Oops! All Music!"
-        }
-
-        # The songs for each corresponding button
-        self.song_mappings: dict = {
-            0: {
-                "button_1": "M4G1C DR34MS.mp3",
-                "button_2": "Stray - Main Menu Theme - OST Soundtrack #stray #straygame.mp3",
-                "button_3": "Mass Effect Trilogy - Extended Galaxy Map Theme (HD).mp3",
-                "button_6": "TES V Skyrim Soundtrack - The Streets of Whiterun.mp3",
-                "button_7": "Gran Turismo 5 Soundtrack feels so good - KEMMEI ADACHI (Lounge Music).mp3",
-                "button_8": "Scheming Through The Zombie Apocalypse   Main Music.mp3",
-                "button_11": "Grab a Cab.mp3",
-                "button_12": "Team Fortress 2 Soundtrack   Red Bread.mp3",
-                "button_13": "Punch-Out Wii Theme.mp3",
-                "button_14": "il vento d'oro.mp3",
-                "button_15": "Pepsiman Pepsiman Pepsiman   Pepsiman Remix.mp3",
-                "button_16": "PIZZA TOWER - It's Pizza Time! (METAL COVER by RichaadEB).mp3"
-            },
-            1: {
-
-            }
-        }
-
         # Create a variable showing the current profile
         self.current_profile: int = 0
         """The current profile the side panel is using."""
 
-        # Create a variable to store the ID of the last made notification
-        self._last_notification_id: int | None = None
-
         # Create the music player library and make it class-accessible
-        self.music_player: MusicPlayer = MusicPlayer()
+        self.music_player: MusicPlayer = music_player or MusicPlayer()
 
         # Create the notifications object and make it class-accessible
-        self.notifications: Notifications = Notifications(
+        self.notifications: Notifications = notifications or Notifications(
             app_name="Redneck Stream Deck",
             app_icon_path="assets/app_icon.png"
         )
 
+        # Create the timer wheel gestures are timed on and make it class-accessible
+        self.timer_wheel: TimerWheel = timer_wheel or TimerWheel()
+        del button_codes, music_player, notifications, timer_wheel  # Cleanup
+
         # Dynamically set the attributes of the class based on the button codes
         for key_code, button_name in self.button_codes.items():
             setattr(self, button_name, key_code)
@@ -100,341 +128,385 @@ class LogitechSidePanel:
         # Fetch the config
         self.config: dict = tomllib.load(open("config.toml", "rb"))
 
+        # Create the executor that runs what buttons are bound to and make it class-accessible
+        ## It's shared, so presses on every device that use the music player stay in order with each other.
+        self.executor: ActionExecutor = action_executor or ActionExecutor(
+            max_concurrency=self.config.get("max_concurrent_actions", 8)
+        )
+        del action_executor  # Cleanup
+
         # Fetch the logger
-        self._log: Logger = getLogger()
+        self._log: Logger = getSubsystemLogger("panel")
+
+        # Load the keymap, which holds the profiles and what each button does in them
+        self.keymap: Keymap = Keymap(
+            path=keymap_file or self.config.get("keymap_file", "keymap.toml"),
+            button_codes=self.button_codes
+        )
+
+        # Create a dictionary containing names for the profiles
+        ## This also acts as a reference for valid profiles.
+        self.profile_names: dict[int, str] = self.keymap.profile_names
+
+        # The songs bound in each profile
+        self.song_mappings: dict[int, set[str]] = {
+            profile_id: self.keymap.songsForProfile(profile_id) for profile_id in self.profile_names
+        }
+
+        # Compile the keymap into a table of what to run for each profile and button code
+        self._dispatch_table: dict[
+            tuple[int, int | frozenset[int] | tuple[int, str]], Callable[[], Awaitable[int]]
+        ] = self.keymap.compile({
+            "song": self._loadSong,
+            "action": self._runAction,
+            "player": self._controlPlayer,
+            "profile": self._cycleProfile,
+        })
+
+        # Create the processor for the device's axes, which turns joystick movements into continuous actions
+        self.axes: AxisProcessor = AxisProcessor(
+            bindings=self.keymap.axes,
+            handlers={
+                "player": self._setPlayerAxis,
+                "action": self._runAxisAction,
+            },
+            max_rate=self.config.get("axis_max_rate", 30)
+        )
+
+        # Work out the gestures bound to each button in each profile, so the gesture recognizer only has to look them up
+        self._bound_gestures: dict[tuple[int, int], frozenset[str]] = {
+            (profile_id, code): frozenset(
+                ({"tap"} if code in self.keymap.bindings[profile_id] else set())
+                | set(self.keymap.gestures[profile_id].get(code, {}))
+            )
+            for profile_id in self.profile_names
+            for code in self.button_codes
+        }
+
+        # Create the recognizer for taps, double-taps, long presses and hold-to-repeat on the device's buttons
+        self.gestures: GestureRecognizer = GestureRecognizer(
+            timer_wheel=self.timer_wheel,
+            gestures_for=lambda code: self._bound_gestures.get((self.current_profile, code), frozenset()),
+            on_gesture=self.handleGesture,
+            double_tap_window=self.config.get("double_tap_window", 0.25),
+            long_press_time=self.config.get("long_press_time", 0.5),
+            repeat_delay=self.config.get("repeat_delay", 0.4),
+            repeat_interval=self.config.get("repeat_interval", 0.1)
+        )
+
+        # Create the resolver for the device's buttons, which groups presses into frames and works out chords
+        ## Whatever isn't a chord is handed over to the gesture recognizer.
+        self.chords: ChordResolver = ChordResolver(
+            chords_for=lambda: self.keymap.chords[self.current_profile],
+            on_press=self.gestures.press,
+            on_chord=self.handleChord,
+            on_release=self.gestures.release,
+            window=self.config.get("chord_window", 0.05)
+        )
+
+        # Start preloading the songs of the first profile
+        self._warmProfileSongs()
 
         return
 
-    async def _loadSong(self, button_name: str) -> None:
+    @property
+    def event_filter(self) -> dict[int, frozenset[int] | None]:
+        """The input events the side panel does anything with, so the rest can be skipped without being decoded."""
+
+        # Every key, so unrecognized ones can still be warned about, and the sync events that end each frame
+        event_filter: dict[int, frozenset[int] | None] = {
+            ecodes.EV_KEY: None,
+            ecodes.EV_SYN: frozenset({ecodes.SYN_REPORT, ecodes.SYN_DROPPED}),
+        }
+
+        # Bound axes
+        if self.keymap.axes:
+            event_filter[ecodes.EV_ABS] = frozenset(self.keymap.axes)
+
+        return event_filter
+
+    def _warmProfileSongs(self) -> None:
         # Get the absolute path to the music directory
         path_to_music_dir: str = os.path.abspath(self.config.get("music_directory", "music/"))
 
-        # Check if the music directory still exists
-        if not os.path.exists(path_to_music_dir):
-            self._log.error("Couldn't find the music directory. Did you delete it, idiot?")
-            return
+        # Preload every song bound in the current profile that actually exists
+        song_paths: list[str] = [
+            os.path.join(path_to_music_dir, song_file)
+            for song_file in self.song_mappings.get(self.current_profile, set())
+        ]
+        ## The cache is shared between every panel, so the songs are kept warm under this panel's index.
+        self.music_player.track_cache.warm(
+            self.device_index, [song_path for song_path in song_paths if os.path.exists(song_path)]
+        )
 
-        # Get the song mappings for the current profile
-        song_mappings_dict: dict = self.song_mappings[self.current_profile]
+        return
 
-        # Make sure button_1 is in the song map
-        if button_name not in song_mappings_dict:
-            self._log.error(f"\"{button_name}\" isn't mapped to any song, stupid!")
-            return
+    async def _loadSong(self, song_file: str) -> int:
+        # Get the absolute path to the music directory
+        path_to_music_dir: str = os.path.abspath(self.config.get("music_directory", "music/"))
 
-        # Make sure there's a song linked to the button
-        if not song_mappings_dict[button_name]:
-            self._log.error(f"\"{button_name}\" doesn't have an assigned song, retard!")
-            return
+        # Check if the music directory still exists
+        if not os.path.exists(path_to_music_dir):
+            self._log.error("Couldn't find the music directory. Did you delete it, idiot?")
+            return journal.STATUS_NOT_FOUND
 
         # Get the full song path
-        song_path: str = os.path.join(path_to_music_dir, song_mappings_dict[button_name])
+        song_path: str = os.path.join(path_to_music_dir, song_file)
         del path_to_music_dir  # Cleanup
 
         # Make sure the song is there
         if not os.path.exists(song_path):
             self._log.error(
-                f"Couldn't find the song \"{song_mappings_dict[button_name]}.\" Maybe try a working file name "
-                "next time?"
+                f"Couldn't find the song \"{song_file}.\" Maybe try a working file name next time?"
             )
-            return
+            return journal.STATUS_NOT_FOUND
 
-        # Load the song and play it
-        self.music_player.load(song_path)
+        # Load the song in a thread, since decoding it can take a while, and play it
+        await asyncio.to_thread(self.music_player.load, song_path)
         self.music_player.play()
-        self._log.debug(f"Now playing \"{song_mappings_dict[button_name]}.\"")
-
-        return
+        self._log.debug("Now playing \"%s.\"", song_file)
 
-    async def _verifyActionExistence(self, action_name: str) -> bool:
-        # Fetch available actions from Streamer.bot
-        actions: dict = await self.streamer_bot.get_actions()
+        return journal.STATUS_OK
 
-        # Get all action names
-        action_names: list[str] = [action["name"].lower() for action in actions["actions"]]
-        del actions  # Cleanup
+    def _getActionId(self, action_name: str) -> str | None:
+        # Look the action up in the cached catalog, which saves a round trip to Streamer.bot
+        action_id: str | None = self.streamer_bot.actions.getActionId(action_name)
 
         # Handle if the required action isn't present
-        if action_name.lower() not in action_names:
-            self._log.error(f"Couldn't find corresponding action \"{action_name}\" in Streamer.bot!")
+        if not action_id:
+            # The catalog may not have been filled yet, so don't blame the user for that
+            if not self.streamer_bot.actions.loaded:
+                self._log.error(f"Can't run action \"{action_name}\" because the actions haven't been loaded from "
+                                "Streamer.bot yet!")
+            else:
+                self._log.error(f"Couldn't find corresponding action \"{action_name}\" in Streamer.bot!")
 
-            return False
+            return None
 
-        return True
+        return action_id
 
-    async def handleButtonPress(self, code: int) -> None:
-        self._log.debug(f"Processing event code {code}...")
+    async def _runAction(
+            self,
+            action_name: str,
+            args: dict | None = None,
+            on_response: Callable[[dict | None], None] | None = None
+    ) -> int:
+        # Get the action's ID, handling if it doesn't exist
+        action_id: str | None = self._getActionId(action_name)
+        if not action_id:
+            return journal.STATUS_NOT_FOUND
+
+        # Run the action, without waiting on Streamer.bot to respond
+        await self.streamer_bot.do_action(
+            action_id=action_id,
+            wait_for_response=False,
+            args=args,
+            on_response=on_response
+        )
 
-        # Persistent buttons (buttons that are the same across profiles
-        ## Cycle profile down
-        if code == self.button_19:
-            if len(self.profile_names) <= 1:
-                self._log.warning("Attempted to switch profiles, but there is only profile to choose from!")
-                self._last_notification_id = await self.notifications.createNotification(
-                    message="There is only one profile to select from!",
-                    title="Profiles Error",
-                    notification_id=self._last_notification_id
-                )
+        return journal.STATUS_SENT
+
+    async def _controlPlayer(self, command: str, seconds: float = 10) -> int:
+        # Make sure there's a song to control
+        if not self.music_player.running:
+            self._log.warning(f"There's no song playing! Can't {command.replace('_', ' ')}!")
+            return journal.STATUS_NOT_FOUND
+
+        ## Fast-forward music player
+        if command == "fast_forward":
+            self.music_player.fast_forward(seconds)
+        ## Rewind music player
+        elif command == "rewind":
+            self.music_player.rewind(seconds)
+        ## Toggle pause on music player
+        elif command == "toggle_pause":
+            if self.music_player.paused:
+                self.music_player.resume()
+            else:
+                self.music_player.pause()
+        ## Stop music player
+        elif command == "stop":
+            self.music_player.stop()
+
+        return journal.STATUS_OK
+
+    async def _setPlayerAxis(self, value: float, setting: str) -> int:
+        ## Change the music volume
+        if setting == "volume":
+            self.music_player.setVolume(value)
+
+        return journal.STATUS_OK
+
+    async def _runAxisAction(self, value: float, action_name: str, arg: str, args: dict | None = None) -> int:
+        # Pass the axis's value to the action alongside any fixed args
+        return await self._runAction(action_name, (args or {}) | {arg: value})
+
+    async def _cycleProfile(self, direction: str) -> int:
+        if len(self.profile_names) <= 1:
+            self._log.warning("Attempted to switch profiles, but there is only profile to choose from!")
+            self.notifications.queueNotification(
+                message="There is only one profile to select from!",
+                title="Profiles Error"
+            )
 
-                return
+            return journal.STATUS_NOT_FOUND
 
-            self._log.debug(f"Old profile ID: {self.current_profile}")
-            # Create a list of profile IDs
-            profiles_ids: list[int] = [profile_id for profile_id in self.profile_names]
+        self._log.debug(f"Old profile ID: {self.current_profile}")
+        # Create a list of profile IDs
+        profiles_ids: list[int] = [profile_id for profile_id in self.profile_names]
 
-            # If the current profile is the first in the list, wrap around to the last one
-            if (self.current_profile + 1) < len(profiles_ids):
-                self.current_profile = profiles_ids[-1]
-            # Otherwise, decrement the ID of the profile
-            else:
-                self.current_profile -= 1
-            self._log.debug(f"New profile ID: {self.current_profile}")
-
-            # Get the profile's name, handling if it doesn't have one assigned
-            profile_name: str = f"profile_{self.current_profile}" if (self.current_profile not in self.profile_names
-                                                                      ) else self.profile_names[self.current_profile]
-
-            # Notify the user of the change
-            self._last_notification_id = await self.notifications.createNotification(
-                message=f"Switched to profile {profile_name}.",
-                title="Profile Change",
-                notification_id=self._last_notification_id
+        # Step through the list in the given direction, wrapping around at either end
+        step: int = 1 if direction == "next" else -1
+        self.current_profile = profiles_ids[(profiles_ids.index(self.current_profile) + step) % len(profiles_ids)]
+        self._log.debug(f"New profile ID: {self.current_profile}")
+
+        # Start preloading the songs of the new profile
+        self._warmProfileSongs()
+
+        # Notify the user of the change in the background, so cycling quickly only shows the last profile
+        self.notifications.queueNotification(
+            message=f"Switched to profile {self.profile_names[self.current_profile]}.",
+            title="Profile Change"
+        )
+
+        return journal.STATUS_OK
+
+    async def handleButtonPress(self, code: int, event_time: float | None = None) -> None:
+        self._log.debug("Processing event code %d...", code)
+
+        # Get the time of the press, to work out how long it took to handle
+        if event_time is None:
+            event_time = time.time()
+
+        # Look up what the button does in the current profile
+        profile: int = self.current_profile
+        handler: Callable[[], Awaitable[int]] | None = self._dispatch_table.get((profile, code))
+
+        # Handle if the button isn't bound to anything
+        if not handler:
+            self._log.debug(
+                "\"%s\" isn't bound to anything in profile \"%s.\"",
+                self.button_codes.get(code, code), self.profile_names.get(profile, profile)
             )
+            if self.journal:
+                self.journal.recordDispatch(code, profile, "", 0, journal.STATUS_UNBOUND, self.device_index)
+            return
 
+        await self._runHandler(handler, code, self.keymap.bindings[profile][code], profile, event_time)
+
+        return
+
+    async def handleGesture(self, code: int, gesture: str, event_time: float | None = None) -> None:
+        # A tap is a plain button press
+        if gesture == "tap":
+            await self.handleButtonPress(code, event_time)
             return
 
-        ## Cycle profile up
-        elif code == self.button_20:
-            if len(self.profile_names) <= 1:
-                self._log.warning("Attempted to switch profiles, but there is only profile to choose from!")
-                self._last_notification_id = await self.notifications.createNotification(
-                    message="There is only one profile to select from!",
-                    title="Profiles Error",
-                    notification_id=self._last_notification_id
-                )
+        self._log.debug("Processing %s of event code %d...", gesture, code)
 
-                return
+        # Get the time of the press the gesture started with, to work out how long it took to handle
+        if event_time is None:
+            event_time = time.time()
 
-            self._log.debug(f"Old profile ID: {self.current_profile}")
-            # Create a list of profile IDs
-            profiles_ids: list[int] = [profile_id for profile_id in self.profile_names]
+        # Look up what the gesture does in the current profile
+        ## The profile could've changed since the gesture started, such as while a button is being held down.
+        profile: int = self.current_profile
+        handler: Callable[[], Awaitable[int]] | None = self._dispatch_table.get((profile, (code, gesture)))
 
-            # If the current profile is the last in the list, wrap around to the first one
-            if (self.current_profile + 1) >= len(profiles_ids):
-                self.current_profile = 0
-            # Otherwise, increment the ID of the profile
-            else:
-                self.current_profile += 1
-            self._log.debug(f"New profile ID: {self.current_profile}")
-
-            # Get the profile's name, handling if it doesn't have one assigned
-            profile_name: str = f"profile_{self.current_profile}" if (self.current_profile not in self.profile_names
-                                                                      ) else self.profile_names[self.current_profile]
-
-            # Notify the user of the change
-            self._last_notification_id = await self.notifications.createNotification(
-                message=f"Switched to profile {profile_name}.",
-                title="Profile Change",
-                notification_id=self._last_notification_id
+        # Handle if the gesture isn't bound to anything
+        if not handler:
+            self._log.debug(
+                "The %s of \"%s\" isn't bound to anything in profile \"%s.\"",
+                gesture, self.button_codes.get(code, code), self.profile_names.get(profile, profile)
             )
-
+            if self.journal:
+                self.journal.recordDispatch(code, profile, "", 0, journal.STATUS_UNBOUND, self.device_index)
             return
 
-        # Path for profile one(or 0)
-        if self.current_profile == 0:
-            ## Buttons 1-3: Music
-            if code == self.button_1:
-                await self._loadSong("button_1")
-                return
-            elif code == self.button_2:
-                await self._loadSong("button_2")
-                return
-            elif code == self.button_3:
-                await self._loadSong("button_3")
-                return
-
-            ## Buttons 4-5: Scene switching
-            elif code == self.button_4:
-                # Make a variable for the action name in Streamer.bot
-                streamer_bot_action_name: str = "obs change scene"
-
-                # Handle if it doesn't exist
-                if not await self._verifyActionExistence(streamer_bot_action_name):
-                    return
-
-                # Run the action to toggle the desktop audio
-                await self.streamer_bot.do_action(
-                    action_name=streamer_bot_action_name,
-                    args={
-                        "scene_name": "Starting Soon"
-                    }
-                )
+        await self._runHandler(
+            handler, code, self.keymap.gestures[profile][code][gesture], profile, event_time, gesture
+        )
 
-                return
-            elif code == self.button_5:
-                # Make a variable for the action name in Streamer.bot
-                streamer_bot_action_name: str = "obs change scene"
-
-                # Handle if it doesn't exist
-                if not await self._verifyActionExistence(streamer_bot_action_name):
-                    return
-
-                # Run the action to toggle the desktop audio
-                await self.streamer_bot.do_action(
-                    action_name=streamer_bot_action_name,
-                    args={
-                        "scene_name": "Game"
-                    }
-                )
+        return
 
-                return
-
-            ## Buttons 6-8: More music
-            elif code == self.button_6:
-                await self._loadSong("button_6")
-                return
-            elif code == self.button_7:
-                await self._loadSong("button_7")
-                return
-            elif code == self.button_8:
-                await self._loadSong("button_8")
-                return
-
-            ## Buttons 9-10: More scene switching
-            elif code == self.button_9:
-                # Make a variable for the action name in Streamer.bot
-                streamer_bot_action_name: str = "obs change scene"
-
-                # Handle if it doesn't exist
-                if not await self._verifyActionExistence(streamer_bot_action_name):
-                    return
-
-                # Run the action to toggle the desktop audio
-                await self.streamer_bot.do_action(
-                    action_name=streamer_bot_action_name,
-                    args={
-                        "scene_name": "Back Soon"
-                    }
-                )
+    async def handleChord(self, codes: frozenset[int], event_time: float | None = None) -> None:
+        self._log.debug("Processing chord of event codes %s...", sorted(codes))
 
-                return
-            elif code == self.button_10:
-                # Make a variable for the action name in Streamer.bot
-                streamer_bot_action_name: str = "obs change scene"
-
-                # Handle if it doesn't exist
-                if not await self._verifyActionExistence(streamer_bot_action_name):
-                    return
-
-                # Run the action to toggle the desktop audio
-                await self.streamer_bot.do_action(
-                    action_name=streamer_bot_action_name,
-                    args={
-                        "scene_name": "Technical Difficulties"
-                    }
-                )
+        # Get the time of the first press, to work out how long it took to handle
+        if event_time is None:
+            event_time = time.time()
 
-                return
-
-            ## Buttons 11-16: Even more music
-            elif code == self.button_11:
-                await self._loadSong("button_11")
-                return
-            elif code == self.button_12:
-                await self._loadSong("button_12")
-                return
-            elif code == self.button_13:
-                await self._loadSong("button_13")
-                return
-            elif code == self.button_14:
-                await self._loadSong("button_14")
-                return
-            elif code == self.button_15:
-                await self._loadSong("button_15")
-                return
-            elif code == self.button_16:
-                await self._loadSong("button_16")
-                return
-
-            ## Toggle desktop audio
-            elif code == self.button_17:
-                # Make a variable for the action name in Streamer.bot
-                streamer_bot_action_name: str = "obs toggle desktop audio"
-
-                # Handle if it doesn't exist
-                if not await self._verifyActionExistence(streamer_bot_action_name):
-                    return
-
-                # Run the action to toggle the desktop audio
-                await self.streamer_bot.do_action(
-                    action_name=streamer_bot_action_name
-                )
+        # Run whatever the chord is bound to, which is a single action no matter how many buttons are in it
+        ## The chord resolver only hands over chords bound in the current profile.
+        profile: int = self.current_profile
+        await self._runHandler(
+            self._dispatch_table[(profile, codes)], min(codes), self.keymap.chords[profile][codes], profile, event_time
+        )
 
-                return
+        return
 
-            ## Toggle mic
-            elif code == self.button_18:
-                # Make a variable for the action name in Streamer.bot
-                streamer_bot_action_name: str = "obs toggle mic"
+    async def _runHandler(
+            self,
+            handler: Callable[[], Awaitable[int]],
+            code: int,
+            binding: Binding,
+            profile: int,
+            event_time: float,
+            gesture: str | None = None
+    ) -> None:
+        label: str = f"{gesture}:{binding.label}" if gesture else binding.label
 
-                # Handle if it doesn't exist
-                if not await self._verifyActionExistence(streamer_bot_action_name):
-                    return
+        # Record how Streamer.bot responded to the action once it does, since the press doesn't wait on it
+        if binding.kind == "action" and self.journal:
+            handler = partial(handler, on_response=partial(self._recordResponse, code, label, profile, event_time))
 
-                # Run the action to toggle the desktop audio
-                await self.streamer_bot.do_action(
-                    action_name=streamer_bot_action_name
-                )
+        # Switch profiles right away, since what every press after it does depends on which profile it's in
+        if binding.kind == "profile":
+            await self._recordHandler(handler, code, label, profile, event_time, 0)
+            return
 
-                return
-
-            ## Buttons 19 and 20 are for cycling profiles
-            elif code == self.button_21:
-                # Do something
-                return
-            ## Fast-forward music player
-            elif code == self.button_22:
-                if self.music_player.running:
-                    self.music_player.fast_forward(10)
-                else:
-                    self._log.warning("There's no song playing! Can't fast-forward!")
-                return
-            ## Toggle pause on music player
-            elif code == self.button_23:
-                if self.music_player.running:
-                    if self.music_player.paused:
-                        self.music_player.resume()
-                    else:
-                        self.music_player.pause()
-                else:
-                    self._log.warning("There's no song playing! Can't toggle pause!")
-                return
-            ## Rewind music player
-            elif code == self.button_24:
-                if self.music_player.running:
-                    self.music_player.rewind(10)
-                else:
-                    self._log.warning("There's no song playing! Can't rewind!")
-                return
-            elif code == self.scroll_wheel_up_26:
-                # Do something
-                return
-            elif code == self.scroll_wheel_down_27:
-                # Do something
-                return
-            elif code == self.button_joystick_25:
-                # Do something
-                return
-            else:
-                # Handle an unrecognized keycode
-                print(f"Unrecognized key code \"{code}!\"")
-                return
-        
-        ## Add more profiles as necessary
+        # Hand everything else over to the executor, so a slow handler doesn't hold up the presses after it
+        ## Songs and player controls all use the one music player, so they're kept in order with each other,
+        ## and everything else is kept in order with other presses of the same button.
+        key: tuple = ("music player",) if binding.kind in ("song", "player") else (self.device_index, code)
+        self.executor.submit(
+            key, lambda queue_delay: self._recordHandler(handler, code, label, profile, event_time, queue_delay)
+        )
+
+        return
+
+    def _recordResponse(self, code: int, label: str, profile: int, event_time: float, response: dict | None) -> None:
+        # Work out how the action went from Streamer.bot's response, if it ever came
+        status: int = journal.STATUS_NO_RESPONSE
+        if response is not None:
+            status = journal.STATUS_OK if response.get("status") == "ok" else journal.STATUS_ERROR
 
-        # Handle if the current profile isn't present
-        else:
-            self._log.error("The current profile is unrecognized!")
+        if self.journal:
+            self.journal.recordDispatch(
+                code, profile, label, int((time.time() - event_time) * 1_000_000), status, self.device_index
+            )
 
         return
 
+    async def _recordHandler(
+            self,
+            handler: Callable[[], Awaitable[int]],
+            code: int,
+            label: str,
+            profile: int,
+            event_time: float,
+            queue_delay: float
+    ) -> None:
+        # Run whatever the button is bound to, recording how it went in the journal
+        status: int = journal.STATUS_ERROR
+        try:
+            status = await handler()
+
+        finally:
+            if self.journal:
+                self.journal.recordDispatch(
+                    code, profile, label, int((time.time() - event_time) * 1_000_000), status, self.device_index,
+                    int(queue_delay * 1_000_000)
+                )
+
+        return
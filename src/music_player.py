@@ -6,6 +6,10 @@ import pygame
 import time
 import threading
 import os
+import io
+from src.audio_metadata import AudioMetadata, AudioMetadataIndex
+from src.track_cache import TrackCache
+from src.logger import getSubsystemLogger
 
 ## Shoutout to ChatGPT for writing this and saving me
 ## like 30-45 minutes of pain.
@@ -20,43 +24,108 @@ class MusicPlayer:
 
         # Create some class vars
         self._lock: threading.Lock = threading.Lock()
-        self._updater_thread = None
         self._config: dict = tomllib.load(open("config.toml", 'rb'))
 
         # Fetch the logger
-        self._log: logging.Logger = logging.getLogger()
+        self._log: logging.Logger = getSubsystemLogger("music")
+
+        # Create the index of track lengths, so tracks never need to be decoded just to get them
+        self.metadata_index: AudioMetadataIndex = AudioMetadataIndex(
+            self._config.get("audio_metadata_cache", "cache/audio_metadata.json")
+        )
+
+        # Index the music directory in the background, so even the first press of each song is fast
+        self._scan_thread: threading.Thread | None = None
+        if os.path.isdir(self._config.get("music_directory", "music/")):
+            self._scan_thread = self.metadata_index.scanInBackground(self._config.get("music_directory", "music/"))
+
+        # Create the cache of preloaded tracks, so loading one doesn't have to go to disk
+        self.track_cache: TrackCache = TrackCache(
+            budget_bytes=int(self._config.get("track_cache_budget_mb", 256) * 1024 * 1024)
+        )
 
         # Create some utility vars
+        self.volume: float = self._config.get("music_volume", 0.4)
         self.paused: bool = False
-        self.current_time: float = 0
         self.length: float = 0
         self.file: str | None = None
-        self.running: bool = False
+
+        # Create the variables the playback position is worked out from
+        ## The position is anchored whenever playback starts, seeks, pauses or resumes,
+        ## and the time elapsed on the monotonic clock since then is added to it.
+        self._anchor_position: float = 0
+        self._anchor_time: float | None = None
+        # The position the mixer was last told to start playing from, since its own clock starts at 0 on every play
+        self._play_start: float = 0
+        # Whether the mixer has been told to play since the last stop
+        self._started: bool = False
+
+        # Create a variable for how far apart the clock and the mixer can be before the mixer is trusted, in seconds
+        self._drift_tolerance: float = 0.25
+
+        return
+
+    @property
+    def running(self) -> bool:
+        """Whether a track is playing or paused."""
+
+        return self._started and (self.paused or pygame.mixer.music.get_busy())
+
+    @property
+    def current_time(self) -> float:
+        """The current playback position in seconds."""
+
+        # Nothing is moving if playback is paused or stopped
+        if self._anchor_time is None:
+            return self._anchor_position
+
+        position: float = self._anchor_position + (time.monotonic() - self._anchor_time)
+
+        # Cross-check the clock against the mixer, which knows how much audio has actually played
+        mixer_position_ms: int = pygame.mixer.music.get_pos()
+        if mixer_position_ms >= 0:
+            mixer_position: float = self._play_start + mixer_position_ms / 1000
+            # Re-anchor to the mixer if the two have drifted apart, such as when the audio device stalled
+            if abs(mixer_position - position) > self._drift_tolerance:
+                self._anchor(mixer_position, playing=True)
+                position = mixer_position
+
+        return min(position, self.length) if self.length else position
+
+    def _anchor(self, position: float, playing: bool) -> None:
+        """Anchors the playback position, starting the clock if the music is playing."""
+
+        self._anchor_position = position
+        self._anchor_time = time.monotonic() if playing else None
 
         return
 
     def load(self, filepath: str):
         """Load a music file."""
         with self._lock:
-            pygame.mixer.music.load(filepath)
+            # Load the track from memory if it was preloaded, and from disk otherwise
+            data: bytes | None = self.track_cache.get(filepath)
+            if data is not None:
+                pygame.mixer.music.load(io.BytesIO(data), namehint=os.path.splitext(filepath)[1].lstrip("."))
+            else:
+                pygame.mixer.music.load(filepath)
             self.file = filepath
-            self.length = pygame.mixer.Sound(filepath).get_length()
-            self.current_time = 0
-            self._log.debug(f"Loaded file \"{filepath}.\" Length: {self.length:.2f}s")
 
-    def _update_time(self) -> None:
-        """Track playback time in a separate thread."""
+            # Get the track's length from the index
+            metadata: AudioMetadata | None = self.metadata_index.get(filepath)
+            if metadata:
+                self.length = metadata.duration
+                # Save the index in case the track wasn't in it yet
+                self.metadata_index.save()
 
-        # Update the running variable
-        self.running = True
+            # Fall back to decoding the whole track if its headers couldn't be read, which is slow but always works
+            else:
+                self._log.warning(f"Couldn't read the length of \"{filepath}\" from its headers, decoding it instead.")
+                self.length = pygame.mixer.Sound(filepath).get_length()
 
-        # And keep updating the current time while the music stream is active
-        while self.running:
-            if not self.paused and pygame.mixer.music.get_busy():
-                self.current_time += 0.1
-            time.sleep(0.1)
-
-        return
+            self._started = False
+            self._anchor(0, playing=False)
+            self._log.debug(f"Loaded file \"{filepath}.\" Length: {self.length:.2f}s")
 
     def play(self) -> None:
         """Start playing the loaded track."""
@@ -68,16 +137,15 @@ class MusicPlayer:
             return
 
         # Start playing the song
-        pygame.mixer.music.play(start=self.current_time)
-        pygame.mixer.music.set_volume(self._config.get("music_volume", 0.4))
+        start: float = self.current_time
+        pygame.mixer.music.play(start=start)
+        pygame.mixer.music.set_volume(self.volume)
 
-        # Update the paused variable
+        # Update the paused variable, and start the clock
         self.paused = False
-
-        # Start the update thread
-        if not self._updater_thread or not self._updater_thread.is_alive():
-            self._updater_thread = threading.Thread(target=self._update_time, daemon=True)
-            self._updater_thread.start()
+        self._started = True
+        self._play_start = start
+        self._anchor(start, playing=True)
 
         return
 
@@ -86,7 +154,8 @@ class MusicPlayer:
 
         # Check if the stream is already paused
         if not self.paused:
-            # Pause the stream
+            # Stop the clock where it is, and pause the stream
+            self._anchor(self.current_time, playing=False)
             pygame.mixer.music.pause()
             self._log.debug("Paused the music.")
 
@@ -103,8 +172,9 @@ class MusicPlayer:
 
         # Check if the stream is paused
         if self.paused:
-            # Unpause the stream
+            # Unpause the stream, and start the clock again
             pygame.mixer.music.unpause()
+            self._anchor(self._anchor_position, playing=True)
             self._log.debug("Resumed the music.")
 
             # Update the paused variable
@@ -123,8 +193,9 @@ class MusicPlayer:
         self._log.debug("Stopped the music.")
 
         # Update variables
-        self.running = False
-        self.current_time = 0
+        self.paused = False
+        self._started = False
+        self._anchor(0, playing=False)
 
         return
 
@@ -140,15 +211,58 @@ class MusicPlayer:
         if seconds < 0: seconds = 0
         if seconds > self.length: seconds = self.length
 
-        # Set the current time variable
-        self.current_time = seconds
-
         # Start playing from that point
         pygame.mixer.music.play(start=seconds)
         self._log.debug(f"Seeked to position {seconds:.2f}s in song.")
 
-        # Update the paused variable
+        # Update the paused variable, and restart the clock from that point
         self.paused = False
+        self._started = True
+        self._play_start = seconds
+        self._anchor(seconds, playing=True)
+
+        return
+
+    def setVolume(self, volume: float) -> None:
+        """
+        Changes the volume of the music, including the track currently playing.
+
+        :param volume: The new volume, from 0 to 1. Anything outside of that is clamped.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        self.volume = min(max(volume, 0), 1)
+        pygame.mixer.music.set_volume(self.volume)
+
+        return
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Stops playback, stops the background threads and shuts down the mixer.
+
+        :param timeout: How long to wait for each background thread to stop, in seconds.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Stop the music
+        if self._started:
+            self.stop()
+
+        # Stop the background threads
+        self.track_cache.close(timeout)
+        if self._scan_thread:
+            self._scan_thread.join(timeout)
+            self._scan_thread = None
+
+        # Shut down the mixer
+        pygame.mixer.quit()
+        self._log.debug("Closed the music player.")
 
         return
 
@@ -1,13 +1,175 @@
 # Imports
+import asyncio
+import logging
 import os.path
-import subprocess
+from src.logger import getSubsystemLogger
+
+# Jeepney is optional. Without it, notifications fall back to the notify-send tool.
+try:
+    from jeepney import DBusAddress, MessageType, new_method_call
+    from jeepney.io.asyncio import open_dbus_router
+except ImportError:
+    DBusAddress = None
+
+
+class SubprocessNotificationBackend:
+    """Shows notifications by running the ``notify-send`` tool."""
+
+    async def notify(
+            self,
+            app_name: str,
+            app_icon_path: str | None,
+            title: str,
+            message: str,
+            expire_time: int,
+            notification_id: int | None
+    ) -> int:
+        # Create a variable with the command to run to show the notification
+        command: list[str] = [
+            "notify-send",  # Run the notify-send command
+            "--app-name", app_name,  # Set the app title
+            "--expire-time", str(expire_time),  # Set the notification expiration time
+            "-p",  # Print the ID of the notification
+            title,  # Set the title/summary
+            message
+        ]
+
+        # Set the app icon if present
+        if app_icon_path:
+            command.append("--icon")
+            command.append(app_icon_path)
+
+        # If the notification ID to replace is specified, add it to the command at the second index
+        if notification_id:
+            command.insert(1, f"--replace-id={notification_id}")
+
+        # Run the command to show the notification without blocking the event loop
+        process: asyncio.subprocess.Process = await asyncio.create_subprocess_exec(
+            *command, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+        )
+        stdout, _ = await process.communicate()
+
+        # Return the notification's ID
+        return int(stdout.decode().strip())
+
+    async def closeNotification(self, notification_id: int) -> None:
+        # notify-send has no way of closing a notification, so it's left to expire
+        return
+
+    async def close(self) -> None:
+        return
+
+
+class DBusNotificationBackend:
+    # The address of the notification server on the session bus
+    _address = DBusAddress(
+        "/org/freedesktop/Notifications",
+        bus_name="org.freedesktop.Notifications",
+        interface="org.freedesktop.Notifications"
+    ) if DBusAddress else None
+
+    def __init__(self, bus_address: str = "SESSION") -> None:
+        """
+        Shows notifications by calling the notification server over a single, persistent
+        connection to the D-Bus session bus, instead of starting a process for each one.
+
+        :param bus_address: The bus to connect to. Either "SESSION," or the address of a bus,
+         such as one from a locally launched ``dbus-daemon``.
+
+        :returns: ``None``
+
+        :raises ImportError: If Jeepney isn't installed.
+        """
+
+        if not DBusAddress:
+            raise ImportError("Jeepney is needed to send notifications over D-Bus!")
+
+        # Make the bus address class-accessible
+        self._bus_address: str = bus_address
+        del bus_address  # Cleanup
+
+        # Create variables for the connection, which is opened in connect()
+        self._router_context: open_dbus_router | None = None
+        self._router = None
+
+        return
+
+    async def connect(self) -> None:
+        """
+        Opens the connection to the bus.
+
+        :returns: ``None``
+
+        :raises OSError: If the bus couldn't be connected to.
+        """
+
+        self._router_context = open_dbus_router(self._bus_address)
+        self._router = await self._router_context.__aenter__()
+
+        return
+
+    async def _call(self, method: str, signature: str, *args):
+        """Calls a method on the notification server, returning the body of the reply."""
+
+        reply = await self._router.send_and_get_reply(new_method_call(self._address, method, signature, args))
+
+        # Handle if the server responded with an error
+        if reply.header.message_type == MessageType.error:
+            raise OSError(f"The notification server responded to {method} with an error: {reply.body}")
+
+        return reply.body
+
+    async def notify(
+            self,
+            app_name: str,
+            app_icon_path: str | None,
+            title: str,
+            message: str,
+            expire_time: int,
+            notification_id: int | None
+    ) -> int:
+        body: tuple = await self._call(
+            "Notify", "susssasa{sv}i",
+            app_name,  # The app title
+            notification_id or 0,  # The ID of the notification to replace, 0 being none
+            app_icon_path or "",  # The app icon
+            title,  # The title/summary
+            message,  # The body
+            [],  # Actions
+            {},  # Hints
+            expire_time  # The expiration time
+        )
+
+        # Return the notification's ID
+        return int(body[0])
+
+    async def closeNotification(self, notification_id: int) -> None:
+        await self._call("CloseNotification", "u", notification_id)
+
+        return
+
+    async def close(self) -> None:
+        if self._router_context:
+            await self._router_context.__aexit__(None, None, None)
+            self._router_context = None
+            self._router = None
+
+        return
 
 
 class Notifications:
-    def __init__(self, app_name: str, app_icon_path: str = None) -> None:
+    def __init__(
+            self,
+            app_name: str,
+            app_icon_path: str = None,
+            bus_address: str = "SESSION",
+            coalesce_window: float = 0.25,
+            max_coalesce_delay: float = 1
+    ) -> None:
         # Make provided variables accessible across the class
         self._app_name: str = app_name
         self._app_icon_path: str | None = app_icon_path if app_icon_path else None
+        self._bus_address: str = bus_address
 
         # Make sure the app icon exists if it was provided
         if self._app_icon_path:
@@ -16,14 +178,62 @@ class Notifications:
             # Change the icon path to the absolute path because notify-send sucks
             self._app_icon_path = os.path.abspath(self._app_icon_path)
 
+        # Create a variable to store the backend, which is picked when the first notification is sent
+        self._backend: DBusNotificationBackend | SubprocessNotificationBackend | None = None
+
+        # Create a lock so two notifications at once don't both try to pick a backend
+        self._backend_lock: asyncio.Lock = asyncio.Lock()
+
+        # Create the variables for the notification queue
+        ## Queued notifications are collapsed into the latest one, and only sent once no new one
+        ## has come in for the coalesce window, or the max delay since the first one has passed.
+        self._coalesce_window: float = coalesce_window
+        self._max_coalesce_delay: float = max_coalesce_delay
+        self._queued_notification: dict | None = None
+        self._queued_at: float = 0
+        self._first_queued_at: float = 0
+        self._queue_event: asyncio.Event = asyncio.Event()
+        self._queue_task: asyncio.Task | None = None
+
+        # Create a variable to store the ID of the last notification sent from the queue, so it gets replaced
+        self._last_notification_id: int | None = None
+
+        # Create a counter for how many queued notifications were collapsed into a later one
+        self.coalesced_notifications: int = 0
+        """The amount of queued notifications that were replaced by a newer one before being sent."""
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("panel")
+
         return
 
+    async def _getBackend(self) -> DBusNotificationBackend | SubprocessNotificationBackend:
+        """Gets the backend to send notifications with, connecting to D-Bus if it's available."""
+
+        async with self._backend_lock:
+            if self._backend:
+                return self._backend
+
+            # Try to use D-Bus first
+            try:
+                backend: DBusNotificationBackend = DBusNotificationBackend(self._bus_address)
+                await backend.connect()
+                self._backend = backend
+                self._log.debug("Sending notifications over D-Bus.")
+
+            # Otherwise, fall back to notify-send
+            except (ImportError, OSError, ValueError, KeyError) as error:
+                self._log.warning(f"Couldn't connect to D-Bus, falling back to notify-send. Error: {error}")
+                self._backend = SubprocessNotificationBackend()
+
+            return self._backend
+
     # A function to create a notification for KDE Plasma using the notify-send tool
     # for profile switching
     ## Probably should remove this because I'm not using it
     async def createProfileSwitchNotification(self, profile_name: str, notification_id: int = None) -> int:
         """
-        Creates a notification using ``notify-send`` to indicate a profile change.
+        Creates a notification to indicate a profile change.
 
         :param profile_name: The name of the profile that was switched to.
         :param notification_id: The ID of the notification to replace, if any.
@@ -33,35 +243,12 @@ class Notifications:
         :raises None:
         """
 
-        # Create a variable with the command to run to show the notification
-        command: list = [
-            "notify-send",  # Run the notify-send command
-            "--app-name", self._app_name,  # Set the app title
-            "--expire-time=5000",  # Set the notification expiration time to 5 seconds
-            "-p",  # Print the ID of the notification
-            f"Profile Change",  # Set the title/summary
-            f"Switched to profile \"{profile_name.title()}.\""
-        ]
-
-        # Set the app icon if present
-        if self._app_icon_path:
-            command.append("--icon")
-            command.append(self._app_icon_path)
-
-        if notification_id:
-            # If the notification ID to replace is specified, add it to the command at the second index
-            command.insert(1, f"--replace-id={notification_id}")
-
-        # Run the command to show the notification
-        result: subprocess.CompletedProcess = subprocess.run(
-            command, capture_output=True, text=True  # And store the output from the command
+        return await self.createNotification(
+            message=f"Switched to profile \"{profile_name.title()}.\"",
+            title="Profile Change",
+            notification_id=notification_id
         )
 
-        # Set the notification ID to be the notification's returned ID
-        notification_id: int = int(str(result.stdout).strip())
-
-        return notification_id
-
     async def createNotification(
             self,
             message: str,
@@ -70,8 +257,8 @@ class Notifications:
             expire_time: int = 5000
     ) -> int:
         """
-        Creates a notification using ``notify-send`` to indicate a message to the user.
-        This is by default a warning message.
+        Creates a notification to indicate a message to the user. It's sent over D-Bus
+        if possible, and using ``notify-send`` otherwise. This is by default a warning message.
 
         :param title: The title of the notification. Optional.
         :param message: The message to display in the notification.
@@ -87,31 +274,114 @@ class Notifications:
         if not title:
             title = "Warning"
 
-        # Create a variable with the command to run to show the notification
-        command: list[str] = [
-            "notify-send",  # Run the notify-send command
-            "--app-name", self._app_name,  # Set the app title
-            "--expire-time", str(expire_time),  # Set the notification expiration time
-            "-p",  # Print the ID of the notification
-            title.title(),  # Set the title/summary
-            message
-        ]
+        return await (await self._getBackend()).notify(
+            app_name=self._app_name,
+            app_icon_path=self._app_icon_path,
+            title=title.title(),
+            message=message,
+            expire_time=expire_time,
+            notification_id=notification_id
+        )
 
-        # Set the app icon if present
-        if self._app_icon_path:
-            command.append("--icon")
-            command.append(self._app_icon_path)
+    def queueNotification(self, message: str, title: str = None, expire_time: int = 5000) -> None:
+        """
+        Queues a notification to be sent in the background. If another one is queued
+        before this one goes out, this one is dropped in favor of the newer one, and
+        either way it replaces the last notification sent from the queue. This never
+        waits on anything, so it's safe to call from the input path.
 
-        # If the notification ID to replace is specified, add it to the command at the second index
-        if notification_id:
-            command.insert(1, f"--replace-id={notification_id}")
+        :param message: The message to display in the notification.
+        :param title: The title of the notification. Optional.
+        :param expire_time: The time it takes for the notification to expire in milliseconds.
+         Optional. Default is 5,000, or five seconds.
 
-        # Run the command to show the notification
-        result: subprocess.CompletedProcess = subprocess.run(
-            command, capture_output=True, text=True  # And store the output from the command
-        )
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        # Replace whatever was queued already
+        if self._queued_notification:
+            self.coalesced_notifications += 1
+        else:
+            self._first_queued_at = loop.time()
+        self._queued_notification = {"message": message, "title": title, "expire_time": expire_time}
+        self._queued_at = loop.time()
+
+        # Start the worker if it isn't running, and wake it up
+        if not self._queue_task or self._queue_task.done():
+            self._queue_task = asyncio.create_task(self.runQueue())
+        self._queue_event.set()
+
+        return
+
+    async def runQueue(self) -> None:
+        """Sends queued notifications as they come in. Runs until cancelled."""
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        while True:
+            # Wait for a notification to be queued
+            await self._queue_event.wait()
+            self._queue_event.clear()
+
+            # Wait until things quiet down, or the max delay runs out
+            while self._queued_notification:
+                send_at: float = min(
+                    self._queued_at + self._coalesce_window,
+                    self._first_queued_at + self._max_coalesce_delay
+                )
+                if loop.time() >= send_at:
+                    break
+                await asyncio.sleep(send_at - loop.time())
 
-        # Set the notification ID to be the notification's returned ID
-        notification_id: int = int(str(result.stdout).strip())
+            # Take the latest notification off of the queue
+            notification: dict | None = self._queued_notification
+            self._queued_notification = None
+            if not notification:
+                continue
 
-        return notification_id
+            try:
+                self._last_notification_id = await self.createNotification(
+                    notification_id=self._last_notification_id,
+                    **notification
+                )
+
+            # Pass the error up if it's an Asyncio cancelled error
+            except asyncio.CancelledError:
+                raise
+
+            # Don't let one failed notification take down the queue
+            except Exception as error:
+                self._log.error(f"Failed to send a notification with the following error: {error}")
+
+    async def closeNotification(self, notification_id: int) -> None:
+        """
+        Closes a notification before it expires.
+
+        :param notification_id: The ID of the notification to close.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        await (await self._getBackend()).closeNotification(notification_id)
+
+        return
+
+    async def close(self) -> None:
+        """Stops the notification queue and closes the connection to D-Bus, if there is one."""
+
+        if self._queue_task:
+            self._queue_task.cancel()
+            await asyncio.gather(self._queue_task, return_exceptions=True)
+            self._queue_task = None
+
+        if self._backend:
+            await self._backend.close()
+            self._backend = None
+
+        return
@@ -2,22 +2,50 @@
 import websockets
 import json
 import logging
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
 from enum import Enum
 import asyncio
 import re
 from urllib.parse import urlparse, ParseResult
 from datetime import datetime
 import uuid
+import time
+import random
+from collections import deque
+from src.logger import getSubsystemLogger
+from src.action_catalog import ActionCatalog
+from src.event_bus import EventBus
+
+# orjson is optional, but decodes several times faster than the standard library, which matters during raids
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# Finds the source and type of an event without decoding the whole message
+## Streamer.bot puts the "event" object near the start of every event, so only the head of the message is searched.
+_EVENT_ROUTE_PATTERN: re.Pattern = re.compile(r'"event"\s*:\s*\{\s*"source"\s*:\s*"(\w+)"\s*,\s*"type"\s*:\s*"(\w+)"')
 
 
 # TODO: What's left for this websocket helper:
-#  - Add a backoff strategy for the reconnect
 #  - Maybe add unique subscription IDs
-#  - Maybe change out handle_event to instead be able to hook to a callback
-#  - MAKE WEBSOCKET CHILL WITH THE LOGS! Files are already getting huge over just minutes!
 
 class StreamerBotWebsocket:
+    class ConnectionState(str, Enum):
+        """The states the connection to Streamer.bot can be in."""
+
+        Disconnected = "Disconnected"
+        """Not connected, and not trying to be."""
+        Connecting = "Connecting"
+        """Connecting for the first time."""
+        Connected = "Connected"
+        """Connected and listening."""
+        Reconnecting = "Reconnecting"
+        """The connection was lost, and it's being retried with a backoff."""
+        Closed = "Closed"
+        """Disconnected on purpose."""
+
     class EventTypes:
         """
         Event types that can be received from Streamer.bot.
@@ -32,6 +60,16 @@ class StreamerBotWebsocket:
             ChatMessage = "ChatMessage"
             """Will fire upon chat messages in Twitch chat."""
 
+        class Application(str, Enum):
+            """Events that can be received from Streamer.bot itself."""
+
+            ActionAdded = "ActionAdded"
+            """Will fire when an action is created."""
+            ActionUpdated = "ActionUpdated"
+            """Will fire when an action is changed."""
+            ActionDeleted = "ActionDeleted"
+            """Will fire when an action is deleted."""
+
     class Events:
         """Events and their data that can be received from Streamer.bot."""
 
@@ -41,27 +79,53 @@ class StreamerBotWebsocket:
             class ChatMessage:
                 """A chat message from Twitch and all of its data."""
 
-                message: dict  # Needs custom class
-                user: dict  # Needs custom class
-                messageId: str | None
-                meta: dict  # Needs custom class
-                anonymous: bool
-                text: str | None
-                emotes: list | None
-                parts: list | None
-                isReply: bool
-                reply: dict  # Needs custom class
-                isTest: bool
-                sharedChatSource: dict  # Needs custom class
-                isInSharedChat: bool
-                isSharedChatHost: bool
-                isFromSharedChatGuest: bool
+                # Slots keep these small and quick to create, since there can be thousands a second during a raid
+                __slots__ = (
+                    "message", "user", "messageId", "meta", "anonymous", "text", "emotes", "parts", "isReply",
+                    "reply", "isTest", "sharedChatSource", "isInSharedChat", "isSharedChatHost",
+                    "isFromSharedChatGuest"
+                )
+
+                def __init__(self, data: dict) -> None:
+                    self.message: dict = data.get("message") or {}  # Needs custom class
+                    self.user: dict = data.get("user") or {}  # Needs custom class
+                    self.messageId: str | None = data.get("messageId")
+                    self.meta: dict = data.get("meta") or {}  # Needs custom class
+                    self.anonymous: bool = data.get("anonymous", False)
+                    self.text: str | None = data.get("text")
+                    self.emotes: list | None = data.get("emotes")
+                    self.parts: list | None = data.get("parts")
+                    self.isReply: bool = data.get("isReply", False)
+                    self.reply: dict = data.get("reply") or {}  # Needs custom class
+                    self.isTest: bool = data.get("isTest", False)
+                    self.sharedChatSource: dict = data.get("sharedChatSource") or {}  # Needs custom class
+                    self.isInSharedChat: bool = data.get("isInSharedChat", False)
+                    self.isSharedChatHost: bool = data.get("isSharedChatHost", False)
+                    self.isFromSharedChatGuest: bool = data.get("isFromSharedChatGuest", False)
+
+                    return
+
+                @property
+                def displayName(self) -> str:
+                    """The display name of whoever sent the message."""
+
+                    return self.message.get("displayName") or self.user.get("name") or "Unknown"
+
+                @property
+                def content(self) -> str:
+                    """The text of the message."""
+
+                    return self.text if self.text is not None else self.message.get("message", "")
 
     def __init__(
             self,
             url: str = "127.0.0.1",
             port: int = 8080,
-            keep_subscriptions_upon_disconnect: bool = True
+            keep_subscriptions_upon_disconnect: bool = True,
+            event_queue_size: int = 256,
+            event_queue_policy: str = "drop",
+            reconnect_delay_max: float = 10,
+            outbox_ttl: float = 10
     ) -> None:
         """
         A websocket client for interfacing with the Streamer.bot Web Socket server.
@@ -71,6 +135,14 @@ class StreamerBotWebsocket:
          For example, use "127.0.0.1" instead of "ws://127.0.0.1."
         :param port: The port that Streamer.bot is listening on.
         :param keep_subscriptions_upon_disconnect: Whether subscriptions should retain across disconnects.
+        :param event_queue_size: How many events can be waiting on each event handler before
+         the queue policy kicks in.
+        :param event_queue_policy: What to do when an event handler's queue is full. "drop"
+         throws out the oldest event, and "block" holds up receiving until there's room.
+        :param reconnect_delay_max: The longest to wait between connection attempts, in seconds.
+         The wait starts short and doubles after every failed attempt, up to this.
+        :param outbox_ttl: How long actions done while disconnected are held on to, in
+         seconds. They're sent once the connection is back, unless they've expired.
 
         :returns: ``None``
 
@@ -93,24 +165,77 @@ class StreamerBotWebsocket:
 
         del url, port, parsed_url, keep_subscriptions_upon_disconnect  # Cleanup
 
+        # Create the event bus, which hands events to the handlers subscribed to them
+        self.events: EventBus = EventBus(queue_size=event_queue_size, policy=event_queue_policy)
+        """The handlers subscribed to each event, and their queues."""
+        del event_queue_size, event_queue_policy  # Cleanup
+
         # Create the base logger
-        self._log: logging.Logger = logging.getLogger()
+        self._log: logging.Logger = getSubsystemLogger("websocket")
 
         # Create a variable to store whether the socket is still listening
         self._running: bool = False
 
+        # Create a variable to store the state of the connection
+        self._state: StreamerBotWebsocket.ConnectionState = self.ConnectionState.Disconnected
+
         # Create the websocket itself
         self._websocket: Optional[websockets.ClientConnection] = None
 
         # Create a variable to show how often the connection should be checked, in seconds
         self._ping_interval: int = 5
 
-        # Create a list to store all background tasks in
-        self._tasks: list[asyncio.Task] = []
+        # Create variables to store the background tasks
+        ## There's only ever one of each, and they're owned by the connection they were started for.
+        self._listen_task: asyncio.Task | None = None
+        self._ping_task: asyncio.Task | None = None
+        self._reconnect_task: asyncio.Task | None = None
+
+        # Create variables for the reconnect backoff, in seconds
+        self._reconnect_delay_min: float = 0.5
+        self._reconnect_delay_max: float = reconnect_delay_max
+        del reconnect_delay_max  # Cleanup
+
+        # Create the outbox for actions done while disconnected, as their expiry time, payload and response callback
+        ## It's bounded by hand rather than with maxlen, so dropping an action can be counted and warned about.
+        self._outbox: deque[tuple[float, dict, Callable[[dict | None], Any] | None]] = deque()
+        self._outbox_size: int = 64
+        self._outbox_ttl: float = outbox_ttl
+        del outbox_ttl  # Cleanup
+
+        # Create a counter for how many actions had to be dropped because the outbox was full
+        self.dropped_actions: int = 0
+        """The amount of actions dropped because too many piled up while disconnected."""
 
         # Create a dictionary to store subscriptions in
         self._subscriptions: dict[str, list[str]] = {}
 
+        # Create a dictionary to store requests that are waiting on a response, keyed by the request ID
+        ## The listen loop is the only thing reading from the socket, so it resolves these.
+        self._pending_requests: dict[str, asyncio.Future] = {}
+
+        # Create a variable for how long to wait for a response to a request by default, in seconds
+        self._request_timeout: float = 5
+
+        # Create counters for how many messages have come in, for measuring throughput
+        self.messages_received: int = 0
+        """The amount of messages received from Streamer.bot since the client was created."""
+        self.messages_skipped: int = 0
+        """The amount of events thrown out without being decoded, since nothing handles them."""
+        self.messages_per_second: float = 0
+        """How many messages per second were received over the last full second."""
+        self._rate_window_start: float = time.monotonic()
+        self._rate_window_count: int = 0
+
+        # Create a variable for how many messages to process in a row before letting other tasks run
+        ## The websocket hands over buffered messages without ever pausing, so a raid would
+        ## otherwise hold up button presses until the whole backlog is through.
+        self._yield_every: int = 32
+
+        # Create the catalog of actions present in Streamer.bot
+        self.actions: ActionCatalog = ActionCatalog(self)
+        """A cached index of every action in Streamer.bot, kept up to date as actions change."""
+
         # Create an Asyncio _lock to prevent issues with the subscriptions list ever accidentally
         # getting accessed concurrently
         self._subscriptions_lock: asyncio.Lock = asyncio.Lock()
@@ -120,32 +245,327 @@ class StreamerBotWebsocket:
     async def _listen_loop(self, websocket: websockets.ClientConnection):
         """Main loop to receive events."""
 
-        async for message in websocket:
+        # Create a counter for messages processed since other tasks last got to run
+        processed: int = 0
+
+        try:
+            async for message in websocket:
+                # Let other tasks, like button presses, run every so often
+                processed += 1
+                if processed >= self._yield_every:
+                    processed = 0
+                    await asyncio.sleep(0)
+
+                self._count_message()
+
+                try:
+                    # Throw the event out before decoding it if nothing would do anything with it
+                    route: re.Match | None = _EVENT_ROUTE_PATTERN.search(message, 0, 256) if isinstance(
+                        message, str) else None
+                    if route and not self._wants_event(route.group(1), route.group(2)):
+                        self.messages_skipped += 1
+                        continue
+
+                    # Parse the data
+                    data: dict = _loads(message)
+
+                    # If the message is a response to a request, hand it to whoever is waiting on it
+                    if "id" in data and "event" not in data:
+                        self._resolve_request(data)
+                        continue
+
+                    # Send the data to the event handler
+                    await self._handle_event(data)
+
+                except Exception as error:
+                    self._log.error("The following error occurred while processing an event: %s", error)
+
+        finally:
+            # Nothing else can arrive on this socket, so start over if it's still the current one
+            self._connection_lost(websocket)
+
+        return
+
+    def _count_message(self) -> None:
+        """Counts a received message towards the throughput numbers."""
+
+        self.messages_received += 1
+        self._rate_window_count += 1
+
+        # Roll the window over once a second has passed
+        now: float = time.monotonic()
+        if now - self._rate_window_start >= 1:
+            self.messages_per_second = self._rate_window_count / (now - self._rate_window_start)
+            self._rate_window_start = now
+            self._rate_window_count = 0
+
+        return
+
+    def _wants_event(self, source: str, event_type: str) -> bool:
+        """Whether anything would do something with an event of the given source and type."""
+
+        # Everything gets decoded if it's going to be logged anyway
+        if self._log.isEnabledFor(logging.DEBUG):
+            return True
+
+        # Something subscribed to it
+        if self.events.hasConsumers(source, event_type):
+            return True
+
+        # Chat messages are logged
+        if source == "Twitch" and event_type == self.EventTypes.Twitch.ChatMessage.value:
+            return self._log.isEnabledFor(logging.INFO)
+
+        # The action catalog needs to hear about changed actions
+        return (source, event_type) in self._builtin_handlers
+
+    def _resolve_request(self, response: dict) -> None:
+        """Resolves the pending request matching the ID of the response."""
+
+        # Get the future waiting on this response, if any
+        future: asyncio.Future | None = self._pending_requests.pop(str(response["id"]), None)
+
+        # Handle if nothing is waiting on it, which is the case for fire-and-forget requests
+        if not future:
+            self._log.debug("Received a response for untracked request \"%s.\"", response["id"])
+            return
+
+        # The request might have already timed out
+        if not future.done():
+            future.set_result(response)
+
+        return
+
+    def _fail_pending_requests(self, error: Exception) -> None:
+        """Fails all requests that are still waiting on a response."""
+
+        for future in self._pending_requests.values():
+            if not future.done():
+                future.set_exception(error)
+        self._pending_requests.clear()
+
+        return
+
+    def _track_response(
+            self,
+            request_id: str,
+            on_response: Callable[[dict | None], Any],
+            timeout: float | None = None
+    ) -> Callable[[], None]:
+        """
+        Keeps track of a request that isn't waited on, so its response can still be handed over once it arrives.
+
+        :param request_id: The ID of the request.
+        :param on_response: The function to call with the response, or ``None`` if none arrives in time.
+        :param timeout: How long to wait for a response, in seconds. Defaults to the client's request timeout.
+
+        :returns: ``Callable[[], None]`` - A function that stops tracking the request without calling ``on_response``.
+
+        :raises None:
+        """
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        # Register the request like any other, so the listen loop resolves it
+        future: asyncio.Future = loop.create_future()
+        self._pending_requests[request_id] = future
+        timer: asyncio.TimerHandle = loop.call_later(
+            timeout if timeout is not None else self._request_timeout, future.cancel
+        )
+
+        def on_done(_: asyncio.Future) -> None:
+            timer.cancel()
+            self._pending_requests.pop(request_id, None)
+
+            # Hand over nothing if it timed out or the connection was lost
+            response: dict | None = None
+            if not future.cancelled() and not future.exception():
+                response = future.result()
+            self._report_response(on_response, response)
+
+        def untrack() -> None:
+            future.remove_done_callback(on_done)
+            timer.cancel()
+            self._pending_requests.pop(request_id, None)
+
+        future.add_done_callback(on_done)
+
+        return untrack
+
+    def _report_response(self, on_response: Callable[[dict | None], Any] | None, response: dict | None) -> None:
+        """Hands a response over to its callback, if there is one, without letting its errors out."""
+
+        if not on_response:
+            return
+
+        try:
+            on_response(response)
+
+        except Exception as error:
+            self._log.error("The following error occurred while handling a response from Streamer.bot: %s", error)
+
+        return
+
+    async def _send_request(
+            self,
+            payload: dict,
+            wait_for_response: bool = True,
+            timeout: float | None = None,
+            on_response: Callable[[dict | None], Any] | None = None
+    ) -> dict | None:
+        """
+        Sends a request to Streamer.bot. A unique ID is assigned to the request, and
+        the response is matched back to it by the listen loop, so any amount of
+        requests can be in flight at once.
+
+        :param payload: The request to send. The ID is filled in automatically.
+        :param wait_for_response: Whether to wait for Streamer.bot to respond. If
+         false, the request is sent and forgotten about.
+        :param timeout: How long to wait for a response, in seconds. Defaults to
+         the client's request timeout.
+        :param on_response: A function to call with the response to a request that
+         isn't waited on, or ``None`` if none arrives in time. It isn't called if
+         sending the request fails.
+
+        :returns: ``dict | None`` - The response from Streamer.bot, or ``None``
+         if the response wasn't waited on.
+
+        :raises ConnectionError: If the websocket isn't currently connected.
+        :raises TimeoutError: If Streamer.bot didn't respond in time.
+        """
+
+        # Handle if the websocket isn't connected
+        if not self._websocket:
+            raise ConnectionError("Websocket is not connected!")
+
+        # Give the request a unique ID
+        request_id: str = str(uuid.uuid4())
+        payload["id"] = request_id
+
+        # Just send it if the response doesn't need waiting on, keeping track of it if it's wanted later
+        if not wait_for_response:
+            untrack: Callable[[], None] | None = (
+                self._track_response(request_id, on_response, timeout) if on_response else None
+            )
             try:
-                # Parse the data
-                data: dict = json.loads(message)
-                # Send the data to the event handler
-                await self._handle_event(data)
+                await self._websocket.send(json.dumps(payload))
 
-            except Exception as error:
-                self._log.error(f"The following error occurred while processing an event: {error}")
+            except BaseException:
+                if untrack:
+                    untrack()
+                raise
+
+            return None
+
+        # Register the request before sending it, so a fast response can't be missed
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._pending_requests[request_id] = future
+
+        try:
+            await self._websocket.send(json.dumps(payload))
+            return await asyncio.wait_for(future, timeout if timeout is not None else self._request_timeout)
+
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Streamer.bot didn't respond to the \"{payload['request']}\" request in time!")
+
+        finally:
+            # Make sure the request doesn't linger if it failed or timed out
+            self._pending_requests.pop(request_id, None)
+
+    @property
+    def state(self) -> ConnectionState:
+        """The current state of the connection to Streamer.bot."""
+
+        return self._state
+
+    @property
+    def connected(self) -> bool:
+        """Whether the client is currently connected to Streamer.bot."""
+
+        return self._state == self.ConnectionState.Connected
+
+    def _set_state(self, state: ConnectionState) -> None:
+        """Moves the connection to a new state."""
+
+        if state != self._state:
+            self._log.debug("Streamer.bot connection went from %s to %s.", self._state.value, state.value)
+            self._state = state
+
+        return
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """How long to wait before the given connection attempt, with jitter so retries don't line up."""
+
+        delay: float = min(self._reconnect_delay_max, self._reconnect_delay_min * 2 ** attempt)
+
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    async def _cancel_connection_tasks(self) -> None:
+        """Cancels the listen and ping tasks, unless one of them is the one calling this."""
+
+        current_task: asyncio.Task | None = asyncio.current_task()
+        tasks: list[asyncio.Task] = [
+            task for task in (self._listen_task, self._ping_task) if task and task is not current_task
+        ]
+        self._listen_task = self._ping_task = None
+
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
         return
 
-    async def _reconnect(self):
-        """Attempt to reconnect to the websocket."""
+    def _connection_lost(self, websocket: websockets.ClientConnection) -> None:
+        """Tears down a lost connection and starts reconnecting, if it's still the current one."""
+
+        # Handle if this connection was already replaced or closed on purpose
+        if websocket is not self._websocket:
+            return
+        self._websocket = None
 
+        # Nothing else can arrive on this socket, so fail everything still waiting on it
+        self._fail_pending_requests(ConnectionError("Lost connection to Streamer.bot!"))
+
+        # Start reconnecting, unless the client is shutting down
         if self._running:
-            await asyncio.sleep(5)
-            await self.connect()
+            self._log.warning("Lost connection to Streamer.bot. Reconnecting...")
+            self._set_state(self.ConnectionState.Reconnecting)
+
+            # A previous reconnect could still be finishing up on this connection, which is pointless now
+            if self._reconnect_task and not self._reconnect_task.done():
+                self._reconnect_task.cancel()
+            self._reconnect_task = asyncio.create_task(self._reconnect(websocket))
+
+        return
+
+    async def _reconnect(self, old_websocket: websockets.ClientConnection) -> None:
+        """Gets rid of the old connection and its tasks, then connects again."""
 
-    async def _ping_loop(self):
+        await self._cancel_connection_tasks()
+
+        # Close the old connection, without waiting long on it since it's probably dead
+        try:
+            await asyncio.wait_for(old_websocket.close(), 1)
+
+        # Pass the error up if it's an Asyncio cancelled error
+        except asyncio.CancelledError:
+            raise
+
+        except Exception:
+            pass
+
+        await self._connect_with_backoff()
+
+        return
+
+    async def _ping_loop(self, websocket: websockets.ClientConnection) -> None:
         """Send pings periodically to keep connection alive."""
 
-        while self._running and self._websocket:
+        while self._running:
             try:
-                # Ping the websocket every interval
-                await self._websocket.ping()
+                # Ping the websocket every interval, making sure the pong actually comes back
+                pong: Awaitable[float] = await websocket.ping()
+                await asyncio.wait_for(pong, self._ping_interval)
                 await asyncio.sleep(self._ping_interval)
 
             # Pass the error up if it's an Asyncio cancelled error
@@ -154,102 +574,241 @@ class StreamerBotWebsocket:
 
             # Handle if there's an error pinging
             except Exception as error:
-                self._log.warning(
-                    f"Failed to ping Streamer.bot with the following error: {error}. Attempting reconnect...")
-                # Attempt to reconnect
-                await self._reconnect()
+                self._log.warning(f"Failed to ping Streamer.bot with the following error: {error!r}.")
+                # Drop the connection, which starts the reconnect
+                self._connection_lost(websocket)
 
                 return
 
+    def _on_actions_changed(self, payload: dict) -> None:
+        """Refreshes the action catalog whenever actions change in Streamer.bot."""
+
+        self.actions.invalidate()
+
+        return
+
+    def _on_chat_message(self, payload: dict) -> None:
+        """Logs Twitch chat messages."""
+
+        if self._log.isEnabledFor(logging.INFO):
+            chat_message: StreamerBotWebsocket.Events.Twitch.ChatMessage = self.Events.Twitch.ChatMessage(
+                payload.get("data", {})
+            )
+            self._log.info("Received message from %s: %s", chat_message.displayName, chat_message.content)
+
+        return
+
+    # The client's own handlers for each source and type of event
+    ## These are cheap, so they're run right in the listen loop instead of going through the event bus.
+    _builtin_handlers: dict[tuple[str, str], Callable[["StreamerBotWebsocket", dict], None]] = {
+        ("Application", EventTypes.Application.ActionAdded.value): _on_actions_changed,
+        ("Application", EventTypes.Application.ActionUpdated.value): _on_actions_changed,
+        ("Application", EventTypes.Application.ActionDeleted.value): _on_actions_changed,
+        ("Twitch", EventTypes.Twitch.ChatMessage.value): _on_chat_message,
+    }
+
     async def _handle_event(self, payload: dict):
         """Process data from the websocket."""
 
-        self._log.debug(f"event: {payload}")
+        self._log.debug("event: %s", payload)
 
-        ## Processor for Twitch chat messages
-        if (
-                payload.get("event", {}).get("source", "") == "Twitch"
-        ) and (
-                payload.get("event", {}).get("type", "") == self.EventTypes.Twitch.ChatMessage
-        ):
-            self._log.info(
-                f"Received message from {payload["data"]["message"]["displayName"]}: {payload["data"]["message"]["message"]}"
-            )
+        # Get what kind of event it is
+        event: dict = payload.get("event", {})
+        key: tuple[str, str] = (event.get("source", ""), event.get("type", ""))
+
+        # Run the client's own handler for it, if there is one
+        builtin_handler: Callable[[StreamerBotWebsocket, dict], None] | None = self._builtin_handlers.get(key)
+        if builtin_handler:
+            builtin_handler(self, payload)
+
+        # And hand it to everything subscribed to it
+        await self.events.publish(key[0], key[1], payload)
 
         return
 
     async def connect(self) -> None:
-        """Starts the websocket connection to Streamer.bot."""
+        """
+        Starts the websocket connection to Streamer.bot. Doesn't return until it's
+        connected, retrying with an increasing delay as long as it takes. If the
+        connection is lost later on, it's reconnected in the background.
+
+        :returns: ``None``
+
+        :raises None:
+        """
 
         # Update the running var
         self._running = True
+        self._set_state(self.ConnectionState.Connecting)
+
+        await self._connect_with_backoff()
+
+        return
+
+    async def run(self) -> None:
+        """
+        Connects to Streamer.bot and stays connected, reconnecting as needed, until
+        cancelled. It disconnects on the way out.
+
+        :returns: ``None``
+
+        :raises None:
+        """
 
-        # Try to connect to Streamer.bot
+        try:
+            await self.connect()
+
+            # Wait until cancelled
+            await asyncio.get_running_loop().create_future()
+
+        finally:
+            await self.disconnect()
+
+        return
+
+    async def _connect_with_backoff(self) -> None:
+        """Tries to connect until it works or the client is disconnected, backing off between attempts."""
+
+        attempt: int = 0
         while self._running:
             try:
-                self._log.debug("Attempting connection to Streamer.bot...")
-                # Connect to the websocket
-                self._websocket = await websockets.connect(
-                    # Protocol
-                    "ws://"
-                    # IP/URL
-                    f"{self.url}"
-                    # Port
-                    f":{self.port}"
-                )
-                # Grab the hello message to prevent conflict with any other methods
-                await self._websocket.recv()
-                self._log.info("Connected to Streamer.bot.")
-
-                # Resubscribe to previous subscriptions
-                if self._subscriptions and self._keep_subscriptions:
-                    for source, events in self._subscriptions.items():
-                        # Create the subscription message
-                        subscription_message: dict = {
-                            "request": "Subscribe",
-                            "id": "reconnect",
-                            "events": {source: events},
-                        }
-                        # Send it
-                        await self._websocket.send(json.dumps(subscription_message))
-                        self._log.debug(f"Re-subscribed to {source}: {events}")
-
-                # Keep listening to the socket in the background
-                self._tasks.append(asyncio.create_task(self._listen_loop(self._websocket)))
-                # And keep pinging the connection to make sure it stays alive
-                self._tasks.append(asyncio.create_task(self._ping_loop()))
-
+                await self._open()
                 return
 
             # Handle an error in the connection
             # TODO: Maybe add a different handler for critical errors and non-critical errors
             except Exception as error:
-                # TODO: Implement a back-off system!
+                delay: float = self._backoff_delay(attempt)
+                attempt += 1
                 self._log.error(
-                    f"The following error occurred in the Streamer.bot connection: {error}. Retrying in 3 seconds."
+                    f"The following error occurred in the Streamer.bot connection: {error}. "
+                    f"Retrying in {delay:.1f} seconds."
                 )
-                await asyncio.sleep(3)
+                await asyncio.sleep(delay)
+
+        return
+
+    async def _open(self) -> None:
+        """Makes a single attempt at connecting, and gets everything running on the new connection."""
+
+        self._log.debug("Attempting connection to Streamer.bot...")
+        # Connect to the websocket
+        websocket: websockets.ClientConnection = await websockets.connect(
+            # Protocol
+            "ws://"
+            # IP/URL
+            f"{self.url}"
+            # Port
+            f":{self.port}"
+        )
+
+        ## The socket is only handed over once it's fully set up, so a failure here never leaves a half-open one behind.
+        try:
+            # Grab the hello message to prevent conflict with any other methods
+            await asyncio.wait_for(websocket.recv(), self._request_timeout)
+
+            # Resubscribe to previous subscriptions
+            if self._subscriptions and self._keep_subscriptions:
+                for source, events in self._subscriptions.items():
+                    # Create the subscription message
+                    subscription_message: dict = {
+                        "request": "Subscribe",
+                        "id": str(uuid.uuid4()),
+                        "events": {source: events},
+                    }
+                    # Send it
+                    await websocket.send(json.dumps(subscription_message))
+                    self._log.debug(f"Re-subscribed to {source}: {events}")
+
+        except BaseException:
+            await websocket.close()
+            raise
+
+        self._websocket = websocket
+        self._log.info("Connected to Streamer.bot.")
+
+        # Keep listening to the socket in the background
+        self._listen_task = asyncio.create_task(self._listen_loop(websocket))
+        # And keep pinging the connection to make sure it stays alive
+        self._ping_task = asyncio.create_task(self._ping_loop(websocket))
+
+        ## From here on, losing the connection is picked up by the listen loop, which reconnects on its own
+        try:
+            # Send whatever piled up while disconnected before the connection counts as up
+            ## Actions done in the meantime still join the back of the outbox, so nothing overtakes what's in it.
+            await self._flush_outbox()
+            if websocket is not self._websocket:
+                return
+            self._set_state(self.ConnectionState.Connected)
+
+            # Keep the action catalog up to date from now on
+            if "Application" not in self._subscriptions:
+                await self.subscribe(application=list(self.EventTypes.Application))
+
+            # Fill the action catalog now that responses can be received
+            self.actions.invalidate()
+
+        except (ConnectionError, websockets.ConnectionClosed) as error:
+            self._log.warning("Lost connection to Streamer.bot while setting up the connection: %s", error)
+
+        return
+
+    async def _flush_outbox(self) -> None:
+        """Sends the actions that were done while disconnected, throwing out expired ones."""
+
+        now: float = time.monotonic()
+        expired: int = 0
+
+        while self._outbox and self._websocket:
+            expires_at, payload, on_response = self._outbox.popleft()
+            if expires_at < now:
+                expired += 1
+                self._report_response(on_response, None)
+                continue
+
+            try:
+                await self._send_request(payload, wait_for_response=False, on_response=on_response)
+
+            # Put the action back at the front if it couldn't be sent, so it goes out first on the next connection
+            except BaseException:
+                self._outbox.appendleft((expires_at, payload, on_response))
+                raise
+
+        if expired:
+            self._log.warning("Threw out %d action(s) that expired while disconnected from Streamer.bot.", expired)
 
         return
 
     async def subscribe(
             self,
-            twitch: list[EventTypes.Twitch]
+            twitch: list[EventTypes.Twitch] = None,
+            application: list[EventTypes.Application] = None,
+            handler: Callable[[dict], Awaitable[Any]] | None = None,
+            queue_size: int | None = None,
+            policy: str | None = None
     ) -> None:
         """
         Subscribe to an event from the Streamer.bot websocket.
         Usage:
         # Subscribe to Twitch chat messages
-        await websocket.subscribe(twitch=websocket.TwitchEvents.ChatMessage)
+        await websocket.subscribe(twitch=[websocket.EventTypes.Twitch.ChatMessage], handler=onChatMessage)
         :param twitch: All Twitch-related events to subscribe to.
+        :param application: All Streamer.bot-related events to subscribe to.
+        :param handler: A coroutine function to call with the payload of every one of the
+         events. It gets its own queue and worker, so it can take as long as it wants.
+        :param queue_size: How many events can be waiting on the handler. Defaults to the
+         client's event queue size.
+        :param policy: What to do when the handler's queue is full, "drop" or "block."
+         Defaults to the client's event queue policy.
 
         :returns: ``None``
 
         :raises ConnectionError: If the websocket is not connected.
+        :raises ValueError: If the policy isn't "drop" or "block."
         """
 
         # Don't do anything if no arguments were provided
-        if not any([twitch]):
+        if not any([twitch, application]):
             return
 
         if not self._websocket:
@@ -260,27 +819,32 @@ class StreamerBotWebsocket:
         # Add all event types to it
         if twitch:
             events["Twitch"] = [event.value for event in twitch]
+        if application:
+            events["Application"] = [event.value for event in application]
 
         async with self._subscriptions_lock:
             # Add all subscriptions to the subscriptions dictionary for use upon reconnect
-            for source, event in events.items():
+            for source, source_events in events.items():
                 # Add the source to the subscriptions if not already present
                 if source not in self._subscriptions:
                     self._subscriptions[source] = []
-                for event in events:
+                for event in source_events:
                     # Add the event to the source if not already present
                     if event not in self._subscriptions[source]:
                         self._subscriptions[source].append(event)
 
+                    # Hook the handler up to the event
+                    if handler:
+                        self.events.addConsumer(source, event, handler, queue_size=queue_size, policy=policy)
+
         # Create the payload to be sent
         payload: dict = {
             "request": "Subscribe",
-            "id": "1",  # TODO: Check if this needs to be unique
             "events": events
         }
 
         self._log.debug(f"Attempting to subscribe to the following events in Streamer.bot: {events}")
-        await self._websocket.send(json.dumps(payload))
+        await self._send_request(payload, wait_for_response=False)
         self._log.debug(f"Subscribed.")
 
         return
@@ -288,18 +852,23 @@ class StreamerBotWebsocket:
     async def unsubscribe(
             self,
             unsubscribe_from_all: bool = False,
-            twitch: list[EventTypes.Twitch] = None
+            twitch: list[EventTypes.Twitch] = None,
+            application: list[EventTypes.Application] = None,
+            handler: Callable[[dict], Awaitable[Any]] | None = None
     ) -> None:
         """
         Unsubscribe from events received from the Streamer.bot websocket.
         Usage:
         # Unsubscribe from Twitch chat messages
-        await websocket.unsubscribe(twitch=websocket.TwitchEvents.ChatMessage)
+        await websocket.unsubscribe(twitch=[websocket.EventTypes.Twitch.ChatMessage])
         # Or unsub from all events
         await websocket.unsubscribe(unsubscribe_from_all=True)
         :param unsubscribe_from_all: A boolean value that, if set to true,
          will unsubscribe from all other arguments. Default is false.
         :param twitch: All Twitch-related events to unsubscribe from.
+        :param application: All Streamer.bot-related events to unsubscribe from.
+        :param handler: Only unhook this handler from the events. Streamer.bot is
+         only unsubscribed from the events that have no handlers left.
 
         :returns: ``None``
 
@@ -307,7 +876,7 @@ class StreamerBotWebsocket:
         """
 
         # Don't do anything if no arguments were provided
-        if not any([twitch, unsubscribe_from_all]):
+        if not any([twitch, application, unsubscribe_from_all]):
             return
 
         if not self._websocket:
@@ -321,12 +890,29 @@ class StreamerBotWebsocket:
                 # Add all event types to it
                 if twitch:
                     events["Twitch"] = [event.value for event in twitch]
+                if application:
+                    events["Application"] = [event.value for event in application]
+
+                # Unhook the handlers from the events
+                for source, source_events in events.items():
+                    for event in source_events:
+                        await self.events.removeConsumers(source, event, handler)
+
+                # Keep getting the events that other handlers still need
+                if handler:
+                    events = {
+                        source: [event for event in source_events if not self.events.hasConsumers(source, event)]
+                        for source, source_events in events.items()
+                    }
+                    events = {source: source_events for source, source_events in events.items() if source_events}
+                    if not events:
+                        return
 
                 # Remove all matching events from the subscriptions dictionary to prevent resubscribe upon reconnect
-                for source, event in events.items():
+                for source, source_events in events.items():
                     # Check if the source is in the subscriptions list
                     if source in self._subscriptions:
-                        for event in events:
+                        for event in source_events:
                             # If the event is in the source,
                             if event in self._subscriptions[source]:
                                 # Remove the event from the source
@@ -340,6 +926,9 @@ class StreamerBotWebsocket:
                 events: dict = self._subscriptions.copy()
                 self._subscriptions.clear()
 
+                # Unhook every handler
+                await self.events.close()
+
         # Create the payload to be sent
         payload: dict = {
             "request": "Unsubscribe",
@@ -350,7 +939,7 @@ class StreamerBotWebsocket:
             "Attempting to unsubscribe from all events from Streamer.bot..." if unsubscribe_from_all else (
                     f"Attempting to unsubscribe from the following events in Streamer.bot: " + str(events))
         )
-        await self._websocket.send(json.dumps(payload))
+        await self._send_request(payload, wait_for_response=False)
         self._log.debug(f"Unsubscribed.")
 
     async def disconnect(self) -> None:
@@ -358,26 +947,44 @@ class StreamerBotWebsocket:
 
         # Update the running var
         self._running = False
+        self._set_state(self.ConnectionState.Closed)
+
+        # Take the websocket out of use, so losing it doesn't count as a dropped connection
+        websocket: websockets.ClientConnection | None = self._websocket
+        self._websocket = None
 
         # Cancel background tasks
-        for task in self._tasks:
-            task.cancel()
-        await asyncio.gather(*self._tasks, return_exceptions=True)
-        self._tasks.clear()
+        if self._reconnect_task and self._reconnect_task is not asyncio.current_task():
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+        self._reconnect_task = None
+        await self._cancel_connection_tasks()
+
+        # Throw out anything that never got sent
+        if self._outbox:
+            self._log.warning("Threw out %d action(s) that were never sent to Streamer.bot.", len(self._outbox))
+            for _, _, on_response in self._outbox:
+                self._report_response(on_response, None)
+            self._outbox.clear()
+
+        # Fail any requests still waiting on a response
+        self._fail_pending_requests(ConnectionError("Disconnected from Streamer.bot!"))
 
         # Disconnect the websocket if it's still active
-        if self._websocket:
-            await self._websocket.close()
-            self._websocket = None
+        if websocket:
+            await websocket.close()
 
         self._log.debug("Closed connection to Streamer.bot.")
 
         return
 
-    async def get_actions(self) -> dict:
+    async def get_actions(self, timeout: float | None = None) -> dict:
         """
         Gets all available actions in Streamer.bot.
 
+        :param timeout: How long to wait for a response, in seconds. Defaults to
+         the client's request timeout.
+
         :returns:  ``dict`` - The dictionary containing all present
          actions in the Streamer.bot instance. You can go to this
          website, https://docs.streamer.bot/api/servers/websocket/requests/#getactions,
@@ -385,28 +992,22 @@ class StreamerBotWebsocket:
          create custom types or document this garbage.
 
         :raises ConnectionError: If the websocket isn't currently connected.
+        :raises TimeoutError: If Streamer.bot didn't respond in time.
         """
 
-        # Handle if the websocket isn't connected
-        if not self._websocket:
-            raise ConnectionError("Websocket is not connected!")
-
         # Create the payload
         payload: dict = {
-          "request": "GetActions",
-          "id": str(uuid.uuid1())
+          "request": "GetActions"
         }
 
         # Send the payload
         self._log.debug("Attempting to get all actions in Streamer.bot...")
-        await self._websocket.send(json.dumps(payload))
-        self._log.debug("Waiting for response...")
-        response: bytes = await self._websocket.recv()
+        response_dict: dict = await self._send_request(payload, timeout=timeout)
         self._log.debug("Response received.")
 
         # Clean up and remove unneeded data
-        response_dict: dict = json.loads(response)
-        del response_dict["id"], response_dict["status"], response
+        response_dict.pop("id", None)
+        response_dict.pop("status", None)
 
         # Return the responded list of actions
         return response_dict
@@ -415,8 +1016,11 @@ class StreamerBotWebsocket:
             self,
             action_id: str = None,
             action_name: str = None,
-            args: dict = None
-    ) -> dict:
+            args: dict = None,
+            wait_for_response: bool = True,
+            timeout: float | None = None,
+            on_response: Callable[[dict | None], Any] | None = None
+    ) -> dict | None:
         """
         Perform an action in Streamer.bot.
 
@@ -427,24 +1031,33 @@ class StreamerBotWebsocket:
          do not provide the action ID as well; it will be ignored.
         :param args: Any arguments to pass to the action, in the
          form of a dictionary.
-
-        :returns: ``dict`` - The response data from Streamer.bot. Go read
+        :param wait_for_response: Whether to wait for Streamer.bot to
+         respond. If false, the action is fired off and forgotten about,
+         so toggles done back-to-back don't wait on each other. Actions
+         that aren't waited on are held on to while reconnecting, and
+         sent once the connection is back.
+        :param timeout: How long to wait for a response, in seconds.
+         Defaults to the client's request timeout.
+        :param on_response: A function to call with the response to an
+         action that isn't waited on once it arrives, or ``None`` if it
+         never does, such as if it timed out or was thrown out while
+         disconnected. It isn't called if sending the action fails.
+
+        :returns: ``dict | None`` - The response data from Streamer.bot, or
+         ``None`` if the response wasn't waited on. Go read
          https://docs.streamer.bot/api/servers/websocket/requests/#doaction
          for more info because I'm lazy.
 
         :raises ValueError: If neither action name nor action ID was
          provided.
         :raises ConnectionError: If the websocket isn't currently connected.
+        :raises TimeoutError: If Streamer.bot didn't respond in time.
         """
 
         # Handle if required arguments weren't provided
         if not any({action_name, action_id}):
             raise ValueError("Neither action_name nor action_id was provided!")
 
-        # Handle if the websocket isn't connected
-        if not self._websocket:
-            raise ConnectionError("Websocket is not connected!")
-
         # Create the payload provided on what arguments were provided
         if action_name:
             # Create the payload to send
@@ -453,8 +1066,7 @@ class StreamerBotWebsocket:
               "action": {
                 "name": action_name
               },
-              "args": args,
-              "id": str(uuid.uuid1())
+              "args": args
             }
         else:
             # Create the payload to send
@@ -463,22 +1075,44 @@ class StreamerBotWebsocket:
                 "action": {
                     "id": action_id,
                 },
-                "args": args,
-                "id": str(uuid.uuid1())
+                "args": args
             }
 
+        # Hold on to the action until the connection is back, if it's only down for the moment
+        ## Only fire-and-forget actions can wait, since nothing would be around for the response.
+        if not self.connected and self._running and not wait_for_response:
+            # Throw out the oldest action to make room if the outbox is full, since it's the most stale one
+            if len(self._outbox) >= self._outbox_size:
+                self._report_response(self._outbox.popleft()[2], None)
+                self.dropped_actions += 1
+                self._log.warning(
+                    "Too many actions are waiting on the connection to Streamer.bot! Dropped the oldest one "
+                    "(%d dropped in total).", self.dropped_actions
+                )
+
+            self._outbox.append((time.monotonic() + self._outbox_ttl, payload, on_response))
+            self._log.warning(
+                "Not connected to Streamer.bot right now. The action will be sent once the connection is back."
+            )
+            return None
+
         # Send the payload
         self._log.debug("Attempting to perform an action in Streamer.bot...")
-        await self._websocket.send(json.dumps(payload))
-        self._log.debug("Waiting for response...")
-        response: bytes = await self._websocket.recv()
+        response_dict: dict | None = await self._send_request(
+            payload,
+            wait_for_response=wait_for_response,
+            timeout=timeout,
+            on_response=on_response
+        )
+
+        # Nothing else to do if the response wasn't waited on
+        if response_dict is None:
+            return None
         self._log.debug("Response received.")
 
         # Clean up and remove unneeded data
-        response_dict: dict = json.loads(response)
-        ## Why properly handle if values are not present when you could just pray that
-        ## they're there?
-        del response, response_dict["status"], response_dict["id"]
+        response_dict.pop("status", None)
+        response_dict.pop("id", None)
 
-        # Return the responded list of actions
+        # Return the response
         return response_dict
@@ -0,0 +1,299 @@
+# Imports
+import asyncio
+import inspect
+import logging
+import signal
+import time
+from typing import Any, Awaitable, Callable
+
+
+class SupervisedTask:
+    # The restart policies a task can have
+    restart_policies: set[str] = {"always", "on_failure", "never"}
+
+    def __init__(
+            self,
+            name: str,
+            factory: Callable[[], Awaitable[Any]],
+            restart: str = "on_failure",
+            critical: bool = False,
+            max_restarts: int = 5,
+            restart_window: float = 60
+    ) -> None:
+        """
+        A long-lived coroutine the supervisor keeps running.
+
+        :param name: A readable name for the task, used in logs.
+        :param factory: A function that creates the coroutine to run, called again on every restart.
+        :param restart: When to restart the task. "always" restarts it no matter how it
+         stopped, "on_failure" only restarts it if it raised an error, and "never" doesn't.
+        :param critical: Whether the whole program should shut down if the task stops for good.
+        :param max_restarts: How many times the task can be restarted within the restart
+         window before it's given up on.
+        :param restart_window: The window restarts are counted in, in seconds.
+
+        :returns: ``None``
+
+        :raises ValueError: If the restart policy isn't one of the known ones.
+        """
+
+        # Handle an invalid restart policy
+        if restart not in self.restart_policies:
+            raise ValueError(
+                f"Invalid restart policy \"{restart}!\" It has to be one of {sorted(self.restart_policies)}."
+            )
+
+        # Make the settings class-accessible
+        self.name: str = name
+        self.factory: Callable[[], Awaitable[Any]] = factory
+        self.restart: str = restart
+        self.critical: bool = critical
+        self.max_restarts: int = max_restarts
+        self.restart_window: float = restart_window
+
+        # Create a list of the times the task was restarted, to apply the limit with
+        self.restart_times: list[float] = []
+
+        return
+
+
+class Supervisor:
+    def __init__(self, shutdown_timeout: float = 5) -> None:
+        """
+        Owns every long-lived task in the program. Tasks are run in a task group,
+        restarted according to their policy if they stop, and all cancelled together
+        on shutdown. Shutdown, including the cleanup callbacks for things that aren't
+        tasks (threads, files, connections), is bounded by a single timeout, so the
+        program always exits.
+
+        :param shutdown_timeout: The most time shutting down can take, in seconds.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the timeout class-accessible
+        self.shutdown_timeout: float = shutdown_timeout
+        del shutdown_timeout  # Cleanup
+
+        # Create the lists of tasks to run and cleanups to do on shutdown
+        self._tasks: list[SupervisedTask] = []
+        self._cleanups: list[tuple[str, Callable[[], Any]]] = []
+
+        # Create the event that's set once shutdown is requested, and a variable for the exit code
+        self._shutdown_requested: asyncio.Event = asyncio.Event()
+        self.exit_code: int = 0
+        """The code the program should exit with."""
+
+        # Create a variable for when shutdown has to be done by, on the loop's clock
+        self._deadline: float | None = None
+
+        # Fetch the logger
+        self._log: logging.Logger = logging.getLogger()
+
+        return
+
+    def addTask(
+            self,
+            name: str,
+            factory: Callable[[], Awaitable[Any]],
+            restart: str = "on_failure",
+            critical: bool = False,
+            max_restarts: int = 5,
+            restart_window: float = 60
+    ) -> None:
+        """
+        Adds a long-lived task to be run once the supervisor starts. See
+        ``SupervisedTask`` for what the parameters do.
+
+        :returns: ``None``
+
+        :raises ValueError: If the restart policy isn't one of the known ones.
+        """
+
+        self._tasks.append(SupervisedTask(name, factory, restart, critical, max_restarts, restart_window))
+
+        return
+
+    def addCleanup(self, name: str, callback: Callable[[], Any]) -> None:
+        """
+        Adds something to do on shutdown, once every task has stopped. Cleanups are
+        done in the reverse order they were added in. Callbacks can be coroutine
+        functions, or regular functions, which are run in a thread so a blocking one
+        can't hold up shutdown past the timeout.
+
+        :param name: A readable name for the cleanup, used in logs.
+        :param callback: The function to call.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        self._cleanups.append((name, callback))
+
+        return
+
+    def requestShutdown(self, exit_code: int = 0) -> None:
+        """
+        Starts shutting everything down. Only the first request's exit code is kept.
+
+        :param exit_code: The code the program should exit with.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        if not self._shutdown_requested.is_set():
+            self.exit_code = exit_code
+            self._shutdown_requested.set()
+
+        return
+
+    def installSignalHandlers(self) -> None:
+        """Makes SIGINT and SIGTERM shut the program down gracefully."""
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signal_number, self._onSignal, signal_number)
+
+        return
+
+    def _onSignal(self, signal_number: int) -> None:
+        """Handles a shutdown signal."""
+
+        # Exit right away on a second signal, in case shutting down is stuck
+        if self._shutdown_requested.is_set():
+            self._log.warning(
+                "Received %s again, so exiting without finishing the shutdown.", signal.Signals(signal_number).name
+            )
+            raise SystemExit(1)
+
+        self._log.info("Received %s, shutting down!", signal.Signals(signal_number).name)
+        self.requestShutdown(0)
+
+        return
+
+    def _remainingTime(self) -> float:
+        """How much of the shutdown timeout is left, in seconds."""
+
+        if self._deadline is None:
+            return self.shutdown_timeout
+
+        return max(self._deadline - asyncio.get_running_loop().time(), 0)
+
+    async def run(self) -> int:
+        """
+        Runs every task until shutdown is requested, then stops them and does the cleanups.
+
+        :returns: ``int`` - The code the program should exit with.
+
+        :raises None:
+        """
+
+        async with asyncio.TaskGroup() as group:
+            supervisors: list[asyncio.Task] = [
+                group.create_task(self._supervise(task), name=f"supervise:{task.name}") for task in self._tasks
+            ]
+
+            # Wait until it's time to shut down
+            await self._shutdown_requested.wait()
+            self._log.info("Shutting down...")
+            self._deadline = asyncio.get_running_loop().time() + self.shutdown_timeout
+
+            # Stop every task, newest first
+            for supervisor in reversed(supervisors):
+                supervisor.cancel()
+
+        # Do the cleanups, newest first
+        for name, callback in reversed(self._cleanups):
+            try:
+                if inspect.iscoroutinefunction(callback):
+                    await asyncio.wait_for(callback(), self._remainingTime())
+                else:
+                    await asyncio.wait_for(asyncio.to_thread(callback), self._remainingTime())
+
+            except TimeoutError:
+                self._log.error("Ran out of time shutting down while cleaning up %s!", name)
+
+            except Exception as error:
+                self._log.error("The following error occurred while cleaning up %s: %s", name, error)
+
+        self._log.debug("Shut down with exit code %d.", self.exit_code)
+
+        return self.exit_code
+
+    async def _supervise(self, task: SupervisedTask) -> None:
+        """Keeps a single task running according to its restart policy."""
+
+        while True:
+            worker: asyncio.Task = asyncio.create_task(task.factory(), name=task.name)
+
+            try:
+                # Shield the worker, so being cancelled can be turned into a bounded stop below
+                await asyncio.shield(worker)
+                error: BaseException | None = None
+
+            except asyncio.CancelledError:
+                # Handle if it was the worker that got cancelled, by something other than the supervisor
+                if not asyncio.current_task().cancelling():
+                    error = None
+
+                else:
+                    await self._stopWorker(task, worker)
+                    raise
+
+            except Exception as caught_error:
+                error = caught_error
+
+            # Figure out whether the task should be restarted
+            if error:
+                self._log.error("%s crashed with the following error: %r", task.name, error)
+            else:
+                self._log.warning("%s stopped.", task.name)
+
+            if task.restart == "never" or (task.restart == "on_failure" and not error):
+                self._giveUp(task, failed=error is not None)
+                return
+
+            # Apply the restart limit
+            now: float = time.monotonic()
+            task.restart_times = [
+                restart_time for restart_time in task.restart_times if now - restart_time < task.restart_window
+            ]
+            if len(task.restart_times) >= task.max_restarts:
+                self._log.error(
+                    "%s was restarted %d times in %d seconds, so it's being given up on.",
+                    task.name, len(task.restart_times), task.restart_window
+                )
+                self._giveUp(task, failed=True)
+                return
+            task.restart_times.append(now)
+
+            # Wait a little longer before each consecutive restart, so a crash loop doesn't spin
+            delay: float = min(0.5 * 2 ** (len(task.restart_times) - 1), 10)
+            self._log.info("Restarting %s in %.1f seconds...", task.name, delay)
+            await asyncio.sleep(delay)
+
+    async def _stopWorker(self, task: SupervisedTask, worker: asyncio.Task) -> None:
+        """Cancels a worker, giving it until the shutdown deadline to stop and leaving it behind if it doesn't."""
+
+        worker.cancel()
+        done, _ = await asyncio.wait({worker}, timeout=self._remainingTime())
+        if not done:
+            self._log.error("%s didn't stop in time, so it was abandoned.", task.name)
+        elif not worker.cancelled() and worker.exception():
+            self._log.error("%s failed while stopping: %s", task.name, worker.exception())
+
+        return
+
+    def _giveUp(self, task: SupervisedTask, failed: bool) -> None:
+        """Stops supervising a task, shutting everything down if it was critical."""
+
+        if task.critical:
+            self._log.error("%s was critical, so the program is shutting down.", task.name)
+            self.requestShutdown(1 if failed else 0)
+
+        return
@@ -0,0 +1,204 @@
+# Imports
+import asyncio
+import logging
+from typing import Any, Callable
+
+
+class WheelTimer:
+    """A single callback scheduled on a timer wheel."""
+
+    __slots__ = ("deadline", "callback", "args", "_wheel", "_slot")
+
+    def __init__(self, wheel: "TimerWheel", deadline: int, callback: Callable[..., Any], args: tuple) -> None:
+        self.deadline: int = deadline
+        """The tick the timer is due on."""
+        self.callback: Callable[..., Any] = callback
+        """The function called when the timer is due."""
+        self.args: tuple = args
+        """The arguments the callback is called with."""
+        self._wheel: TimerWheel = wheel
+        # The slot the timer is currently in, or None once it's fired or been cancelled
+        self._slot: dict[WheelTimer, None] | None = None
+
+        return
+
+    @property
+    def pending(self) -> bool:
+        """Whether the timer is still waiting to fire."""
+
+        return self._slot is not None
+
+    def cancel(self) -> None:
+        """Stops the timer from firing. Cancelling a timer that's already fired or been cancelled does nothing."""
+
+        if self._slot is not None:
+            del self._slot[self]
+            self._slot = None
+            self._wheel._count -= 1
+
+        return
+
+
+class TimerWheel:
+    def __init__(self, resolution: float = 0.01, slot_bits: int = 8, levels: int = 3) -> None:
+        """
+        A hierarchical timer wheel, for scheduling lots of short timers cheaply. Each
+        level is a ring of slots, where a slot on the first level covers a single tick
+        and a slot on each level above covers a whole turn of the level below it. A
+        timer is dropped into the slot its deadline falls in, and timers on higher
+        levels are moved down a level whenever the level below comes round to them,
+        so scheduling, cancelling and firing a timer are all O(1) no matter how many
+        there are. The whole wheel is driven by a single callback on the event loop,
+        which is only scheduled while there are timers waiting.
+
+        :param resolution: How long a tick is, in seconds. Timers fire on the first tick at or after their deadline.
+        :param slot_bits: The number of slots on each level, as a power of 2.
+        :param levels: The number of levels. Timers further out than every level covers wait in an overflow
+         list, which is looked at once every turn of the top level.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the settings class-accessible
+        self.resolution: float = resolution
+        self._slot_bits: int = slot_bits
+        self._slot_mask: int = (1 << slot_bits) - 1
+        del resolution  # Cleanup
+
+        # Create the slots of every level, and the list for timers further out than all of them
+        self._levels: list[list[dict[WheelTimer, None]]] = [
+            [{} for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._overflow: dict[WheelTimer, None] = {}
+        del slot_bits, levels  # Cleanup
+
+        # Create variables for the tick the wheel is on, and how many timers are waiting
+        self._tick: int = 0
+        self._count: int = 0
+
+        # Create a variable to store the event loop callback driving the wheel
+        self._handle: asyncio.TimerHandle | None = None
+
+        # Fetch the logger
+        self._log: logging.Logger = logging.getLogger()
+
+        return
+
+    def __len__(self) -> int:
+        return self._count
+
+    def schedule(self, delay: float, callback: Callable[..., Any], *args: Any) -> WheelTimer:
+        """
+        Schedules a function to be called after a delay.
+
+        :param delay: How long to wait, in seconds.
+        :param callback: The function to call. It can't be a coroutine function, but can start a task.
+        :param args: The arguments to call the function with.
+
+        :returns: ``WheelTimer`` - The timer, which can be cancelled.
+
+        :raises RuntimeError: If there's no running event loop.
+        """
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+
+        # Catch the wheel up to now if it's been sitting idle, which is safe because it's empty
+        if not self._count:
+            self._tick = int(loop.time() / self.resolution)
+
+        # Round up, so timers never fire early, and never schedule one for a tick that's already been handled
+        deadline: int = max(-int(-(loop.time() + delay) // self.resolution), self._tick + 1)
+        timer: WheelTimer = WheelTimer(self, deadline, callback, args)
+        self._place(timer)
+        self._count += 1
+
+        # Start driving the wheel if it isn't already
+        if not self._handle:
+            self._handle = loop.call_at((self._tick + 1) * self.resolution, self._onTick)
+
+        return timer
+
+    def _place(self, timer: WheelTimer) -> None:
+        """Puts a timer in the slot its deadline falls in."""
+
+        # Use the lowest level whose turn the deadline falls in, which is the first one the tick and
+        # the deadline agree on everything above of
+        for level, slots in enumerate(self._levels):
+            if (timer.deadline ^ self._tick) >> (self._slot_bits * (level + 1)) == 0:
+                slot: dict[WheelTimer, None] = slots[(timer.deadline >> (self._slot_bits * level)) & self._slot_mask]
+                break
+        else:
+            slot = self._overflow
+
+        slot[timer] = None
+        timer._slot = slot
+
+        return
+
+    def _cascade(self, slot: dict[WheelTimer, None]) -> None:
+        """Moves every timer in a slot down to wherever it belongs now."""
+
+        timers: list[WheelTimer] = list(slot)
+        slot.clear()
+        for timer in timers:
+            self._place(timer)
+
+        return
+
+    def _onTick(self) -> None:
+        """Handles every tick up to now, firing the timers that are due."""
+
+        self._handle = None
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        now: int = int(loop.time() / self.resolution)
+
+        while self._tick < now and self._count:
+            self._tick += 1
+
+            # Move timers down from each level whose slot the tick just reached, highest first
+            for level in range(len(self._levels), 0, -1):
+                if self._tick & ((1 << (self._slot_bits * level)) - 1):
+                    continue
+                if level == len(self._levels):
+                    self._cascade(self._overflow)
+                else:
+                    self._cascade(self._levels[level][(self._tick >> (self._slot_bits * level)) & self._slot_mask])
+
+            # Fire everything in the first level's slot for the tick
+            slot: dict[WheelTimer, None] = self._levels[0][self._tick & self._slot_mask]
+            while slot:
+                timer: WheelTimer = next(iter(slot))
+                timer.cancel()
+                try:
+                    timer.callback(*timer.args)
+
+                # Don't let one failed callback stop the rest from firing
+                except Exception as error:
+                    self._log.error("The following error occurred in a timer callback: %s", error)
+
+        # Keep going for as long as there are timers waiting
+        if self._count:
+            self._handle = loop.call_at((max(self._tick, now) + 1) * self.resolution, self._onTick)
+
+        return
+
+    async def close(self) -> None:
+        """
+        Cancels every timer, and stops driving the wheel. It's a coroutine function so it
+        runs on the event loop, rather than in a thread like other cleanups.
+        """
+
+        for slots in self._levels:
+            for slot in slots:
+                for timer in list(slot):
+                    timer.cancel()
+        for timer in list(self._overflow):
+            timer.cancel()
+
+        if self._handle:
+            self._handle.cancel()
+            self._handle = None
+
+        return
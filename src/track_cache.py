@@ -0,0 +1,196 @@
+# Imports
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Hashable
+from src.logger import getSubsystemLogger
+
+
+class TrackCache:
+    def __init__(self, budget_bytes: int = 256 * 1024 * 1024) -> None:
+        """
+        An in-memory cache of music tracks, so loading a track doesn't have to go to disk.
+        Tracks are read ahead in a background thread, and once the cache goes over its
+        budget the least recently used tracks are evicted, starting with the ones that
+        aren't being kept warm by anything.
+
+        :param budget_bytes: The maximum amount of bytes the cached tracks can take up.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Make the budget class-accessible
+        self.budget_bytes: int = budget_bytes
+        """The maximum amount of bytes the cached tracks can take up."""
+        del budget_bytes  # Cleanup
+
+        # Create the cache itself, ordered from least to most recently used
+        self._tracks: OrderedDict[str, bytes] = OrderedDict()
+
+        # Create a variable for how many bytes are currently cached
+        self.size_bytes: int = 0
+        """The amount of bytes the cached tracks currently take up."""
+
+        # Create a set of the tracks each owner wants kept warm, which are evicted last
+        ## Owners are whatever asked for the tracks, such as a side panel, so one changing its set leaves the others'.
+        self._pinned: dict[Hashable, set[str]] = {}
+
+        # Create a counter for each owner that goes up every time its warm set changes,
+        # so its outdated warm-ups can be abandoned
+        self._generations: dict[Hashable, int] = {}
+
+        # Create a lock, since the cache is filled from a background thread
+        self._lock: threading.Lock = threading.Lock()
+
+        # Create the queue of warm-up requests, and a variable to store the thread working through them
+        self._requests: queue.Queue[tuple[Hashable, int, list[str]] | None] = queue.Queue()
+        self._worker_thread: threading.Thread | None = None
+
+        # Fetch the logger
+        self._log: logging.Logger = getSubsystemLogger("music")
+
+        return
+
+    def __contains__(self, path: str) -> bool:
+        return os.path.abspath(path) in self._tracks
+
+    def get(self, path: str) -> bytes | None:
+        """
+        Gets a track from the cache.
+
+        :param path: The path to the track.
+
+        :returns: ``bytes | None`` - The contents of the track file, or ``None`` if it isn't cached.
+
+        :raises None:
+        """
+
+        path = os.path.abspath(path)
+
+        with self._lock:
+            data: bytes | None = self._tracks.get(path)
+            if data is not None:
+                # Mark it as the most recently used track
+                self._tracks.move_to_end(path)
+
+        return data
+
+    def warm(self, owner: Hashable, paths: list[str]) -> None:
+        """
+        Reads a set of tracks into the cache in the background. Tracks the same owner was
+        keeping warm before become the first to be evicted once the cache needs room,
+        unless another owner is still keeping them warm.
+
+        :param owner: What the tracks are being kept warm for, such as a side panel.
+        :param paths: The paths to the tracks to keep warm, replacing the owner's previous ones.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        paths = [os.path.abspath(path) for path in paths]
+
+        with self._lock:
+            self._pinned[owner] = set(paths)
+            generation: int = self._generations.get(owner, 0) + 1
+            self._generations[owner] = generation
+
+        self._requests.put((owner, generation, paths))
+
+        # Start the worker if it isn't running
+        if not self._worker_thread or not self._worker_thread.is_alive():
+            self._worker_thread = threading.Thread(target=self._worker, name="track-cache", daemon=True)
+            self._worker_thread.start()
+
+        return
+
+    def close(self, timeout: float | None = None) -> None:
+        """
+        Stops the background thread and empties the cache.
+
+        :param timeout: How long to wait for the thread to stop, in seconds.
+
+        :returns: ``None``
+
+        :raises None:
+        """
+
+        # Tell the worker to stop
+        self._requests.put(None)
+        if self._worker_thread:
+            self._worker_thread.join(timeout)
+            self._worker_thread = None
+
+        with self._lock:
+            self._tracks.clear()
+            self.size_bytes = 0
+
+        return
+
+    def _worker(self) -> None:
+        """Works through warm-up requests until told to stop."""
+
+        while True:
+            request: tuple[Hashable, int, list[str]] | None = self._requests.get()
+            if request is None:
+                return
+
+            owner, generation, paths = request
+            for path in paths:
+                # Stop if the same owner asked for a newer set of tracks in the meantime
+                if generation != self._generations.get(owner):
+                    break
+
+                # Skip tracks that are already cached
+                if self.get(path) is not None:
+                    continue
+
+                try:
+                    self._insert(path, self._readTrack(path))
+
+                except OSError as error:
+                    self._log.warning(f"Couldn't preload \"{path}.\" Error: {error}")
+
+    @staticmethod
+    def _readTrack(path: str) -> bytes:
+        """Reads a track file, telling the kernel up front that all of it is about to be read."""
+
+        with open(path, "rb") as file:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(file.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+
+            return file.read()
+
+    def _insert(self, path: str, data: bytes) -> None:
+        """Adds a track to the cache, evicting others if it goes over budget."""
+
+        # Don't bother with tracks that could never fit
+        if len(data) > self.budget_bytes:
+            self._log.warning(f"\"{path}\" is bigger than the whole track cache budget, so it won't be preloaded.")
+            return
+
+        with self._lock:
+            self._tracks[path] = data
+            self.size_bytes += len(data)
+
+            # Evict the least recently used tracks that no owner is keeping warm first, and the rest after
+            pinned: set[str] = set().union(*self._pinned.values())
+            for candidates in (
+                    [old_path for old_path in self._tracks if old_path not in pinned],
+                    list(self._tracks)
+            ):
+                for old_path in candidates:
+                    if self.size_bytes <= self.budget_bytes:
+                        break
+                    if old_path == path:
+                        continue
+
+                    self.size_bytes -= len(self._tracks.pop(old_path))
+                    self._log.debug(f"Evicted \"{old_path}\" from the track cache.")
+
+        return
@@ -56,7 +56,7 @@ def setup() -> bool:
         return False
 
     # Create a list of directories needed for the program to run
-    needed_directories: set[str] = {"logs"}
+    needed_directories: set[str] = {"logs", "cache"}
 
     for directory in needed_directories:
         # Handle if the directory doesn't exist